@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime, date, timedelta
 from typing import List, Optional
@@ -6,8 +7,14 @@ from decimal import Decimal
 
 from app.config.database import get_db
 from app.models.user import User
+from app.models.vehicle import Vehicle
 from app.api.deps import get_current_user
 from app.services.analytics_service import AnalyticsService
+from app.services.analytics_cache_service import analytics_cache
+from app.services.forecasting_service import CostForecastingService
+from app.services.export_service import (
+    MaintenanceExportService, EXPORT_DATASETS, EXPORT_FORMATS, parquet_available
+)
 from app.schemas.analytics_schemas import (
     CostSummary, VehicleCostSummary, CategoryCostBreakdown,
     MonthlySpending, CostAnalyticsResponse, BudgetComparison,
@@ -254,11 +261,12 @@ def get_cost_insights(
         if older_months:
             avg_older = sum(m.total_spent for m in older_months) / len(older_months)
             
-            if avg_recent > avg_older * 1.2:
+            # Decimal factors (Decimal * float raises), and no ratio against a zero average
+            if avg_older > 0 and avg_recent > avg_older * Decimal('1.2'):
                 insights.append(f"Your expenses have increased by {((avg_recent/avg_older - 1) * 100):.1f}% in the last 3 months")
                 recommendations.append("Consider reviewing your maintenance habits and looking for more affordable workshops")
-            elif avg_recent < avg_older * 0.8:
-                insights.append(f"Your expenses have decreased by {((avg_older/avg_recent - 1) * 100):.1f}% in the last 3 months")
+            elif avg_recent < avg_older * Decimal('0.8'):
+                insights.append(f"Your expenses have decreased by {((1 - avg_recent/avg_older) * 100):.1f}% in the last 3 months")
                 recommendations.append("Great expense control! Keep it up")
     
     # Category analysis
@@ -274,7 +282,7 @@ def get_cost_insights(
         most_expensive_vehicle = max(vehicles, key=lambda x: x.total_spent)
         insights.append(f"Your most expensive vehicle is {most_expensive_vehicle.vehicle_name} (${most_expensive_vehicle.total_spent})")
         
-        if most_expensive_vehicle.total_spent > sum(v.total_spent for v in vehicles) * 0.7:
+        if most_expensive_vehicle.total_spent > sum(v.total_spent for v in vehicles) * Decimal('0.7'):
             recommendations.append("One vehicle is generating the majority of your expenses. Consider evaluating if it's time for a replacement")
     
     # General recommendations
@@ -294,8 +302,102 @@ def get_cost_insights(
         }
     }
 
+# === PREDICTIONS ===
+
+@router.get("/predictive", response_model=PredictiveAnalytics)
+def get_predictive_analytics(
+    vehicle_id: Optional[str] = Query(None, description="Forecast of one vehicle instead of all of them"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get cost, mileage and next maintenance forecasts (computed nightly)"""
+    
+    if vehicle_id:
+        vehicle = db.query(Vehicle.id).filter(
+            Vehicle.id == vehicle_id,
+            Vehicle.user_id == current_user.id
+        ).first()
+        if not vehicle:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Vehicle not found or doesn't belong to user"
+            )
+    
+    forecast = CostForecastingService(db).get_forecast(current_user.id, vehicle_id)
+    if not forecast:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No forecast available yet, forecasts are computed nightly"
+        )
+    
+    return forecast
+
+# === CACHE ===
+
+@router.get("/cache-stats", response_model=dict)
+def get_analytics_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Size and hit/miss counters of the analytics result cache"""
+    return analytics_cache.stats()
+
 # === EXPORT AND REPORTS ===
 
+@router.get("/export/maintenance")
+def export_maintenance(
+    dataset: str = Query("records", description="records or rollups (monthly cost totals)"),
+    format: str = Query("csv", description="csv or parquet"),
+    vehicle_id: Optional[str] = Query(None, description="Only this vehicle"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the maintenance history or monthly cost rollups as a file"""
+    
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid dataset. Use one of: {', '.join(EXPORT_DATASETS)}"
+        )
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires pyarrow"
+        )
+    
+    if vehicle_id:
+        vehicle = db.query(Vehicle.id).filter(
+            Vehicle.id == vehicle_id,
+            Vehicle.user_id == current_user.id
+        ).first()
+        if not vehicle:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Vehicle not found or doesn't belong to user"
+            )
+    
+    exporter = MaintenanceExportService()
+    filters = {"vehicle_id": vehicle_id, "start_date": start_date, "end_date": end_date}
+    if format == "csv":
+        content = exporter.csv_stream(dataset, current_user.id, **filters)
+        media_type = "text/csv"
+    else:
+        content = exporter.parquet_stream(dataset, current_user.id, **filters)
+        media_type = "application/vnd.apache.parquet"
+    
+    filename = f"maintenance_{dataset}_{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/export/monthly-report")
 def export_monthly_report(
     year: int = Query(..., ge=2020, le=2030),
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from decimal import Decimal
 
 from app.config.database import get_db
@@ -32,10 +32,99 @@ from app.schemas.workshop_schemas import (
     LocationInfo,
     DistanceCalculation
 )
+from app.services.spatial_index_service import workshop_spatial_index
+from app.services.workshop_projection_service import WORKSHOP_ROW_COLUMNS, WorkshopRow, serialize_workshop
+from app.services.term_index_service import workshop_term_index
+from app.services.opening_hours_service import opening_hours_index, resolve_day_and_time
+from app.services.geocoding_cache_service import geocoding_cache
+from app.services.gazetteer_service import pr_gazetteer
 from app.api.deps import get_current_user
+from app.utils.helpers import top_k
 
 router = APIRouter(prefix="/geographic", tags=["geographic-search"])
 
+# Keep IN (...) lists under SQLite's bound parameter limit
+ID_CHUNK_SIZE = 500
+
+def _load_workshops(db: Session, nearby: List[Tuple[str, float, int]], *filters,
+                    limit: Optional[int] = None) -> List[Tuple[WorkshopRow, float, int]]:
+    """
+    Load projected rows of (workshop_id, distance_km, travel_time) entries by primary key
+    Keeps the order of the entries and drops rows rejected by the extra filters
+    With a limit, stops loading once that many rows passed the filters
+    """
+    workshop_ids = [entry[0] for entry in nearby]
+    workshops = {}
+    
+    # With a limit, start with a chunk of that size and grow it while filters reject rows
+    chunk_size = ID_CHUNK_SIZE if limit is None else min(limit, ID_CHUNK_SIZE)
+    start = 0
+    while start < len(workshop_ids):
+        chunk = workshop_ids[start:start + chunk_size]
+        rows = db.query(*WORKSHOP_ROW_COLUMNS).filter(
+            Workshop.id.in_(chunk),
+            Workshop.is_active == True,
+            *filters
+        ).all()
+        for row in rows:
+            workshops[row.id] = WorkshopRow(row)
+        
+        start += len(chunk)
+        if limit is not None:
+            if len(workshops) >= limit:
+                break
+            chunk_size = min(chunk_size * 2, ID_CHUNK_SIZE)
+    
+    loaded = [
+        (workshops[workshop_id], distance, travel_time)
+        for workshop_id, distance, travel_time in nearby
+        if workshop_id in workshops
+    ]
+    return loaded if limit is None else loaded[:limit]
+
+def _count_workshops(db: Session, workshop_ids: List[str], *filters) -> int:
+    """Count the active workshops among the ids that pass the extra filters"""
+    total = 0
+    for start in range(0, len(workshop_ids), ID_CHUNK_SIZE):
+        chunk = workshop_ids[start:start + ID_CHUNK_SIZE]
+        total += db.query(func.count(Workshop.id)).filter(
+            Workshop.id.in_(chunk),
+            Workshop.is_active == True,
+            *filters
+        ).scalar()
+    return total
+
+def _workshops_within_radius(db: Session, latitude: float, longitude: float, radius_km: float,
+                             *filters, only_ids: Optional[Set[str]] = None,
+                             limit: Optional[int] = None) -> List[Tuple[WorkshopRow, float, int]]:
+    """
+    Active workshops within the radius, answered by the spatial index
+    only_ids (e.g. from the term index) skips loading rows that cannot match
+    limit keeps only the nearest matches, loading no more rows than needed
+    Returns (workshop, distance_km, travel_time_minutes) ordered by distance
+    """
+    workshop_spatial_index.ensure_built(db)
+    nearby = workshop_spatial_index.within_radius(latitude, longitude, radius_km)
+    if only_ids is not None:
+        nearby = [entry for entry in nearby if entry[0] in only_ids]
+    return _load_workshops(db, nearby, *filters, limit=limit)
+
+def _nearest_workshops(db: Session, latitude: float, longitude: float, limit: int,
+                       radius_km: float) -> List[Tuple[WorkshopRow, float, int]]:
+    """
+    The limit nearest active workshops within the radius, answered by the spatial index
+    Entries deactivated since the index was built (e.g. by another process) are
+    dropped on load, so k grows until limit active rows are found or the radius is exhausted
+    """
+    workshop_spatial_index.ensure_built(db)
+    k = limit
+    while True:
+        nearest = workshop_spatial_index.nearest(latitude, longitude, k, radius_km)
+        loaded = _load_workshops(db, nearest, limit=limit)
+        if len(loaded) >= limit or len(nearest) < k:
+            return loaded
+        k *= 2
+
 # === SEARCH ENDPOINTS ===
 
 @router.post("/search", response_model=GeographicSearchResult)
@@ -84,82 +173,30 @@ def geographic_search(
             detail="Invalid coordinates"
         )
     
-    # Get bounding box for optimized query
-    bbox = geo_service.get_bounding_box(search_lat, search_lon, radius_km)
-    
-    # Base query
-    query = db.query(Workshop).filter(
-        and_(
-            Workshop.is_active == True,
-            Workshop.latitude.between(bbox['min_lat'], bbox['max_lat']),
-            Workshop.longitude.between(bbox['min_lon'], bbox['max_lon'])
-        )
-    )
-    
-    # Apply additional filters
+    # Additional filters
+    filters = []
     if min_rating is not None:
-        query = query.filter(Workshop.rating_average >= min_rating)
+        filters.append(Workshop.rating_average >= min_rating)
     
     if verified_only:
-        query = query.filter(Workshop.is_verified == True)
-    
-    # TODO: Implement service filtering when available in DB
-    # if services:
-    #     service_list = [s.strip() for s in services.split(',')]
-    #     query = query.filter(Workshop.services.contains(service_list))
-    
-    workshops = query.all()
-    
-    # Convert to dictionaries and calculate distances
-    workshops_data = []
-    workshops_in_radius = []
-    
-    for workshop in workshops:
-        workshop_dict = {
-            "id": workshop.id,
-            "name": workshop.name,
-            "description": workshop.description,
-            "address": workshop.address,
-            "city": workshop.city,
-            "state": workshop.state,
-            "postal_code": workshop.postal_code,
-            "phone": workshop.phone,
-            "email": workshop.email,
-            "website": workshop.website,
-            "latitude": float(workshop.latitude) if workshop.latitude else None,
-            "longitude": float(workshop.longitude) if workshop.longitude else None,
-            "services": workshop.services or [],
-            "specialties": workshop.specialties or [],
-            "working_hours": workshop.working_hours or {},
-            "rating_average": float(workshop.rating_average),
-            "total_reviews": workshop.total_reviews,
-            "images": workshop.images or [],
-            "certifications": workshop.certifications or [],
-            "years_in_business": workshop.years_in_business,
-            "is_active": workshop.is_active,
-            "is_verified": workshop.is_verified,
-            "created_at": workshop.created_at
-        }
-        
-        # Calculate distance if the workshop has coordinates
-        if workshop.latitude and workshop.longitude:
-            distance = geo_service.calculate_distance(
-                search_lat, search_lon,
-                float(workshop.latitude), float(workshop.longitude)
-            )
-            
-            # Only include if within radius
-            if distance <= radius_km:
-                travel_time = geo_service.estimate_travel_time(distance)
-                workshop_dict['distance_km'] = distance
-                workshop_dict['estimated_travel_time_minutes'] = travel_time
-                workshops_in_radius.append(workshop_dict)
-    
-    # Sort by distance
-    workshops_in_radius.sort(key=lambda x: x['distance_km'])
-    
-    # Limit results
-    workshops_in_radius = workshops_in_radius[:max_results]
+        filters.append(Workshop.is_verified == True)
+    
+    # Workshops offering every requested service, from the term index
+    service_ids = None
+    if services:
+        service_list = [s.strip() for s in services.split(',') if s.strip()]
+        workshop_term_index.ensure_built(db)
+        service_ids = workshop_term_index.all_of("services", service_list)
+    
+    # Nearest max_results workshops within the radius, from the spatial index
+    nearby = _workshops_within_radius(db, search_lat, search_lon, radius_km, *filters,
+                                      only_ids=service_ids, limit=max_results)
+    
+    # Convert to dictionaries
+    workshops_in_radius = [
+        serialize_workshop(workshop, distance, travel_time)
+        for workshop, distance, travel_time in nearby
+    ]
     
     return {
         "workshops": workshops_in_radius,
@@ -187,62 +224,16 @@ def get_nearby_workshops(
             detail="Invalid coordinates"
         )
     
-    # Bounding box for optimized query
-    bbox = geo_service.get_bounding_box(latitude, longitude, radius_km)
-    
-    # Query with bounding box
-    workshops = db.query(Workshop).filter(
-        and_(
-            Workshop.is_active == True,
-            Workshop.latitude.between(bbox['min_lat'], bbox['max_lat']),
-            Workshop.longitude.between(bbox['min_lon'], bbox['max_lon']),
-            Workshop.latitude.isnot(None),
-            Workshop.longitude.isnot(None)
-        )
-    ).all()
-    
-    # Convert to dictionaries and filter by exact radius
-    workshops_with_distance = []
+    # k-nearest query against the spatial index
+    nearest = _nearest_workshops(db, latitude, longitude, limit, radius_km)
     
-    for workshop in workshops:
-        distance = geo_service.calculate_distance(
-            latitude, longitude,
-            float(workshop.latitude), float(workshop.longitude)
-        )
-        
-        if distance <= radius_km:
-            workshop_dict = {
-                "id": workshop.id,
-                "name": workshop.name,
-                "description": workshop.description,
-                "address": workshop.address,
-                "city": workshop.city,
-                "state": workshop.state,
-                "postal_code": workshop.postal_code,
-                "phone": workshop.phone,
-                "email": workshop.email,
-                "website": workshop.website,
-                "latitude": float(workshop.latitude),
-                "longitude": float(workshop.longitude),
-                "services": workshop.services or [],
-                "specialties": workshop.specialties or [],
-                "working_hours": workshop.working_hours or {},
-                "rating_average": float(workshop.rating_average),
-                "total_reviews": workshop.total_reviews,
-                "images": workshop.images or [],
-                "certifications": workshop.certifications or [],
-                "years_in_business": workshop.years_in_business,
-                "is_active": workshop.is_active,
-                "is_verified": workshop.is_verified,
-                "created_at": workshop.created_at,
-                "distance_km": distance,
-                "estimated_travel_time_minutes": geo_service.estimate_travel_time(distance)
-            }
-            workshops_with_distance.append(workshop_dict)
+    # Convert to dictionaries (already sorted by distance)
+    workshops_with_distance = [
+        serialize_workshop(workshop, distance, travel_time)
+        for workshop, distance, travel_time in nearest
+    ]
     
-    # Sort by distance and limit results
-    workshops_with_distance.sort(key=lambda x: x['distance_km'])
-    return workshops_with_distance[:limit]
+    return workshops_with_distance
 
 # === GEOCODING ENDPOINTS ===
 
@@ -302,6 +293,11 @@ def reverse_geocode(
         )
     return location_info
 
+@router.get("/geocode/cache-stats", response_model=dict)
+def get_geocode_cache_stats():
+    """Hit/miss counters of the geocoding cache"""
+    return geocoding_cache.stats()
+
 # === DISTANCE CALCULATION ENDPOINTS ===
 
 @router.get("/distance")
@@ -338,11 +334,17 @@ def calculate_distance(
 # === UTILITY ENDPOINTS ===
 
 @router.get("/cities/puerto-rico")
-def get_puerto_rico_cities():
+def get_puerto_rico_cities(
+    all_municipalities: bool = Query(False, description="Return all 78 municipalities")
+):
     """Get coordinates of main cities in Puerto Rico"""
     
     geo_service = GeolocationService()
-    cities = geo_service.get_puerto_rico_coordinates()
+    
+    if all_municipalities:
+        cities = [(place["name"], place["latitude"], place["longitude"]) for place in pr_gazetteer.municipalities()]
+    else:
+        cities = geo_service.get_puerto_rico_coordinates()
     
     return [
         {
@@ -372,29 +374,18 @@ def search_by_services(
             detail="Invalid coordinates"
         )
     
-    # Bounding box
-    bbox = geo_service.get_bounding_box(request.latitude, request.longitude, request.radius_km)
+    # Only load workshops that can match the requested services
+    workshop_term_index.ensure_built(db)
+    if request.match_all_services:
+        service_ids = workshop_term_index.all_of("services", request.services)
+    else:
+        service_ids = workshop_term_index.any_of("services", request.services)
     
-    # Retrieve workshops in the area
-    workshops = db.query(Workshop).filter(
-        and_(
-            Workshop.is_active == True,
-            Workshop.latitude.between(bbox['min_lat'], bbox['max_lat']),
-            Workshop.longitude.between(bbox['min_lon'], bbox['max_lon']),
-            Workshop.latitude.isnot(None),
-            Workshop.longitude.isnot(None)
-        )
-    ).all()
-    
-    # Filter by distance
-    workshops_in_radius = []
-    for workshop in workshops:
-        distance = geo_service.calculate_distance(
-            request.latitude, request.longitude,
-            float(workshop.latitude), float(workshop.longitude)
-        )
-        if distance <= request.radius_km:
-            workshops_in_radius.append(workshop)
+    # Workshops within the radius, from the spatial index
+    nearby = _workshops_within_radius(db, request.latitude, request.longitude, request.radius_km,
+                                      only_ids=service_ids)
+    distances = {workshop.id: (distance, travel_time) for workshop, distance, travel_time in nearby}
+    workshops_in_radius = [workshop for workshop, _, _ in nearby]
     
     # Filter by services
     service_results = search_service.filter_by_services(
@@ -406,10 +397,7 @@ def search_by_services(
     # Create response
     results = []
     for workshop, metadata in service_results:
-        distance = geo_service.calculate_distance(
-            request.latitude, request.longitude,
-            float(workshop.latitude), float(workshop.longitude)
-        )
+        distance, travel_time = distances[workshop.id]
         
         result = {
             "id": workshop.id,
@@ -430,7 +418,7 @@ def search_by_services(
             "is_verified": workshop.is_verified,
             "years_in_business": workshop.years_in_business,
             "distance_km": distance,
-            "estimated_travel_time_minutes": geo_service.estimate_travel_time(distance),
+            "estimated_travel_time_minutes": travel_time,
             "matching_services": metadata["matching_services"],
             "search_score": metadata["total_matches"] * 10,
             "is_active": workshop.is_active,
@@ -460,29 +448,15 @@ def search_by_brand_specialty(
             detail="Invalid coordinates"
         )
     
-    # Bounding box
-    bbox = geo_service.get_bounding_box(request.latitude, request.longitude, request.radius_km)
-    
-    # Retrieve workshops
-    workshops = db.query(Workshop).filter(
-        and_(
-            Workshop.is_active == True,
-            Workshop.latitude.between(bbox['min_lat'], bbox['max_lat']),
-            Workshop.longitude.between(bbox['min_lon'], bbox['max_lon']),
-            Workshop.latitude.isnot(None),
-            Workshop.longitude.isnot(None)
-        )
-    ).all()
+    # Only load workshops with a matching specialty
+    workshop_term_index.ensure_built(db)
+    brand_ids = workshop_term_index.match("specialties", request.car_brand)
     
-    # Filter by distance
-    workshops_in_radius = []
-    for workshop in workshops:
-        distance = geo_service.calculate_distance(
-            request.latitude, request.longitude,
-            float(workshop.latitude), float(workshop.longitude)
-        )
-        if distance <= request.radius_km:
-            workshops_in_radius.append(workshop)
+    # Workshops within the radius, from the spatial index
+    nearby = _workshops_within_radius(db, request.latitude, request.longitude, request.radius_km,
+                                      only_ids=brand_ids)
+    distances = {workshop.id: (distance, travel_time) for workshop, distance, travel_time in nearby}
+    workshops_in_radius = [workshop for workshop, _, _ in nearby]
     
     # Filter by brand specialty
     specialty_results = search_service.filter_by_specialties(
@@ -493,10 +467,7 @@ def search_by_brand_specialty(
     # Create response
     results = []
     for workshop, metadata in specialty_results:
-        distance = geo_service.calculate_distance(
-            request.latitude, request.longitude,
-            float(workshop.latitude), float(workshop.longitude)
-        )
+        distance, travel_time = distances[workshop.id]
         
         result = {
             "id": workshop.id,
@@ -523,7 +494,7 @@ def search_by_brand_specialty(
             "is_verified": workshop.is_verified,
             "created_at": workshop.created_at,
             "distance_km": distance,
-            "estimated_travel_time_minutes": geo_service.estimate_travel_time(distance),
+            "estimated_travel_time_minutes": travel_time,
             "matching_specialties": metadata["matching_specialties"],
             "search_score": metadata["brand_matches"] * 15
         }
@@ -551,67 +522,56 @@ def search_open_now(
             detail="Invalid coordinates"
         )
     
-    # Bounding box
-    bbox = geo_service.get_bounding_box(request.latitude, request.longitude, request.radius_km)
+    # Workshops open at that moment, from the opening hours index
+    day_of_week, current_time = resolve_day_and_time(request.day_of_week, request.current_time)
+    opening_hours_index.ensure_built(db)
+    open_ids = opening_hours_index.open_at(day_of_week, current_time)
     
-    # Retrieve workshops
-    workshops = db.query(Workshop).filter(
-        and_(
-            Workshop.is_active == True,
-            Workshop.latitude.between(bbox['min_lat'], bbox['max_lat']),
-            Workshop.longitude.between(bbox['min_lon'], bbox['max_lon']),
-            Workshop.latitude.isnot(None),
-            Workshop.longitude.isnot(None)
-        )
-    ).all()
+    # Workshops within the radius, from the spatial index
+    nearby = _workshops_within_radius(db, request.latitude, request.longitude, request.radius_km,
+                                      only_ids=open_ids)
     
-    # Filter by distance and availability
+    # Filter by availability
     results = []
-    for workshop in workshops:
-        distance = geo_service.calculate_distance(
-            request.latitude, request.longitude,
-            float(workshop.latitude), float(workshop.longitude)
+    for workshop, distance, travel_time in nearby:
+        # Check availability
+        availability = search_service.check_workshop_availability(
+            workshop,
+            current_time,
+            day_of_week
         )
         
-        if distance <= request.radius_km:
-            # Check availability
-            availability = search_service.check_workshop_availability(
-                workshop,
-                request.current_time,
-                request.day_of_week
-            )
-            
-            # Only include if open
-            if availability["is_open_now"]:
-                result = {
-                    "id": workshop.id,
-                    "name": workshop.name,
-                    "description": workshop.description,
-                    "address": workshop.address,
-                    "city": workshop.city,
-                    "phone": workshop.phone,
-                    "latitude": float(workshop.latitude),
-                    "longitude": float(workshop.longitude),
-                    "services": workshop.services or [],
-                    "working_hours": workshop.working_hours or {},
-                    "rating_average": float(workshop.rating_average),
-                    "total_reviews": workshop.total_reviews,
-                    "is_verified": workshop.is_verified,
-                    "distance_km": distance,
-                    "estimated_travel_time_minutes": geo_service.estimate_travel_time(distance),
-                    "availability": availability,
-                    "search_score": 50 + (10 if workshop.is_verified else 0),  # Bonus for being open
-                    "state": workshop.state,
-                    "postal_code": workshop.postal_code,
-                    "email": workshop.email,
-                    "website": workshop.website,
-                    "working_hours": workshop.working_hours or {},
-                    "images": workshop.images or [],
-                    "certifications": workshop.certifications or [],
-                    "is_active": workshop.is_active,
-                    "created_at": workshop.created_at,
-                }
-                results.append(result)
+        # Only include if open
+        if availability["is_open_now"]:
+            result = {
+                "id": workshop.id,
+                "name": workshop.name,
+                "description": workshop.description,
+                "address": workshop.address,
+                "city": workshop.city,
+                "phone": workshop.phone,
+                "latitude": float(workshop.latitude),
+                "longitude": float(workshop.longitude),
+                "services": workshop.services or [],
+                "working_hours": workshop.working_hours or {},
+                "rating_average": float(workshop.rating_average),
+                "total_reviews": workshop.total_reviews,
+                "is_verified": workshop.is_verified,
+                "distance_km": distance,
+                "estimated_travel_time_minutes": travel_time,
+                "availability": availability,
+                "search_score": 50 + (10 if workshop.is_verified else 0),  # Bonus for being open
+                "state": workshop.state,
+                "postal_code": workshop.postal_code,
+                "email": workshop.email,
+                "website": workshop.website,
+                "working_hours": workshop.working_hours or {},
+                "images": workshop.images or [],
+                "certifications": workshop.certifications or [],
+                "is_active": workshop.is_active,
+                "created_at": workshop.created_at,
+            }
+            results.append(result)
     
     # Sort by distance
     results.sort(key=lambda x: x["distance_km"])
@@ -692,48 +652,53 @@ def advanced_geographic_search(
         
         search_lat, search_lon = coords
     
-    # Bounding box for optimized query
-    bbox = geo_service.get_bounding_box(search_lat, search_lon, search_params.radius_km)
-    
-    # Base query with basic filters
-    query = db.query(Workshop).filter(
-        and_(
-            Workshop.is_active == True,
-            Workshop.latitude.between(bbox['min_lat'], bbox['max_lat']),
-            Workshop.longitude.between(bbox['min_lon'], bbox['max_lon']),
-            Workshop.latitude.isnot(None),
-            Workshop.longitude.isnot(None)
-        )
-    )
-    
-    # Apply basic filters
+    # Basic filters
+    filters = []
     if search_params.min_rating is not None:
-        query = query.filter(Workshop.rating_average >= search_params.min_rating)
+        filters.append(Workshop.rating_average >= search_params.min_rating)
     
     if search_params.min_reviews is not None:
-        query = query.filter(Workshop.total_reviews >= search_params.min_reviews)
+        filters.append(Workshop.total_reviews >= search_params.min_reviews)
     
     if search_params.verified_only:
-        query = query.filter(Workshop.is_verified == True)
+        filters.append(Workshop.is_verified == True)
     
     if search_params.min_years_in_business is not None:
-        query = query.filter(Workshop.years_in_business >= search_params.min_years_in_business)
+        filters.append(Workshop.years_in_business >= search_params.min_years_in_business)
     
     if search_params.max_years_in_business is not None:
-        query = query.filter(Workshop.years_in_business <= search_params.max_years_in_business)
+        filters.append(Workshop.years_in_business <= search_params.max_years_in_business)
     
-    workshops = query.all()
-    
-    # Filter by exact distance
-    workshops_in_radius = []
-    for workshop in workshops:
-        distance = geo_service.calculate_distance(
-            search_lat, search_lon,
-            float(workshop.latitude), float(workshop.longitude)
+    # Narrow the candidates with the term index before loading any rows
+    workshop_term_index.ensure_built(db)
+    candidate_ids = workshop_term_index.all_of("services", search_params.required_services or [])
+    if search_params.car_brands or search_params.specializations:
+        specialty_ids = workshop_term_index.any_of(
+            "specialties", (search_params.car_brands or []) + (search_params.specializations or [])
         )
-        
-        if distance <= search_params.radius_km:
-            workshops_in_radius.append((workshop, {"distance_km": distance}))
+        candidate_ids = specialty_ids if candidate_ids is None else candidate_ids & specialty_ids
+    
+    # Workshops open at the requested (or current) time
+    if search_params.open_now:
+        day_of_week, time_of_day = resolve_day_and_time(search_params.day_of_week, search_params.time_of_day)
+        opening_hours_index.ensure_built(db)
+        open_ids = opening_hours_index.open_at(day_of_week, time_of_day)
+        candidate_ids = open_ids if candidate_ids is None else candidate_ids & open_ids
+    
+    # Workshops within the radius, from the spatial index
+    nearby = _workshops_within_radius(db, search_lat, search_lon, search_params.radius_km, *filters,
+                                      only_ids=candidate_ids)
+    if candidate_ids is None:
+        total_in_radius = len(nearby)
+    else:
+        in_radius_ids = [entry[0] for entry in workshop_spatial_index.within_radius(
+            search_lat, search_lon, search_params.radius_km
+        )]
+        total_in_radius = _count_workshops(db, in_radius_ids, *filters)
+    workshops_in_radius = [
+        (workshop, {"distance_km": distance, "estimated_travel_time_minutes": travel_time})
+        for workshop, distance, travel_time in nearby
+    ]
     
     # Apply advanced filters
     filtered_workshops = workshops_in_radius
@@ -792,69 +757,47 @@ def advanced_geographic_search(
         
         filtered_workshops = temp_filtered
     
-    # Calculate scores and create response
-    workshops_with_info = []
+    # Select the top max_results candidates before building any response dicts
+    sort_key = search_params.sort_by or "distance"
+    reverse_order = search_params.sort_order == "desc"
     search_params_dict = search_params.dict()
     
-    for workshop, metadata in filtered_workshops:
-        # Calculate travel time
-        travel_time = geo_service.estimate_travel_time(metadata["distance_km"])
-        
-        # Calculate relevance score
-        search_score = search_service.calculate_search_score(workshop, metadata, search_params_dict)
-        
-        workshop_info = {
-            "id": workshop.id,
-            "name": workshop.name,
-            "description": workshop.description,
-            "address": workshop.address,
-            "city": workshop.city,
-            "state": workshop.state,
-            "postal_code": workshop.postal_code,
-            "phone": workshop.phone,
-            "email": workshop.email,
-            "website": workshop.website,
-            "latitude": float(workshop.latitude),
-            "longitude": float(workshop.longitude),
-            "services": workshop.services or [],
-            "specialties": workshop.specialties or [],
-            "working_hours": workshop.working_hours or {},
-            "rating_average": float(workshop.rating_average),
-            "total_reviews": workshop.total_reviews,
-            "images": workshop.images or [],
-            "certifications": workshop.certifications or [],
-            "years_in_business": workshop.years_in_business,
-            "is_active": workshop.is_active,
-            "is_verified": workshop.is_verified,
-            "created_at": workshop.created_at,
-            "distance_km": metadata["distance_km"],
-            "estimated_travel_time_minutes": travel_time,
+    def search_score(workshop: WorkshopRow, metadata: Dict) -> float:
+        return search_service.calculate_search_score(workshop, metadata, search_params_dict)
+    
+    rank_keys = {
+        "distance": lambda entry: entry[1]["distance_km"],
+        "rating": lambda entry: float(entry[0].rating_average),
+        "reviews": lambda entry: entry[0].total_reviews,
+        "years": lambda entry: entry[0].years_in_business or 0,
+        "score": lambda entry: search_score(*entry)
+    }
+    # Unknown sort keys keep the distance order; score is always best first
+    top_workshops = top_k(
+        filtered_workshops,
+        search_params.max_results,
+        key=rank_keys.get(sort_key),
+        reverse=True if sort_key == "score" else reverse_order
+    )
+    
+    # Create response for the selected workshops
+    workshops_with_info = []
+    
+    for workshop, metadata in top_workshops:
+        workshop_info = serialize_workshop(
+            workshop,
+            metadata["distance_km"],
+            metadata["estimated_travel_time_minutes"]
+        )
+        workshop_info.update({
             "matching_services": metadata.get("matching_services", []),
             "matching_specialties": metadata.get("matching_specialties", []),
-            "search_score": search_score,
+            "search_score": search_score(workshop, metadata),
             "availability": metadata.get("availability")
-        }
+        })
         
         workshops_with_info.append(workshop_info)
     
-    # Sort results
-    sort_key = search_params.sort_by or "distance"
-    reverse_order = search_params.sort_order == "desc"
-    
-    if sort_key == "distance":
-        workshops_with_info.sort(key=lambda x: x["distance_km"], reverse=reverse_order)
-    elif sort_key == "rating":
-        workshops_with_info.sort(key=lambda x: x["rating_average"], reverse=reverse_order)
-    elif sort_key == "reviews":
-        workshops_with_info.sort(key=lambda x: x["total_reviews"], reverse=reverse_order)
-    elif sort_key == "years":
-        workshops_with_info.sort(key=lambda x: x["years_in_business"] or 0, reverse=reverse_order)
-    elif sort_key == "score":
-        workshops_with_info.sort(key=lambda x: x["search_score"], reverse=True)
-    
-    # Limit results
-    workshops_with_info = workshops_with_info[:search_params.max_results]
-    
     return {
         "workshops": workshops_with_info,
         "search_center": {"latitude": search_lat, "longitude": search_lon},
@@ -870,6 +813,6 @@ def advanced_geographic_search(
         "search_metadata": {
             "sort_by": sort_key,
             "sort_order": search_params.sort_order,
-            "total_workshops_in_radius": len(workshops_in_radius)
+            "total_workshops_in_radius": total_in_radius
         }
     }
@@ -14,6 +14,7 @@ from app.schemas.maintenance_schemas import (
     MaintenanceReport, MaintenanceStats
 )
 from app.api.deps import get_current_user
+from app.services.cost_rollup_service import CostRollupService, rollup_key
 
 router = APIRouter(prefix="/maintenance", tags=["maintenance"])
 
@@ -47,6 +48,7 @@ def create_maintenance_record(
     if record_data.mileage_at_service > vehicle.current_mileage:
         vehicle.current_mileage = record_data.mileage_at_service
     
+    CostRollupService(db).refresh([rollup_key(db_record)])
     db.commit()
     db.refresh(db_record)
     
@@ -174,9 +176,12 @@ def update_maintenance_record(
         )
     
     # Update fields
+    previous_key = rollup_key(record)
     for field, value in record_update.dict(exclude_unset=True).items():
         setattr(record, field, value)
     
+    # The record may have moved to another month or service type
+    CostRollupService(db).refresh([previous_key, rollup_key(record)])
     db.commit()
     db.refresh(record)
     return record
@@ -208,7 +213,9 @@ def delete_maintenance_record(
             detail="Access denied"
         )
     
+    key = rollup_key(record)
     db.delete(record)
+    CostRollupService(db).refresh([key])
     db.commit()
     
     return {"message": "Maintenance record deleted successfully"}
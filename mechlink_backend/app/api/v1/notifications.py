@@ -18,10 +18,21 @@ from app.schemas.notification_schemas import (
     ReminderScheduleRequest, TestNotificationRequest
 )
 from app.api.deps import get_current_user
-from app.services.notification_service import NotificationService
+from app.services.notification_service import NotificationService, STATS_BUCKETS
+from app.services.template_registry_service import template_registry
+from app.services.notification_retention_service import notification_retention
+from app.services.notification_dispatcher_service import notification_dispatcher
 
 router = APIRouter(prefix="/notifications", tags=["notificaciones"])
 
+def _validate_stats_bucket(bucket: Optional[str]) -> Optional[str]:
+    if bucket and bucket not in STATS_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid bucket. Use one of: {', '.join(STATS_BUCKETS)}"
+        )
+    return bucket
+
 # === USER NOTIFICATION ENDPOINTS ===
 
 @router.get("/", response_model=List[NotificationResponse])
@@ -134,13 +145,19 @@ def mark_all_notifications_read(
 
 @router.get("/stats/user", response_model=dict)
 def get_user_notification_stats(
+    bucket: Optional[str] = Query(None, description="Time buckets: hour, day or month"),
+    days: int = Query(30, ge=1, le=365, description="Days covered by the time buckets"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Retrieve user notification statistics"""
     
     notification_service = NotificationService(db)
-    stats = notification_service.get_notification_stats(current_user.id)
+    stats = notification_service.get_notification_stats(
+        current_user.id,
+        bucket=_validate_stats_bucket(bucket),
+        since=datetime.now() - timedelta(days=days)
+    )
     
     return stats
 
@@ -154,7 +171,7 @@ def get_notification_preferences(
     """Retrieve user notification preferences"""
     
     notification_service = NotificationService(db)
-    preferences = notification_service.get_user_preferences(current_user.id)
+    preferences = notification_service.get_or_create_user_preferences(current_user.id)
     
     return preferences
 
@@ -167,7 +184,7 @@ def update_notification_preferences(
     """Update user notification preferences"""
     
     notification_service = NotificationService(db)
-    preferences = notification_service.get_user_preferences(current_user.id)
+    preferences = notification_service.get_or_create_user_preferences(current_user.id)
     
     # Update fields
     update_data = preference_data.dict(exclude_unset=True)
@@ -176,6 +193,7 @@ def update_notification_preferences(
     
     db.commit()
     db.refresh(preferences)
+    notification_service.cache_user_preferences(preferences)
     
     return preferences
 
@@ -198,7 +216,8 @@ def send_notification(
         channel=notification_request.channel,
         title=notification_request.title,
         message=notification_request.message,
-        data=notification_request.data
+        data=notification_request.data,
+        priority=notification_request.priority.value
     )
     
     return notification
@@ -213,23 +232,24 @@ def send_bulk_notifications(
     """Send bulk notifications"""
     
     notification_service = NotificationService(db)
-    created_notifications = []
     
-    for user_id in bulk_request.user_ids:
-        try:
-            notification = notification_service.create_notification(
-                user_id=user_id,
-                notification_type=bulk_request.type,
-                channel=bulk_request.channel,
-                title=bulk_request.title,
-                message=bulk_request.message,
-                data=bulk_request.data,
-                scheduled_for=bulk_request.scheduled_for
-            )
-            if notification:
-                created_notifications.append(notification.id)
-        except Exception as e:
-            continue
+    # One batched insert; the outbox dispatcher delivers them
+    created_notifications = notification_service.create_bulk_notifications(
+        user_ids=bulk_request.user_ids,
+        notification_type=bulk_request.type,
+        channel=bulk_request.channel,
+        title=bulk_request.title,
+        message=bulk_request.message,
+        data=bulk_request.data,
+        scheduled_for=bulk_request.scheduled_for,
+        priority=bulk_request.priority.value
+    )
+    
+    if created_notifications and not bulk_request.scheduled_for:
+        # Run the per-minute dispatch job now instead of at its next minute; draining
+        # a large campaign here would hold a worker thread and this session for its duration
+        from app.main import scheduler
+        scheduler.modify_job('process_notifications', next_run_time=datetime.now())
     
     return {
         "message": f"Creadas {len(created_notifications)} notificaciones",
@@ -386,16 +406,30 @@ def send_maintenance_reminder(
 
 @router.get("/admin/stats", response_model=dict)
 def get_admin_notification_stats(
+    bucket: Optional[str] = Query(None, description="Time buckets: hour, day or month"),
+    days: int = Query(30, ge=1, le=365, description="Days covered by the time buckets"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Retrieve general statistics (admin)"""
     
     notification_service = NotificationService(db)
-    stats = notification_service.get_notification_stats()
+    stats = notification_service.get_notification_stats(
+        bucket=_validate_stats_bucket(bucket),
+        since=datetime.now() - timedelta(days=days)
+    )
     
     return stats
 
+@router.get("/admin/queues", response_model=dict)
+def get_admin_queue_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Dispatch queue depth, wait times, rate limits and circuit breakers per channel and priority (admin)"""
+    
+    return notification_dispatcher.stats(db)
+
 @router.post("/admin/process-scheduled")
 def process_scheduled_notifications(
     background_tasks: BackgroundTasks,
@@ -429,15 +463,20 @@ def retry_failed_notifications(
 @router.delete("/admin/cleanup")
 def cleanup_old_notifications(
     days_old: int = Query(90, ge=1, le=365, description="Days of age"),
+    archive: bool = Query(False, description="Write the deleted notifications to a gzip archive first"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Clean up old notifications (admin)"""
     
-    notification_service = NotificationService(db)
-    cleaned_count = notification_service.cleanup_old_notifications(days_old)
+    archive_path = notification_retention.default_archive_path() if archive else None
+    report = notification_retention.run(db, days_old=days_old, archive_path=archive_path)
     
-    return {"message": f"Deleted {cleaned_count} old notifications"}
+    return {
+        "message": f"Deleted {report['deleted']} old notifications",
+        "chunks": report["chunks"],
+        "archive_path": report["archive_path"]
+    }
 
 # === TEMPLATE ENDPOINTS ===
 
@@ -470,4 +509,7 @@ def create_notification_template(
     db.commit()
     db.refresh(template)
     
+    # Compile the new template for the senders
+    template_registry.refresh()
+    
     return template
\ No newline at end of file
@@ -1,7 +1,8 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, and_, or_
-from typing import List, Optional
+from typing import List, Optional, Set
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from pydantic import BaseModel
@@ -15,9 +16,23 @@ from app.schemas.workshop_schemas import (
     WorkshopStats
 )
 from app.api.deps import get_current_user
+from app.services.spatial_index_service import workshop_spatial_index
+from app.services.term_index_service import workshop_term_index
+from app.services.opening_hours_service import opening_hours_index, resolve_day_and_time
+from app.services.map_cluster_service import MAP_MARKER_COLUMNS, cluster_rows, workshop_cluster_index
 
 router = APIRouter(prefix="/workshops", tags=["workshops"])
 
+# Ids bound per IN (...) query, well below SQLite's bound parameter limit
+ID_CHUNK_SIZE = 500
+
+def _sync_workshop_indexes(workshop: Workshop):
+    """Keep the in-memory search indexes in step with a workshop write"""
+    workshop_spatial_index.upsert(workshop)
+    workshop_term_index.upsert(workshop)
+    opening_hours_index.upsert(workshop)
+    workshop_cluster_index.invalidate()
+
 # === OPTIMIZED SCHEMAS FOR MAPS ===
 
 class WorkshopMapMarker(BaseModel):
@@ -43,13 +58,76 @@ class MapBounds(BaseModel):
     east: float   # -65.6
     west: float   # -67.2
 
+class MapCluster(BaseModel):
+    """Several nearby workshops drawn as a single marker"""
+    id: str
+    latitude: float  # Centroid of the workshops
+    longitude: float
+    count: int
+    best_rating: float = 0.0
+    best_workshop_id: str
+    bounds: MapBounds
+
 class WorkshopMapResponse(BaseModel):
     """Optimized response for maps"""
     workshops: List[WorkshopMapMarker]
+    clusters: List[MapCluster] = []
     total_in_area: int
+    zoom: Optional[int] = None
     bounds_used: Optional[MapBounds] = None
     filters_applied: dict = {}
 
+def _get_marker_color(rating: float, reviews: int) -> str:
+    """Determine marker color based on quality"""
+    if reviews == 0:
+        return "gray"
+    elif rating >= 4.5:
+        return "green"
+    elif rating >= 4.0:
+        return "blue"
+    elif rating >= 3.0:
+        return "yellow"
+    else:
+        return "red"
+
+def _build_map_marker(workshop, open_ids: Optional[Set[str]]) -> WorkshopMapMarker:
+    """
+    Marker for a workshop row (full model or MAP_MARKER_COLUMNS projection)
+    open_ids: workshops open right now, or None when opening status was not requested
+    """
+    # Count services
+    services_count = 0
+    if workshop.specialties:
+        try:
+            if isinstance(workshop.specialties, str):
+                specialties = json.loads(workshop.specialties)
+            else:
+                specialties = workshop.specialties
+            services_count += len(specialties) if specialties else 0
+        except:
+            # If not valid JSON, count as 1 service
+            services_count = 1
+    
+    # Determine if open from the workshop's real hours
+    is_open = workshop.id in open_ids if open_ids is not None else None
+    
+    return WorkshopMapMarker(
+        id=workshop.id,
+        name=workshop.name,
+        latitude=float(workshop.latitude),
+        longitude=float(workshop.longitude),
+        rating=float(workshop.rating_average or 0),
+        total_reviews=workshop.total_reviews or 0,
+        services_count=services_count,
+        is_open=is_open,
+        city=workshop.city,
+        phone=workshop.phone,
+        marker_color=_get_marker_color(
+            float(workshop.rating_average or 0), 
+            workshop.total_reviews or 0
+        )
+    )
+
 # === SPECIFIC ENDPOINTS (SHOULD COME FIRST) ===
 
 @router.get("/map-config")
@@ -89,6 +167,38 @@ def get_map_configuration():
         }
         }
 
+def _rows_with_ids(query, workshop_ids: Optional[Set[str]], limit: Optional[int] = None) -> List:
+    """
+    Rows of the query restricted to workshop_ids (None for no restriction)
+    The ids are bound ID_CHUNK_SIZE at a time, so a broad match never exceeds
+    the database's bound parameter limit; with a limit, stops once that many rows were found
+    """
+    if workshop_ids is None:
+        return query.all() if limit is None else query.limit(limit).all()
+    
+    ids = sorted(workshop_ids)
+    rows = []
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        chunk_query = query.filter(Workshop.id.in_(ids[start:start + ID_CHUNK_SIZE]))
+        if limit is not None:
+            chunk_query = chunk_query.limit(limit - len(rows))
+        rows.extend(chunk_query.all())
+        if limit is not None and len(rows) >= limit:
+            break
+    return rows
+
+def _map_clusters(db: Session, zoom: int, area: Optional[MapBounds], rows: Optional[List] = None):
+    """
+    Map cells at a zoom level: clustered on the fly from filtered rows, otherwise
+    from the precomputed levels (cells straddling the area's edge only count the
+    workshops inside it)
+    """
+    if rows is not None:
+        return cluster_rows(rows, zoom)
+    if area:
+        return workshop_cluster_index.in_area(db, zoom, area.north, area.south, area.east, area.west)
+    return workshop_cluster_index.level(db, zoom)
+
 @router.get("/for-map", response_model=WorkshopMapResponse)
 def get_workshops_for_map(
     # Geographic filters
@@ -113,16 +223,18 @@ def get_workshops_for_map(
     
     # Pagination and limits
     limit: int = Query(100, ge=1, le=200, description="Maximum number of markers"),
+    zoom: Optional[int] = Query(None, ge=0, le=20, description="Map zoom; groups nearby markers into clusters"),
     
     db: Session = Depends(get_db)
 ):
     """
     Optimized endpoint to display workshops on maps.
     Returns only essential information for markers.
+    With zoom, every workshop in the area is returned as a marker or part of a cluster;
+    when they would not fit in limit, coarser zoom levels are used (the response's zoom
+    is the level used).
     """
     
-    import json
-    
     # Base query
     query = db.query(Workshop).filter(Workshop.is_active == True)
     
@@ -143,10 +255,13 @@ def get_workshops_for_map(
                     )
                 )
                 bounds_used = MapBounds(north=north, south=south, east=east, west=west)
+                area = bounds_used
             else:
                 bounds_used = None
+                area = None
         except:
             bounds_used = None
+            area = None
     
     # Option 2: Use center + radius (circular search)
     elif center_lat and center_lng and radius_km:
@@ -166,39 +281,46 @@ def get_workshops_for_map(
             )
         )
         bounds_used = None
+        area = MapBounds(
+            north=center_lat + lat_delta, south=center_lat - lat_delta,
+            east=center_lng + lng_delta, west=center_lng - lng_delta
+        )
     else:
         bounds_used = None
+        area = None
     
     # === SERVICE FILTERS ===
     
-    if service:
-        # Search in specialties (as a string or list)
-        query = query.filter(
-            or_(
-                Workshop.specialties.like(f'%"{service}"%'),
-                Workshop.specialties.like(f'%{service}%')
-            )
-        )
+    # Matched against specialty names through the term index
+    specialty_ids = None
+    if service or services or specialty:
+        workshop_term_index.ensure_built(db)
+        
+        if service:
+            specialty_ids = workshop_term_index.match("specialties", service)
+        
+        if services:
+            # Multiple services separated by commas
+            service_list = [s.strip() for s in services.split(',')]
+            matches = workshop_term_index.any_of("specialties", service_list)
+            specialty_ids = matches if specialty_ids is None else specialty_ids & matches
+        
+        if specialty:
+            matches = workshop_term_index.match("specialties", specialty)
+            specialty_ids = matches if specialty_ids is None else specialty_ids & matches
     
-    if services:
-        # Multiple services separated by commas
-        service_list = [s.strip() for s in services.split(',')]
-        service_conditions = []
-        for srv in service_list:
-            service_conditions.extend([
-                Workshop.specialties.like(f'%"{srv}"%'),
-                Workshop.specialties.like(f'%{srv}%')
-            ])
-        if service_conditions:
-            query = query.filter(or_(*service_conditions))
-    
-    if specialty:
-        query = query.filter(
-            or_(
-                Workshop.specialties.like(f'%"{specialty}"%'),
-                Workshop.specialties.like(f'%{specialty}%')
-            )
-        )
+    # Applied to the query in chunks when it runs
+    allowed_ids = specialty_ids
+    
+    # === OPERATIONAL FILTERS ===
+    
+    open_ids = None
+    if open_now is not None:
+        opening_hours_index.ensure_built(db)
+        open_ids = opening_hours_index.open_at(*resolve_day_and_time())
+        
+        if open_now:
+            allowed_ids = open_ids if allowed_ids is None else allowed_ids & open_ids
     
     # === QUALITY FILTERS ===
     
@@ -216,66 +338,7 @@ def get_workshops_for_map(
     if city:
         query = query.filter(Workshop.city.ilike(f"%{city}%"))
     
-    # === EXECUTE QUERY ===
-    
-    workshops = query.limit(limit).all()
-    
-    # === CONVERT TO MAP FORMAT ===
-    
-    def get_marker_color(rating: float, reviews: int) -> str:
-        """Determine marker color based on quality"""
-        if reviews == 0:
-            return "gray"
-        elif rating >= 4.5:
-            return "green"
-        elif rating >= 4.0:
-            return "blue"
-        elif rating >= 3.0:
-            return "yellow"
-        else:
-            return "red"
-    
-    map_markers = []
-    for workshop in workshops:
-        # Count services
-        services_count = 0
-        if workshop.specialties:
-            try:
-                if isinstance(workshop.specialties, str):
-                    specialties = json.loads(workshop.specialties)
-                else:
-                    specialties = workshop.specialties
-                services_count += len(specialties) if specialties else 0
-            except:
-                # If not valid JSON, count as 1 service
-                services_count = 1
-        
-        # Determine if open (simplified logic)
-        is_open = None
-        if open_now is not None:
-            # Basic business hours: 8 AM - 6 PM
-            current_hour = datetime.now().hour
-            is_open = 8 <= current_hour <= 18
-        
-        marker = WorkshopMapMarker(
-            id=workshop.id,
-            name=workshop.name,
-            latitude=float(workshop.latitude),
-            longitude=float(workshop.longitude),
-            rating=float(workshop.rating_average or 0),
-            total_reviews=workshop.total_reviews or 0,
-            services_count=services_count,
-            is_open=is_open,
-            city=workshop.city,
-            phone=workshop.phone,
-            marker_color=get_marker_color(
-                float(workshop.rating_average or 0), 
-                workshop.total_reviews or 0
-            )
-        )
-        map_markers.append(marker)
-    
-    # === PREPARE RESPONSE ===
+    # === CLUSTERED MODE ===
     
     filters_applied = {}
     if service: filters_applied["service"] = service
@@ -283,6 +346,58 @@ def get_workshops_for_map(
     if city: filters_applied["city"] = city
     if min_rating: filters_applied["min_rating"] = min_rating
     if verified_only: filters_applied["verified_only"] = True
+    if open_now: filters_applied["open_now"] = True
+    
+    if zoom is not None:
+        rows = None
+        if specialty or min_reviews or filters_applied:
+            # Filtered views are clustered on the fly from a projected query
+            rows = _rows_with_ids(query.with_entities(*MAP_MARKER_COLUMNS).filter(
+                Workshop.latitude.isnot(None),
+                Workshop.longitude.isnot(None)
+            ), allowed_ids)
+        
+        # Bounded payload: zoom out until the markers and clusters fit in the limit
+        cells = _map_clusters(db, zoom, area, rows)
+        while len(cells) > limit and zoom > 0:
+            zoom -= 1
+            cells = _map_clusters(db, zoom, area, rows)
+        
+        map_markers = []
+        clusters = []
+        for (row, col), cell in sorted(cells.items()):
+            if cell["count"] == 1:
+                map_markers.append(_build_map_marker(cell["row"], open_ids))
+                continue
+            
+            clusters.append(MapCluster(
+                id=f"{zoom}:{row}:{col}",
+                latitude=cell["latitude"],
+                longitude=cell["longitude"],
+                count=cell["count"],
+                best_rating=cell["best_rating"],
+                best_workshop_id=cell["best_workshop_id"],
+                bounds=MapBounds(north=cell["north"], south=cell["south"], east=cell["east"], west=cell["west"])
+            ))
+        
+        return WorkshopMapResponse(
+            workshops=map_markers,
+            clusters=clusters,
+            total_in_area=sum(cell["count"] for cell in cells.values()),
+            zoom=zoom,
+            bounds_used=bounds_used,
+            filters_applied=filters_applied
+        )
+    
+    # === EXECUTE QUERY ===
+    
+    workshops = _rows_with_ids(query, allowed_ids, limit)
+    
+    # === CONVERT TO MAP FORMAT ===
+    
+    map_markers = [_build_map_marker(workshop, open_ids) for workshop in workshops]
+    
+    # === PREPARE RESPONSE ===
     
     return WorkshopMapResponse(
         workshops=map_markers,
@@ -320,6 +435,7 @@ def create_workshop(
     db.add(db_workshop)
     db.commit()
     db.refresh(db_workshop)
+    _sync_workshop_indexes(db_workshop)
     
     return db_workshop
 
@@ -393,6 +509,7 @@ def update_workshop(
     
     db.commit()
     db.refresh(workshop)
+    _sync_workshop_indexes(workshop)
     
     return workshop
 
@@ -493,5 +610,6 @@ def create_workshop_review(
     
     db.commit()
     db.refresh(db_review)
+    _sync_workshop_indexes(workshop)
     
     return db_review
\ No newline at end of file
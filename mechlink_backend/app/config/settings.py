@@ -20,5 +20,69 @@ class Settings(BaseSettings):
     EMAIL_HOST_PASSWORD: str = "fqul mink zxep segl"  # App password of Gmail
     EMAIL_USE_TLS: bool = True
     EMAIL_FROM: str = "MechLink <tu-email@gmail.com>"
+    
+    # Pooled SMTP sessions reused across emails (one per email dispatcher worker)
+    SMTP_POOL_SIZE: int = 4
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+    SMTP_IDLE_TIMEOUT_SECONDS: int = 60
+    SMTP_TIMEOUT_SECONDS: int = 30
+    
+    # Notification outbox dispatcher
+    NOTIFICATION_DISPATCH_BATCH_SIZE: int = 200
+    NOTIFICATION_LEASE_SECONDS: int = 300
+    NOTIFICATION_EMAIL_WORKERS: int = 4
+    NOTIFICATION_SMS_WORKERS: int = 2
+    NOTIFICATION_PUSH_WORKERS: int = 2
+    NOTIFICATION_IN_APP_WORKERS: int = 1
+    # Provider send quotas per second (0 disables the limit)
+    NOTIFICATION_EMAIL_RATE_PER_SECOND: float = 10
+    NOTIFICATION_SMS_RATE_PER_SECOND: float = 5
+    NOTIFICATION_PUSH_RATE_PER_SECOND: float = 50
+    # Later than this, the catch-up policy of the notification type applies
+    NOTIFICATION_CATCHUP_GRACE_MINUTES: int = 5
+    
+    # Failed sends are retried after base * 2^(attempt - 1) seconds (jittered, capped)
+    NOTIFICATION_RETRY_BASE_SECONDS: int = 60
+    NOTIFICATION_RETRY_MAX_SECONDS: int = 3600
+    
+    # Per-channel circuit breaker: dispatch of a channel pauses for the cooldown when
+    # at least FAILURE_RATE of its last MIN_REQUESTS+ sends in the window failed
+    NOTIFICATION_BREAKER_FAILURE_RATE: float = 0.5
+    NOTIFICATION_BREAKER_MIN_REQUESTS: int = 10
+    NOTIFICATION_BREAKER_WINDOW_SECONDS: int = 60
+    NOTIFICATION_BREAKER_COOLDOWN_SECONDS: int = 120
+    
+    # Per-user notification preferences kept in memory
+    NOTIFICATION_PREFERENCE_CACHE_SIZE: int = 10000
+    NOTIFICATION_PREFERENCE_CACHE_TTL_SECONDS: int = 300
+    
+    # Compiled notification templates are reloaded at most this often
+    NOTIFICATION_TEMPLATE_REFRESH_SECONDS: int = 300
+    
+    # Notification cleanup: rows deleted per transaction, pause between chunks
+    # so other writers get the database, and where archives are written
+    NOTIFICATION_RETENTION_BATCH_SIZE: int = 500
+    NOTIFICATION_RETENTION_PAUSE_SECONDS: float = 0.05
+    NOTIFICATION_ARCHIVE_DIR: str = "archives"
+    
+    # Per-user analytics results kept in memory, dropped when the user's data changes
+    ANALYTICS_CACHE_SIZE: int = 2048
+    ANALYTICS_CACHE_TTL_SECONDS: int = 600
+    
+    # Cost forecasts are fitted nightly on this many complete months of history
+    ANALYTICS_FORECAST_HISTORY_MONTHS: int = 24
+    ANALYTICS_FORECAST_HOUR: int = 3
+    
+    # In-memory workshop indexes (search, opening hours, map clusters) compare the
+    # workshops table with the version they were built from at most this often
+    WORKSHOP_INDEX_CHECK_SECONDS: int = 30
+    
+    # Geocoding cache
+    GEOCODE_CACHE_SIZE: int = 2048
+    GEOCODE_CACHE_TTL_DAYS: int = 30
+    GEOCODE_NEGATIVE_TTL_HOURS: int = 6
+    
+    # Nominatim usage policy: at most 1 request per second
+    NOMINATIM_REQUESTS_PER_SECOND: float = 1.0
 
 settings = Settings()
\ No newline at end of file
@@ -2,14 +2,15 @@ from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from app.api.v1 import notifications
-from app.config.database import Base, engine, get_db
+from app.config.database import Base, engine, get_db, upgrade_schema
 from app.config.settings import settings
-from app.api.v1 import users, vehicles, auth, maintenance, workshops, appointments, geographic
+from app.api.v1 import users, vehicles, auth, maintenance, workshops, appointments, geographic, analytics
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.background import BackgroundScheduler
 
 # Create the tables in the database
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 def process_scheduled_notifications():
     """Process scheduled notifications every minute"""
@@ -23,21 +24,119 @@ def process_scheduled_notifications():
     except Exception as e:
         print(f"Error processing notifications: {e}")
 
+def purge_geocode_cache():
+    """Delete expired geocoding cache rows once a day"""
+    from app.services.geocoding_cache_service import geocoding_cache
+    
+    try:
+        geocoding_cache.purge_expired()
+    except Exception as e:
+        print(f"Error purging geocode cache: {e}")
+
+def build_search_indexes():
+    """Load the in-memory workshop search indexes"""
+    from app.config.database import SessionLocal
+    from app.services.spatial_index_service import workshop_spatial_index
+    from app.services.term_index_service import workshop_term_index
+    from app.services.opening_hours_service import opening_hours_index
+    
+    db = SessionLocal()
+    try:
+        workshop_spatial_index.build(db)
+        workshop_term_index.build(db)
+        opening_hours_index.build(db)
+    except Exception as e:
+        print(f"Error building search indexes: {e}")
+    finally:
+        db.close()
+
+def backfill_cost_rollups():
+    """Build the maintenance cost rollups on the first start after they were introduced"""
+    from app.config.database import SessionLocal
+    from app.models.maintenance import MaintenanceRecord
+    from app.services.cost_rollup_service import CostRollupService
+    
+    db = SessionLocal()
+    try:
+        rollups = CostRollupService(db)
+        if rollups.is_empty() and db.query(MaintenanceRecord.id).first() is not None:
+            rollups.rebuild()
+    except Exception as e:
+        print(f"Error building cost rollups: {e}")
+    finally:
+        db.close()
+
+def precompute_cost_forecasts():
+    """Fit and store the cost forecasts of every user"""
+    from app.config.database import SessionLocal
+    from app.services.forecasting_service import CostForecastingService
+    
+    db = SessionLocal()
+    try:
+        CostForecastingService(db, history_months=settings.ANALYTICS_FORECAST_HISTORY_MONTHS).run()
+    except Exception as e:
+        print(f"Error computing cost forecasts: {e}")
+    finally:
+        db.close()
+
+def has_cost_forecasts() -> bool:
+    from app.config.database import SessionLocal
+    from app.services.forecasting_service import CostForecastingService
+    
+    db = SessionLocal()
+    try:
+        return CostForecastingService(db).has_forecasts()
+    finally:
+        db.close()
+
+def stop_notification_delivery():
+    """Stop the notification workers and close the pooled SMTP sessions on shutdown"""
+    from app.services.notification_dispatcher_service import notification_dispatcher
+    from app.services.smtp_pool_service import smtp_pool
+    
+    try:
+        notification_dispatcher.shutdown()
+        smtp_pool.close_all()
+    except Exception as e:
+        print(f"Error stopping notification delivery: {e}")
+
 # Scheduler
 scheduler = BackgroundScheduler()
 scheduler.add_job(
     process_scheduled_notifications, 
     'interval', 
     minutes=1,
-    id='process_notifications'
+    id='process_notifications',
+    coalesce=True,
+    max_instances=1
+)
+scheduler.add_job(
+    purge_geocode_cache,
+    'interval',
+    hours=24,
+    id='purge_geocode_cache'
+)
+scheduler.add_job(
+    precompute_cost_forecasts,
+    'cron',
+    hour=settings.ANALYTICS_FORECAST_HOUR,
+    id='precompute_cost_forecasts',
+    coalesce=True,
+    max_instances=1
 )
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    build_search_indexes()
+    backfill_cost_rollups()
+    if not has_cost_forecasts():
+        # First forecasts in the background instead of waiting for the night
+        scheduler.add_job(precompute_cost_forecasts, id='initial_cost_forecasts')
     scheduler.start()
     print("📅 Notification scheduler started")
     yield
     scheduler.shutdown()
+    stop_notification_delivery()
     print("📅 Notification scheduler stopped")
 
 app = FastAPI(
@@ -79,6 +178,7 @@ app.include_router(workshops.router, prefix="/api/v1")
 app.include_router(appointments.router, prefix="/api/v1")
 app.include_router(geographic.router, prefix="/api/v1")
 app.include_router(notifications.router, prefix="/api/v1")
+app.include_router(analytics.router, prefix="/api/v1")
 
 @app.get("/")
 def read_root():
@@ -1,14 +1,20 @@
 from .user import User
 from .vehicle import Vehicle
-from .maintenance import MaintenanceRecord, MaintenanceReminder
+from .maintenance import MaintenanceRecord, MaintenanceReminder, MaintenanceCostRollup
 from .workshop import Workshop, Appointment, WorkshopReview
+from .geocoding import GeocodeCacheEntry, GeocodeCheckpoint
+from .forecast import CostForecast
 
 __all__ = [
     "User", 
     "Vehicle", 
     "MaintenanceRecord", 
     "MaintenanceReminder",
+    "MaintenanceCostRollup",
     "Workshop", 
     "Appointment", 
-    "WorkshopReview"
+    "WorkshopReview",
+    "GeocodeCacheEntry",
+    "GeocodeCheckpoint",
+    "CostForecast"
 ]
\ No newline at end of file
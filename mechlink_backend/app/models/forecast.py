@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Numeric, Date, Float, JSON, Index
+from sqlalchemy.sql import func
+import uuid
+from app.config.database import Base
+
+class CostForecast(Base):
+    """Precomputed cost forecast of a user (vehicle_id NULL) or one of their vehicles"""
+    __tablename__ = "cost_forecasts"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    vehicle_id = Column(String, ForeignKey("vehicles.id"), nullable=True)
+    
+    # Predictions
+    predicted_monthly_cost = Column(Numeric(12, 2), nullable=False)
+    predicted_yearly_cost = Column(Numeric(12, 2), nullable=False)
+    monthly_trend = Column(Numeric(12, 2), nullable=False)  # Change of the monthly cost per month
+    next_maintenance_cost = Column(Numeric(10, 2), nullable=True)
+    next_maintenance_date = Column(Date, nullable=True)
+    predicted_monthly_mileage = Column(Integer, nullable=True)
+    
+    # Per service category forecasts (user rows only) and recommendations
+    category_forecasts = Column(JSON, nullable=True)
+    recommendations = Column(JSON, nullable=True)
+    
+    confidence_score = Column(Float, nullable=False, default=0)
+    generated_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_cost_forecasts_user_vehicle", "user_id", "vehicle_id"),
+    )
+    
+    def __repr__(self):
+        return f"<CostForecast(user_id='{self.user_id}', vehicle_id='{self.vehicle_id}', monthly={self.predicted_monthly_cost})>"
@@ -0,0 +1,46 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text, Numeric, Boolean, JSON, ForeignKey
+from sqlalchemy.sql import func
+from app.config.database import Base
+
+class GeocodeCacheEntry(Base):
+    __tablename__ = "geocode_cache"
+    
+    # Normalized lookup key, e.g. "fwd:calle loiza 123|san juan" or "rev:18.46550,-66.10570"
+    key = Column(String(300), primary_key=True)
+    
+    # Result (null payload for negative entries)
+    found = Column(Boolean, nullable=False, default=True)
+    payload = Column(JSON, nullable=True)
+    
+    # Expiration
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<GeocodeCacheEntry(key='{self.key}', found={self.found})>"
+
+class GeocodeCheckpoint(Base):
+    __tablename__ = "geocode_checkpoints"
+    
+    # One row per workshop processed by the batch geocoder
+    workshop_id = Column(String, ForeignKey("workshops.id"), primary_key=True)
+    status = Column(String(20), nullable=False, index=True)  # geocoded, city_fallback, failed
+    
+    # Result
+    latitude = Column(Numeric(10, 8), nullable=True)
+    longitude = Column(Numeric(11, 8), nullable=True)
+    backend = Column(String(30), nullable=True)
+    
+    # Attempts and errors
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<GeocodeCheckpoint(workshop_id='{self.workshop_id}', status='{self.status}')>"
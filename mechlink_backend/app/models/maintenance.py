@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Numeric, Date, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Numeric, Date, Boolean, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -25,6 +25,11 @@ class MaintenanceRecord(Base):
     # Relationships
     vehicle = relationship("Vehicle", back_populates="maintenance_records")
     
+    # Per-vehicle date ranges (cost rollup refreshes and reads)
+    __table_args__ = (
+        Index("ix_maintenance_records_vehicle_service_date", "vehicle_id", "service_date"),
+    )
+    
     def __repr__(self):
         return f"<MaintenanceRecord(vehicle_id='{self.vehicle_id}', service='{self.service_type}', date='{self.service_date}')>"
 
@@ -47,4 +52,34 @@ class MaintenanceReminder(Base):
     user = relationship("User")
     
     def __repr__(self):
-        return f"<MaintenanceReminder(vehicle_id='{self.vehicle_id}', service='{self.service_type}')>"
\ No newline at end of file
+        return f"<MaintenanceReminder(vehicle_id='{self.vehicle_id}', service='{self.service_type}')>"
+
+class MaintenanceCostRollup(Base):
+    """Monthly maintenance cost totals per vehicle and service type (kept by CostRollupService)"""
+    __tablename__ = "maintenance_cost_rollups"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    vehicle_id = Column(String, ForeignKey("vehicles.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    service_type = Column(String(100), nullable=False)
+    
+    # SUM(cost), COUNT(*) and MAX(service_date) of the group's records
+    total_cost = Column(Numeric(12, 2), nullable=True)  # NULL when no record has a cost
+    transaction_count = Column(Integer, nullable=False, default=0)
+    last_service_date = Column(Date, nullable=False)
+    
+    # Most expensive record of the group
+    max_cost = Column(Numeric(10, 2), nullable=True)
+    max_cost_date = Column(Date, nullable=True)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("vehicle_id", "year", "month", "service_type", name="uq_maintenance_cost_rollup_group"),
+        Index("ix_maintenance_cost_rollups_user_month", "user_id", "year", "month"),
+    )
+    
+    def __repr__(self):
+        return f"<MaintenanceCostRollup(vehicle_id='{self.vehicle_id}', month='{self.year}-{self.month:02d}', service='{self.service_type}')>"
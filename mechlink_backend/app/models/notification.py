@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, JSON, ForeignKey, Enum
+from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, JSON, ForeignKey, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -24,6 +24,7 @@ class NotificationStatus(enum.Enum):
     DELIVERED = "delivered"
     FAILED = "failed"
     READ = "read"
+    EXPIRED = "expired"
 
 class NotificationChannel(enum.Enum):
     """Notification channels"""
@@ -68,6 +69,11 @@ class Notification(Base):
     attempts = Column(Integer, default=0)
     max_attempts = Column(Integer, default=3)
     last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # When a failed notification is retried
+    
+    # Outbox lease: the dispatcher that claimed the row and until when
+    claimed_by = Column(String(64), nullable=True)
+    lease_until = Column(DateTime, nullable=True)
     
     # Metadata
     priority = Column(String(10), default="normal")  # low, normal, high, urgent
@@ -83,6 +89,13 @@ class Notification(Base):
     workshop = relationship("Workshop")
     vehicle = relationship("Vehicle")
     
+    # Due-time and retry lookups of the dispatcher, and per-user stats served from the index alone
+    __table_args__ = (
+        Index("ix_notifications_status_scheduled_for", "status", "scheduled_for"),
+        Index("ix_notifications_user_stats", "user_id", "status", "type", "channel"),
+        Index("ix_notifications_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+    
     def __repr__(self):
         return f"<Notification(type='{self.type}', user='{self.user_id}', status='{self.status}')>"
 
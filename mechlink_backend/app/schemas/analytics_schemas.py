@@ -129,6 +129,14 @@ class ExpenseReport(BaseModel):
     
     generated_at: datetime
 
+class CategoryForecast(BaseModel):
+    """Spending forecast of one service category"""
+    category: str
+    predicted_monthly_cost: Decimal
+    predicted_yearly_cost: Decimal
+    monthly_trend: Decimal  # Change of the monthly cost per month
+    confidence_score: float = Field(..., ge=0, le=1)
+
 class PredictiveAnalytics(BaseModel):
     """Analytics predictive"""
     user_id: str
@@ -139,6 +147,9 @@ class PredictiveAnalytics(BaseModel):
     predicted_yearly_cost: Decimal
     next_maintenance_cost: Optional[Decimal] = None
     next_maintenance_date: Optional[date] = None
+    monthly_trend: Optional[Decimal] = None
+    predicted_monthly_mileage: Optional[int] = None
+    category_forecasts: List[CategoryForecast] = []
     
     # Recommendations
     recommendations: List[str] = []
@@ -22,6 +22,7 @@ class NotificationStatusEnum(str, Enum):
     DELIVERED = "delivered"
     FAILED = "failed"
     READ = "read"
+    EXPIRED = "expired"
 
 class NotificationChannelEnum(str, Enum):
     EMAIL = "email"
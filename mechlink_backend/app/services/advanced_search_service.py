@@ -6,6 +6,8 @@ from sqlalchemy import and_, or_, func
 
 from app.models.workshop import Workshop
 from app.services.geolocation_service import GeolocationService
+from app.services.term_index_service import workshop_term_index
+from app.services.opening_hours_service import opening_hours_index, parse_minutes, resolve_day_and_time
 
 class AdvancedSearchService:
     """Service for advanced workshop searches"""
@@ -30,13 +32,8 @@ class AdvancedSearchService:
                 "next_open_time": None
             }
         
-        # Get current day if not provided
-        if not day_of_week:
-            day_of_week = datetime.now().strftime('%A').lower()
-        
-        # Get current time if not provided
-        if not current_time:
-            current_time = datetime.now().strftime('%H:%M')
+        # Get current day and time if not provided
+        day_of_week, current_time = resolve_day_and_time(day_of_week, current_time)
         
         # Get schedules of the day
         today_schedule = workshop.working_hours.get(day_of_week)
@@ -51,25 +48,11 @@ class AdvancedSearchService:
                 "next_open_time": self._get_next_open_time(workshop.working_hours, day_of_week)
             }
         
-        # Parse schedules (format: "8:00-17:00")
-        try:
-            open_time, close_time = today_schedule.split('-')
-            open_hour = datetime.strptime(open_time.strip(), '%H:%M').time()
-            close_hour = datetime.strptime(close_time.strip(), '%H:%M').time()
-            current_hour = datetime.strptime(current_time, '%H:%M').time()
-            
-            is_open_now = open_hour <= current_hour <= close_hour
-            
-            return {
-                "is_open_now": is_open_now,
-                "is_open_today": True,
-                "today_hours": today_schedule,
-                "opens_at": open_time.strip(),
-                "closes_at": close_time.strip(),
-                "next_open_time": None if is_open_now else open_time.strip()
-            }
-            
-        except (ValueError, AttributeError):
+        # Schedules (format: "8:00-17:00") are parsed once per workshop write
+        schedule = opening_hours_index.compiled_for(workshop).days.get(day_of_week)
+        current_minute = parse_minutes(current_time)
+        
+        if schedule is None or current_minute is None:
             return {
                 "is_open_now": False,
                 "is_open_today": False,
@@ -78,6 +61,17 @@ class AdvancedSearchService:
                 "closes_at": None,
                 "next_open_time": None
             }
+        
+        is_open_now = schedule.open_minute <= current_minute <= schedule.close_minute
+        
+        return {
+            "is_open_now": is_open_now,
+            "is_open_today": True,
+            "today_hours": today_schedule,
+            "opens_at": schedule.opens_at,
+            "closes_at": schedule.closes_at,
+            "next_open_time": None if is_open_now else schedule.opens_at
+        }
     
     def _get_next_open_time(self, working_hours: Dict, current_day: str) -> Optional[str]:
         """Get the next opening time"""
@@ -105,34 +99,29 @@ class AdvancedSearchService:
         Filter workshops by services
         Returns a list of (workshop, metadata) where metadata includes matching information
         """
+        workshop_term_index.ensure_built(self.db)
+        
+        required_lower = [s.lower() for s in required_services]
+        preferred_lower = [s.lower() for s in (preferred_services or [])]
+        
+        # Posting list of every term, then set operations instead of per-workshop scans
+        term_ids = {term: workshop_term_index.match("services", term) for term in set(required_lower + preferred_lower)}
+        if match_all:
+            candidate_ids = set.intersection(*(term_ids[req] for req in required_lower)) if required_lower else None
+        else:
+            candidate_ids = set().union(*(term_ids[req] for req in required_lower))
+        
         results = []
         
         for workshop in workshops:
-            workshop_services = workshop.services or []
-            
-            workshop_services_lower = [s.lower() for s in workshop_services]
-            required_lower = [s.lower() for s in required_services]
-            
-            if match_all:
-                matching_required = [req for req in required_lower 
-                                   if any(req in ws for ws in workshop_services_lower)]
-                has_all_required = len(matching_required) == len(required_services)
-            else:
-                matching_required = [req for req in required_lower 
-                                   if any(req in ws for ws in workshop_services_lower)]
-                has_all_required = len(matching_required) > 0
-            
-            if not has_all_required:
+            if candidate_ids is not None and workshop.id not in candidate_ids:
                 continue
             
-            preferred_matches = []
-            if preferred_services:
-                preferred_lower = [s.lower() for s in preferred_services]
-                preferred_matches = [pref for pref in preferred_lower 
-                                   if any(pref in ws for ws in workshop_services_lower)]
+            matching_required = [req for req in required_lower if workshop.id in term_ids[req]]
+            preferred_matches = [pref for pref in preferred_lower if workshop.id in term_ids[pref]]
             
             exact_matches = []
-            for service in workshop_services:
+            for service in workshop.services or []:
                 for req in required_services + (preferred_services or []):
                     if req.lower() in service.lower():
                         exact_matches.append(service)
@@ -152,35 +141,29 @@ class AdvancedSearchService:
                             car_brands: List[str],
                             specializations: Optional[List[str]] = None) -> List[Tuple[Workshop, Dict]]:
         """Filter workshops by specialties"""
+        workshop_term_index.ensure_built(self.db)
+        
+        brand_ids = {brand: workshop_term_index.match("specialties", brand) for brand in car_brands}
+        specialization_ids = {spec: workshop_term_index.match("specialties", spec) for spec in specializations or []}
+        
+        # Only workshops with at least one match
+        candidate_ids = set().union(*brand_ids.values(), *specialization_ids.values())
+        
         results = []
         
         for workshop in workshops:
-            workshop_specialties = workshop.specialties or []
-            workshop_specialties_lower = [s.lower() for s in workshop_specialties]
-            
-            # Check car brands
-            brand_matches = []
-            for brand in car_brands:
-                for specialty in workshop_specialties_lower:
-                    if brand.lower() in specialty:
-                        brand_matches.append(brand)
+            if workshop.id not in candidate_ids:
+                continue
             
-            # Check additional specializations
-            specialization_matches = []
-            if specializations:
-                for spec in specializations:
-                    for specialty in workshop_specialties_lower:
-                        if spec.lower() in specialty:
-                            specialization_matches.append(spec)
+            brand_matches = [brand for brand, ids in brand_ids.items() if workshop.id in ids]
+            specialization_matches = [spec for spec, ids in specialization_ids.items() if workshop.id in ids]
             
-            # Only include if you have at least one match
-            if brand_matches or specialization_matches:
-                metadata = {
-                    "matching_specialties": list(set(brand_matches + specialization_matches)),
-                    "brand_matches": len(set(brand_matches)),
-                    "specialization_matches": len(set(specialization_matches))
-                }
-                results.append((workshop, metadata))
+            metadata = {
+                "matching_specialties": list(set(brand_matches + specialization_matches)),
+                "brand_matches": len(set(brand_matches)),
+                "specialization_matches": len(set(specialization_matches))
+            }
+            results.append((workshop, metadata))
         
         return results
     
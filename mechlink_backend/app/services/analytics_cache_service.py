@@ -0,0 +1,122 @@
+import threading
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, Set
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.models.maintenance import MaintenanceRecord
+from app.models.vehicle import Vehicle
+from app.utils.cache import LRUCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+# Session.info key of the users whose analytics a pending transaction changes
+_CHANGED_USERS = "analytics_changed_users"
+
+class AnalyticsResultCache:
+    """
+    Per-user cache of analytics results keyed by (user, endpoint, parameters),
+    with LRU eviction and a TTL. Each user has a generation number that is part
+    of every key; committing a change to one of the user's vehicles or
+    maintenance records bumps it, so all their cached results miss at once
+    (stale entries age out of the LRU). A result computed while a change
+    committed is stored under the old generation and is never served.
+    The TTL bounds staleness for writes made by other processes.
+    """
+    
+    def __init__(self, maxsize: int = 2048, ttl_seconds: float = 600):
+        self._results = LRUCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._endpoint_hits: Dict[str, int] = defaultdict(int)
+        self._endpoint_misses: Dict[str, int] = defaultdict(int)
+        self.invalidations = 0
+    
+    def fetch(self, user_id: str, endpoint: str, params: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached result of an analytics endpoint, calling compute() on a miss"""
+        with self._lock:
+            generation = self._generations.get(user_id, 0)
+        key = (user_id, generation, endpoint, params)
+        
+        value = self._results.get(key)
+        with self._lock:
+            if value is MISSING:
+                self._endpoint_misses[endpoint] += 1
+            else:
+                self._endpoint_hits[endpoint] += 1
+        if value is not MISSING:
+            return value
+        
+        # Errors propagate and are not cached
+        value = compute()
+        self._results.set(key, value)
+        return value
+    
+    def invalidate_users(self, user_ids: Iterable[str]):
+        """Drop every cached result of the given users"""
+        with self._lock:
+            for user_id in user_ids:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+                self.invalidations += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Size, hit rate and per-endpoint hit/miss counters"""
+        results = self._results.stats()
+        with self._lock:
+            endpoints = {}
+            for endpoint in sorted(set(self._endpoint_hits) | set(self._endpoint_misses)):
+                hits = self._endpoint_hits[endpoint]
+                misses = self._endpoint_misses[endpoint]
+                endpoints[endpoint] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+                }
+            invalidations = self.invalidations
+        
+        return {**results, "invalidations": invalidations, "endpoints": endpoints}
+
+# Process-wide cache used by AnalyticsService
+analytics_cache = AnalyticsResultCache(
+    maxsize=settings.ANALYTICS_CACHE_SIZE,
+    ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS
+)
+
+# === INVALIDATION ===
+
+def _old_and_new(instance, attribute: str) -> Set:
+    """Current value of an attribute plus the one it had before this flush"""
+    history = inspect(instance).attrs[attribute].history
+    values = set(history.added or ()) | set(history.unchanged or ()) | set(history.deleted or ())
+    values.add(getattr(instance, attribute))
+    values.discard(None)
+    return values
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context):
+    user_ids: Set[str] = set()
+    vehicle_ids: Set[str] = set()
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Vehicle):
+            user_ids |= _old_and_new(instance, "user_id")
+        elif isinstance(instance, MaintenanceRecord):
+            vehicle_ids |= _old_and_new(instance, "vehicle_id")
+    
+    if vehicle_ids:
+        user_ids.update(session.execute(
+            select(Vehicle.user_id).where(Vehicle.id.in_(vehicle_ids))
+        ).scalars())
+    if user_ids:
+        session.info.setdefault(_CHANGED_USERS, set()).update(user_ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session):
+    user_ids = session.info.pop(_CHANGED_USERS, None)
+    if user_ids:
+        analytics_cache.invalidate_users(user_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session: Session):
+    session.info.pop(_CHANGED_USERS, None)
@@ -0,0 +1,220 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+
+from app.models.vehicle import Vehicle
+from app.services.cost_rollup_service import CostRollupService, CostTotals, month_bounds
+from app.schemas.analytics_schemas import (
+    CostSummary, VehicleCostSummary, CategoryCostBreakdown, MonthlySpending
+)
+
+DateRange = Tuple[date, date]
+Month = Tuple[int, int]
+
+class CostRecord(NamedTuple):
+    """The maintenance record columns the cost analytics read"""
+    vehicle_id: str
+    service_type: str
+    cost: Optional[Decimal]
+    service_date: date
+
+class CostCell(NamedTuple):
+    """A maintenance_cost_rollups row: one vehicle, service type and month"""
+    vehicle_id: str
+    service_type: str
+    year: int
+    month: int
+    total_cost: Optional[Decimal]
+    transaction_count: int
+    last_service_date: date
+    max_cost: Optional[Decimal]
+    max_cost_date: Optional[date]
+
+class CostAggregates(NamedTuple):
+    """Result of one CostAnalyticsEngine pass; parts that were not asked for are None"""
+    period_summary: Optional[CostSummary]
+    vehicles: Optional[List[VehicleCostSummary]]
+    categories: Optional[List[CategoryCostBreakdown]]
+    monthly_spending: Optional[List[MonthlySpending]]
+    most_expensive_service: Optional[Dict[str, Any]]
+
+def _in_range(value: date, date_range: DateRange) -> bool:
+    return date_range[0] <= value <= date_range[1]
+
+class CostAnalyticsEngine:
+    """
+    Cost analytics of one user from their vehicles and their monthly cost
+    rollups (maintenance_cost_rollups), so a read is a few indexed lookups
+    whatever the length of the history. Months a date range covers completely
+    come from the rollups; months it covers only in part (the edges of a
+    "last 30 days" range) come from the raw records of just those months.
+    aggregate() computes the summary, per-vehicle, per-category and monthly
+    breakdowns in a single pass over both.
+    """
+    
+    def __init__(self, rollups: CostRollupService, user_id: str, vehicles: List, cells: List[CostCell]):
+        self.rollups = rollups
+        self.user_id = user_id
+        self.vehicles = vehicles
+        self.cells = cells
+    
+    @classmethod
+    def load(cls, db: Session, user_id: str) -> "CostAnalyticsEngine":
+        rollups = CostRollupService(db)
+        vehicles = db.query(
+            Vehicle.id, Vehicle.make, Vehicle.model, Vehicle.year, Vehicle.license_plate
+        ).filter(Vehicle.user_id == user_id).all()
+        cells = [CostCell(*row) for row in rollups.user_rollups(user_id)]
+        return cls(rollups, user_id, vehicles, cells)
+    
+    def _split_months(self, ranges: Dict[str, DateRange]) -> Tuple[Dict[str, Set[Month]], Dict[str, Set[Month]]]:
+        """Per range, the months with data it covers completely and the ones it covers in part"""
+        bounds = {(cell.year, cell.month): None for cell in self.cells}
+        for month in bounds:
+            bounds[month] = month_bounds(*month)
+        
+        full, partial = {}, {}
+        for name, (start, end) in ranges.items():
+            full[name], partial[name] = set(), set()
+            for month, (first_day, last_day) in bounds.items():
+                if start <= first_day and last_day <= end:
+                    full[name].add(month)
+                elif first_day <= end and start <= last_day:
+                    partial[name].add(month)
+        return full, partial
+    
+    def aggregate(
+        self,
+        summary_range: Optional[DateRange] = None,
+        breakdown_range: Optional[DateRange] = None,
+        monthly_since: Optional[date] = None
+    ) -> CostAggregates:
+        """
+        One pass over the rollups and the partial-month records
+        summary_range: period summary; breakdown_range: per vehicle and per category;
+        monthly_since: monthly spending from that date on. The last service date of
+        each vehicle and the most expensive service are over all records.
+        """
+        ranges = {}
+        if summary_range:
+            ranges["summary"] = summary_range
+        if breakdown_range:
+            ranges["breakdown"] = breakdown_range
+        if monthly_since is not None:
+            ranges["monthly"] = (monthly_since, date.max)
+        full, partial = self._split_months(ranges)
+        
+        summary = CostTotals()
+        by_vehicle: Dict[str, CostTotals] = defaultdict(CostTotals)
+        by_category: Dict[str, CostTotals] = defaultdict(CostTotals)
+        by_month: Dict[Month, CostTotals] = defaultdict(CostTotals)
+        last_service: Dict[str, date] = {}
+        most_expensive: Optional[CostCell] = None
+        
+        for cell in self.cells:
+            month = (cell.year, cell.month)
+            
+            previous = last_service.get(cell.vehicle_id)
+            if previous is None or cell.last_service_date > previous:
+                last_service[cell.vehicle_id] = cell.last_service_date
+            if cell.max_cost is not None and (most_expensive is None or cell.max_cost > most_expensive.max_cost):
+                most_expensive = cell
+            
+            if month in full.get("summary", ()):
+                summary.merge(cell)
+            if month in full.get("breakdown", ()):
+                by_vehicle[cell.vehicle_id].merge(cell)
+                by_category[cell.service_type].merge(cell)
+            if month in full.get("monthly", ()):
+                by_month[month].merge(cell)
+        
+        edge_months = set().union(*partial.values()) if partial else set()
+        for row in self.rollups.records_in_months(self.user_id, edge_months):
+            record = CostRecord(*row)
+            month = (record.service_date.year, record.service_date.month)
+            
+            if month in partial.get("summary", ()) and _in_range(record.service_date, ranges["summary"]):
+                summary.add(record.cost, record.service_date)
+            if month in partial.get("breakdown", ()) and _in_range(record.service_date, ranges["breakdown"]):
+                by_vehicle[record.vehicle_id].add(record.cost, record.service_date)
+                by_category[record.service_type].add(record.cost, record.service_date)
+            if month in partial.get("monthly", ()) and _in_range(record.service_date, ranges["monthly"]):
+                by_month[month].add(record.cost, record.service_date)
+        
+        return CostAggregates(
+            period_summary=self._summary(summary, summary_range) if summary_range else None,
+            vehicles=self._vehicles(by_vehicle, last_service) if breakdown_range else None,
+            categories=self._categories(by_category) if breakdown_range else None,
+            monthly_spending=self._monthly(by_month) if monthly_since is not None else None,
+            most_expensive_service={
+                "type": "maintenance",
+                "service": most_expensive.service_type,
+                "cost": float(most_expensive.max_cost),
+                "date": most_expensive.max_cost_date.isoformat()
+            } if most_expensive else None
+        )
+    
+    # === RESULT BUILDERS ===
+    
+    @staticmethod
+    def _summary(totals: CostTotals, summary_range: DateRange) -> CostSummary:
+        total_spent = totals.spent
+        return CostSummary(
+            total_spent=total_spent,
+            period_start=summary_range[0],
+            period_end=summary_range[1],
+            transaction_count=totals.transaction_count,
+            average_per_transaction=total_spent / totals.transaction_count if totals.transaction_count > 0 else Decimal('0')
+        )
+    
+    def _vehicles(self, by_vehicle: Dict[str, CostTotals], last_service: Dict[str, date]) -> List[VehicleCostSummary]:
+        vehicle_summaries = []
+        for vehicle in self.vehicles:
+            totals = by_vehicle.get(vehicle.id) or CostTotals()
+            vehicle_summaries.append(VehicleCostSummary(
+                vehicle_id=vehicle.id,
+                vehicle_name=f"{vehicle.make} {vehicle.model} {vehicle.year}",
+                license_plate=vehicle.license_plate,
+                total_spent=totals.spent,  # Just maintenance for now
+                maintenance_cost=totals.spent,
+                appointment_cost=Decimal('0'),  # No dating data
+                transaction_count=totals.transaction_count,
+                last_service_date=last_service.get(vehicle.id)
+            ))
+        return vehicle_summaries
+    
+    @staticmethod
+    def _categories(by_category: Dict[str, CostTotals]) -> List[CategoryCostBreakdown]:
+        total_all_categories = sum(totals.spent for totals in by_category.values())
+        
+        result = []
+        # Name order first so equal totals keep the GROUP BY order of the SQL version
+        for category in sorted(by_category):
+            totals = by_category[category]
+            total_cost = totals.spent
+            result.append(CategoryCostBreakdown(
+                category=category,
+                total_cost=total_cost,
+                transaction_count=totals.transaction_count,
+                percentage_of_total=float(total_cost / total_all_categories * 100) if total_all_categories > 0 else 0,
+                average_cost=total_cost / totals.transaction_count if totals.transaction_count > 0 else Decimal('0'),
+                last_service_date=totals.last_service_date
+            ))
+        
+        # Sort by descending total cost
+        return sorted(result, key=lambda x: x.total_cost, reverse=True)
+    
+    @staticmethod
+    def _monthly(by_month: Dict[Month, CostTotals]) -> List[MonthlySpending]:
+        return [
+            MonthlySpending(
+                month=f"{year}-{month:02d}",
+                total_spent=by_month[(year, month)].spent,
+                maintenance_cost=by_month[(year, month)].spent,
+                appointment_cost=Decimal('0'),
+                transaction_count=by_month[(year, month)].transaction_count
+            )
+            for year, month in sorted(by_month)
+        ]
@@ -1,13 +1,12 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text, and_, or_, desc, extract
+from sqlalchemy import text, or_
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Any, Optional
 from decimal import Decimal
-import calendar
 
-from app.models.maintenance import MaintenanceRecord
-from app.models.vehicle import Vehicle
 from app.models.user import User
+from app.services.analytics_engine_service import CostAnalyticsEngine
+from app.services.analytics_cache_service import analytics_cache
 from app.schemas.analytics_schemas import (
     CostSummary, VehicleCostSummary, CategoryCostBreakdown,
     MonthlySpending, CostAnalyticsResponse, BudgetComparison,
@@ -20,6 +19,13 @@ class AnalyticsService:
     def __init__(self, db: Session):
         self.db = db
     
+    def _aggregate(self, user_id: str, endpoint: str, **ranges):
+        """Engine aggregates for the given ranges, from analytics_cache when possible"""
+        return analytics_cache.fetch(
+            user_id, endpoint, tuple(sorted(ranges.items())),
+            lambda: CostAnalyticsEngine.load(self.db, user_id).aggregate(**ranges)
+        )
+    
     def get_cost_summary(
         self,
         user_id: str,
@@ -35,52 +41,9 @@ class AnalyticsService:
             start_date = end_date - timedelta(days=30)
         
         try:
-            # Get vehicles from the user first
-            user_vehicles = self.db.query(Vehicle.id).filter(Vehicle.user_id == user_id).all()
-            vehicle_ids = [v.id for v in user_vehicles]
-            
-            if not vehicle_ids:
-                # No vehicles, return empty summary
-                return CostSummary(
-                    total_spent=Decimal('0'),
-                    period_start=start_date,
-                    period_end=end_date,
-                    transaction_count=0,
-                    average_per_transaction=Decimal('0')
-                )
-            
-            # Obtain maintenance costs using user vehicles
-            maintenance_costs = self.db.query(
-                func.coalesce(func.sum(MaintenanceRecord.cost), 0).label('total')
-            ).filter(
-                and_(
-                    MaintenanceRecord.vehicle_id.in_(vehicle_ids),
-                    MaintenanceRecord.service_date >= start_date,
-                    MaintenanceRecord.service_date <= end_date
-                )
-            ).scalar() or Decimal('0')
-            
-            # Count maintenance transactions
-            maintenance_count = self.db.query(MaintenanceRecord).filter(
-                and_(
-                    MaintenanceRecord.vehicle_id.in_(vehicle_ids),
-                    MaintenanceRecord.service_date >= start_date,
-                    MaintenanceRecord.service_date <= end_date
-                )
-            ).count()
-            
-            total_spent = maintenance_costs
-            transaction_count = maintenance_count
-            average_per_transaction = total_spent / transaction_count if transaction_count > 0 else Decimal('0')
-            
-            return CostSummary(
-                total_spent=total_spent,
-                period_start=start_date,
-                period_end=end_date,
-                transaction_count=transaction_count,
-                average_per_transaction=average_per_transaction
-            )
-            
+            aggregates = self._aggregate(user_id, "cost_summary", summary_range=(start_date, end_date))
+            return aggregates.period_summary
+        
         except Exception as e:
             print(f"Error in get_cost_summary: {e}")
             # Return empty summary on error
@@ -106,50 +69,9 @@ class AnalyticsService:
             start_date = end_date - timedelta(days=365)  # Last year by default
         
         try:
-            vehicles = self.db.query(Vehicle).filter(Vehicle.user_id == user_id).all()
-            vehicle_summaries = []
-            
-            for vehicle in vehicles:
-                # Maintenance costs
-                maintenance_cost = self.db.query(
-                    func.coalesce(func.sum(MaintenanceRecord.cost), 0)
-                ).filter(
-                    and_(
-                        MaintenanceRecord.vehicle_id == vehicle.id,
-                        MaintenanceRecord.service_date >= start_date,
-                        MaintenanceRecord.service_date <= end_date
-                    )
-                ).scalar() or Decimal('0')
-                
-                # Count maintenance transactions
-                maintenance_count = self.db.query(MaintenanceRecord).filter(
-                    and_(
-                        MaintenanceRecord.vehicle_id == vehicle.id,
-                        MaintenanceRecord.service_date >= start_date,
-                        MaintenanceRecord.service_date <= end_date
-                    )
-                ).count()
-                
-                # Last service
-                last_service = self.db.query(MaintenanceRecord).filter(
-                    MaintenanceRecord.vehicle_id == vehicle.id
-                ).order_by(desc(MaintenanceRecord.service_date)).first()
-                
-                vehicle_name = f"{vehicle.make} {vehicle.model} {vehicle.year}"
-                
-                vehicle_summaries.append(VehicleCostSummary(
-                    vehicle_id=vehicle.id,
-                    vehicle_name=vehicle_name,
-                    license_plate=vehicle.license_plate,
-                    total_spent=maintenance_cost,  # Just maintenance for now
-                    maintenance_cost=maintenance_cost,
-                    appointment_cost=Decimal('0'),  # No dating data
-                    transaction_count=maintenance_count,
-                    last_service_date=last_service.service_date if last_service else None
-                ))
-            
-            return vehicle_summaries
-            
+            aggregates = self._aggregate(user_id, "vehicle_breakdown", breakdown_range=(start_date, end_date))
+            return aggregates.vehicles
+        
         except Exception as e:
             print(f"Error in get_vehicle_cost_breakdown: {e}")
             return []
@@ -168,49 +90,9 @@ class AnalyticsService:
             start_date = end_date - timedelta(days=365)
         
         try:
-            # Get user vehicles
-            user_vehicles = self.db.query(Vehicle.id).filter(Vehicle.user_id == user_id).all()
-            vehicle_ids = [v.id for v in user_vehicles]
-            
-            if not vehicle_ids:
-                return []
-            
-            # Group by type of service in maintenance
-            maintenance_categories = self.db.query(
-                MaintenanceRecord.service_type.label('category'),
-                func.sum(MaintenanceRecord.cost).label('total_cost'),
-                func.count(MaintenanceRecord.id).label('transaction_count'),
-                func.max(MaintenanceRecord.service_date).label('last_service_date')
-            ).filter(
-                and_(
-                    MaintenanceRecord.vehicle_id.in_(vehicle_ids),
-                    MaintenanceRecord.service_date >= start_date,
-                    MaintenanceRecord.service_date <= end_date
-                )
-            ).group_by(MaintenanceRecord.service_type).all()
-            
-            # Calculate total for percentages
-            total_all_categories = sum(cat.total_cost or Decimal('0') for cat in maintenance_categories)
-            
-            # Convert to CategoryCostBreakdown list
-            result = []
-            for cat in maintenance_categories:
-                total_cost = cat.total_cost or Decimal('0')
-                percentage = float(total_cost / total_all_categories * 100) if total_all_categories > 0 else 0
-                average_cost = total_cost / cat.transaction_count if cat.transaction_count > 0 else Decimal('0')
-                
-                result.append(CategoryCostBreakdown(
-                    category=cat.category,
-                    total_cost=total_cost,
-                    transaction_count=cat.transaction_count,
-                    percentage_of_total=percentage,
-                    average_cost=average_cost,
-                    last_service_date=cat.last_service_date
-                ))
-            
-            # Sort by descending total cost
-            return sorted(result, key=lambda x: x.total_cost, reverse=True)
-            
+            aggregates = self._aggregate(user_id, "category_breakdown", breakdown_range=(start_date, end_date))
+            return aggregates.categories
+        
         except Exception as e:
             print(f"Error in get_category_breakdown: {e}")
             return []
@@ -223,54 +105,11 @@ class AnalyticsService:
         """Get monthly expenses"""
         
         try:
-            end_date = date.today()
-            start_date = end_date - timedelta(days=months_back * 30)
-            
-            # Get user vehicles
-            user_vehicles = self.db.query(Vehicle.id).filter(Vehicle.user_id == user_id).all()
-            vehicle_ids = [v.id for v in user_vehicles]
-            
-            if not vehicle_ids:
-                return []
-            
-            # Maintenance per month
-            maintenance_monthly = self.db.query(
-                extract('year', MaintenanceRecord.service_date).label('year'),
-                extract('month', MaintenanceRecord.service_date).label('month'),
-                func.sum(MaintenanceRecord.cost).label('maintenance_cost'),
-                func.count(MaintenanceRecord.id).label('maintenance_count')
-            ).filter(
-                and_(
-                    MaintenanceRecord.vehicle_id.in_(vehicle_ids),
-                    MaintenanceRecord.service_date >= start_date
-                )
-            ).group_by(
-                extract('year', MaintenanceRecord.service_date),
-                extract('month', MaintenanceRecord.service_date)
-            ).all()
-            
-            # Convert to ordered list
-            result = []
-            monthly_data = {}
-            
-            for record in maintenance_monthly:
-                month_key = f"{int(record.year)}-{int(record.month):02d}"
-                monthly_data[month_key] = {
-                    'maintenance_cost': record.maintenance_cost or Decimal('0'),
-                    'maintenance_count': record.maintenance_count,
-                }
-            
-            for month_key, data in sorted(monthly_data.items()):
-                result.append(MonthlySpending(
-                    month=month_key,
-                    total_spent=data['maintenance_cost'],
-                    maintenance_cost=data['maintenance_cost'],
-                    appointment_cost=Decimal('0'),
-                    transaction_count=data['maintenance_count']
-                ))
-            
-            return result
+            start_date = date.today() - timedelta(days=months_back * 30)
             
+            aggregates = self._aggregate(user_id, "monthly_spending", monthly_since=start_date)
+            return aggregates.monthly_spending
+        
         except Exception as e:
             print(f"Error in get_monthly_spending: {e}")
             return []
@@ -283,30 +122,23 @@ class AnalyticsService:
     ) -> CostAnalyticsResponse:
         """Get a complete cost analysis"""
         
+        # Same default periods as the individual breakdowns
+        period_end = end_date or date.today()
+        breakdown_end = end_date or date.today()
+        
         try:
-            # Get all components
-            period_summary = self.get_cost_summary(user_id, start_date, end_date)
-            vehicles = self.get_vehicle_cost_breakdown(user_id, start_date, end_date)
-            categories = self.get_category_breakdown(user_id, start_date, end_date)
-            monthly_spending = self.get_monthly_spending(user_id)
-            
-            # Obtain user vehicles to search for the most expensive service
-            user_vehicles = self.db.query(Vehicle.id).filter(Vehicle.user_id == user_id).all()
-            vehicle_ids = [v.id for v in user_vehicles]
-            
-            most_expensive_service = None
-            if vehicle_ids:
-                most_expensive_maintenance = self.db.query(MaintenanceRecord).filter(
-                    MaintenanceRecord.vehicle_id.in_(vehicle_ids)
-                ).order_by(desc(MaintenanceRecord.cost)).first()
-                
-                if most_expensive_maintenance:
-                    most_expensive_service = {
-                        "type": "maintenance",
-                        "service": most_expensive_maintenance.service_type,
-                        "cost": float(most_expensive_maintenance.cost),
-                        "date": most_expensive_maintenance.service_date.isoformat()
-                    }
+            # Every component from one load of the user's records
+            aggregates = self._aggregate(
+                user_id, "complete",
+                summary_range=(start_date or period_end - timedelta(days=30), period_end),
+                breakdown_range=(start_date or breakdown_end - timedelta(days=365), breakdown_end),
+                monthly_since=date.today() - timedelta(days=12 * 30)
+            )
+            period_summary = aggregates.period_summary
+            vehicles = aggregates.vehicles
+            categories = aggregates.categories
+            monthly_spending = aggregates.monthly_spending
+            most_expensive_service = aggregates.most_expensive_service
             
             # Calculate basic trends
             cost_trends = {"trend": "stable"}
@@ -314,10 +146,11 @@ class AnalyticsService:
                 recent_avg = sum(m.total_spent for m in monthly_spending[-3:]) / min(3, len(monthly_spending))
                 older_avg = sum(m.total_spent for m in monthly_spending[:-3]) / max(1, len(monthly_spending) - 3)
                 
-                if recent_avg > older_avg * 1.1:
+                # Decimal factors (Decimal * float raises) and no trend without older months
+                if older_avg > 0 and recent_avg > older_avg * Decimal('1.1'):
                     cost_trends["trend"] = "increasing"
                     cost_trends["change_percentage"] = float((recent_avg - older_avg) / older_avg * 100)
-                elif recent_avg < older_avg * 0.9:
+                elif older_avg > 0 and recent_avg < older_avg * Decimal('0.9'):
                     cost_trends["trend"] = "decreasing"
                     cost_trends["change_percentage"] = float((older_avg - recent_avg) / older_avg * 100)
             
@@ -330,7 +163,7 @@ class AnalyticsService:
                 most_expensive_service=most_expensive_service,
                 cost_trends=cost_trends
             )
-            
+        
         except Exception as e:
             print(f"Error in get_complete_analytics: {e}")
             # Return empty response on error
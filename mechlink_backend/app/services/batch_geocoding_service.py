@@ -0,0 +1,164 @@
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.models.workshop import Workshop
+from app.models.geocoding import GeocodeCheckpoint
+from app.services.geolocation_service import GeolocationService
+from app.services.gazetteer_service import pr_gazetteer
+from app.utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# === GEOCODER BACKENDS ===
+
+class GeocoderBackend(ABC):
+    """Interface of the geocoders used by BatchGeocoder"""
+    
+    name = "base"
+    
+    @abstractmethod
+    def geocode(self, address: str, city: str = "Puerto Rico") -> Optional[Tuple[float, float]]:
+        """Coordinates of the address, None when it cannot be located"""
+
+class NominatimGeocoder(GeocoderBackend):
+    """
+    GeolocationService (gazetteer, cache, then Nominatim) behind a shared rate limit.
+    Request errors propagate, so an outage marks workshops failed (and retried later)
+    instead of storing a municipality centroid as a precise hit.
+    """
+    
+    name = "nominatim"
+    
+    def __init__(self, requests_per_second: float = settings.NOMINATIM_REQUESTS_PER_SECOND):
+        self.rate_limiter = TokenBucket(rate=requests_per_second, capacity=1)
+    
+    def geocode(self, address: str, city: str = "Puerto Rico") -> Optional[Tuple[float, float]]:
+        return GeolocationService.geocode_address(address, city, rate_limiter=self.rate_limiter, fallback=False)
+
+class GazetteerGeocoder(GeocoderBackend):
+    """Offline stand-in: resolves to the most specific known place in the address"""
+    
+    name = "gazetteer"
+    
+    def geocode(self, address: str, city: str = "Puerto Rico") -> Optional[Tuple[float, float]]:
+        return pr_gazetteer.locate(address, city)
+
+GEOCODER_BACKENDS = {
+    NominatimGeocoder.name: NominatimGeocoder,
+    GazetteerGeocoder.name: GazetteerGeocoder
+}
+
+# === BATCH PIPELINE ===
+
+class BatchGeocoder:
+    """
+    Backfills workshop coordinates with a bounded worker pool.
+    Results are committed per chunk together with a checkpoint row per workshop,
+    so an interrupted run resumes where it stopped.
+    """
+    
+    def __init__(self, db: Session, backend: GeocoderBackend, workers: int = 4, chunk_size: int = 50,
+                 progress: Optional[Callable[[Dict], None]] = None):
+        self.db = db
+        self.backend = backend
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.progress = progress
+    
+    def _pending_workshops(self, retry_failed: bool) -> List[Tuple[str, str, str]]:
+        """(id, address, city) of workshops still missing coordinates"""
+        query = self.db.query(Workshop.id, Workshop.address, Workshop.city).outerjoin(
+            GeocodeCheckpoint, GeocodeCheckpoint.workshop_id == Workshop.id
+        ).filter(
+            Workshop.latitude.is_(None) | Workshop.longitude.is_(None)
+        )
+        
+        if not retry_failed:
+            query = query.filter(
+                (GeocodeCheckpoint.status.is_(None)) | (GeocodeCheckpoint.status != "failed")
+            )
+        
+        return query.order_by(Workshop.id).all()
+    
+    def _geocode_one(self, workshop_id: str, address: str, city: str) -> Dict:
+        """Full address first, then city-level coordinates"""
+        result = {"workshop_id": workshop_id, "status": "failed", "coords": None, "error": None}
+        
+        try:
+            coords = self.backend.geocode(f"{address}, {city}, Puerto Rico")
+            if coords:
+                result.update(status="geocoded", coords=coords)
+                return result
+            
+            coords = self.backend.geocode(city, "Puerto Rico")
+            if coords:
+                result.update(status="city_fallback", coords=coords)
+            else:
+                result["error"] = "No coordinates found for address or city"
+        except Exception as e:
+            result["error"] = str(e)
+        
+        return result
+    
+    def _save_chunk(self, results: List[Dict]):
+        """Write coordinates and checkpoints of one chunk in a single transaction"""
+        workshop_ids = [result["workshop_id"] for result in results]
+        checkpoints = {
+            checkpoint.workshop_id: checkpoint
+            for checkpoint in self.db.query(GeocodeCheckpoint).filter(
+                GeocodeCheckpoint.workshop_id.in_(workshop_ids)
+            )
+        }
+        
+        coordinate_updates = []
+        for result in results:
+            lat, lon = result["coords"] if result["coords"] else (None, None)
+            if result["coords"]:
+                coordinate_updates.append({"id": result["workshop_id"], "latitude": lat, "longitude": lon})
+            
+            checkpoint = checkpoints.get(result["workshop_id"])
+            if checkpoint is None:
+                checkpoint = GeocodeCheckpoint(workshop_id=result["workshop_id"], attempts=0)
+                self.db.add(checkpoint)
+            
+            checkpoint.status = result["status"]
+            checkpoint.latitude = lat
+            checkpoint.longitude = lon
+            checkpoint.backend = self.backend.name
+            checkpoint.attempts = (checkpoint.attempts or 0) + 1
+            checkpoint.last_error = result["error"]
+        
+        if coordinate_updates:
+            self.db.bulk_update_mappings(Workshop, coordinate_updates)
+        
+        self.db.commit()
+    
+    def run(self, retry_failed: bool = False) -> Dict[str, int]:
+        """Geocode every pending workshop; returns counts per status"""
+        pending = self._pending_workshops(retry_failed)
+        stats = {"total": len(pending), "processed": 0, "geocoded": 0, "city_fallback": 0, "failed": 0}
+        logger.info(f"Batch geocoding {len(pending)} workshops with backend '{self.backend.name}'")
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for start in range(0, len(pending), self.chunk_size):
+                chunk = pending[start:start + self.chunk_size]
+                results = list(executor.map(lambda row: self._geocode_one(*row), chunk))
+                
+                try:
+                    self._save_chunk(results)
+                except Exception:
+                    self.db.rollback()
+                    raise
+                
+                for result in results:
+                    stats[result["status"]] += 1
+                stats["processed"] += len(results)
+                
+                if self.progress:
+                    self.progress(dict(stats))
+        
+        return stats
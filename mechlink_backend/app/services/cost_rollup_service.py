@@ -0,0 +1,202 @@
+import calendar
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session
+
+from app.models.maintenance import MaintenanceRecord, MaintenanceCostRollup
+from app.models.vehicle import Vehicle
+
+logger = logging.getLogger(__name__)
+
+# (vehicle_id, year, month, service_type)
+RollupKey = Tuple[str, int, int, str]
+
+# Rows inserted per statement on rebuild
+REBUILD_CHUNK_SIZE = 1000
+
+def month_bounds(year: int, month: int) -> Tuple[date, date]:
+    """First and last day of a month"""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+def rollup_key(record: MaintenanceRecord) -> RollupKey:
+    """Rollup group a maintenance record counts towards"""
+    return (record.vehicle_id, record.service_date.year, record.service_date.month, record.service_type)
+
+class CostTotals:
+    """
+    SUM(cost) / COUNT(*) / MAX(service_date) / MAX(cost) of a group folded in
+    Python, exactly like the SQL aggregates (NULL costs are counted but not summed).
+    Fields are named after the maintenance_cost_rollups columns.
+    """
+    
+    __slots__ = ("total_cost", "transaction_count", "last_service_date", "max_cost", "max_cost_date")
+    
+    def __init__(self):
+        self.total_cost: Optional[Decimal] = None
+        self.transaction_count = 0
+        self.last_service_date: Optional[date] = None
+        self.max_cost: Optional[Decimal] = None
+        self.max_cost_date: Optional[date] = None
+    
+    def _fold(self, total_cost: Optional[Decimal], transaction_count: int, last_service_date: date,
+              max_cost: Optional[Decimal], max_cost_date: Optional[date]):
+        self.transaction_count += transaction_count
+        if self.last_service_date is None or last_service_date > self.last_service_date:
+            self.last_service_date = last_service_date
+        if total_cost is not None:
+            self.total_cost = total_cost if self.total_cost is None else self.total_cost + total_cost
+        if max_cost is not None and (self.max_cost is None or max_cost > self.max_cost):
+            self.max_cost = max_cost
+            self.max_cost_date = max_cost_date
+    
+    def add(self, cost: Optional[Decimal], service_date: date):
+        """Fold in one maintenance record"""
+        self._fold(cost, 1, service_date, cost, service_date)
+    
+    def merge(self, rollup):
+        """Fold in the totals of another group (a rollup row or anything with its columns)"""
+        self._fold(rollup.total_cost, rollup.transaction_count, rollup.last_service_date,
+                   rollup.max_cost, rollup.max_cost_date)
+    
+    @property
+    def spent(self) -> Decimal:
+        return self.total_cost or Decimal('0')
+    
+    def values(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+class CostRollupService:
+    """
+    Maintains maintenance_cost_rollups, the per (user, vehicle, month, service_type)
+    cost totals that the cost analytics read instead of scanning every record.
+    Writes to maintenance records call refresh() with the groups they touched
+    (old and new group on an update), which recomputes just those groups in the
+    same transaction; rebuild() recomputes everything for a backfill.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def refresh(self, keys: Iterable[RollupKey]):
+        """Recompute the given groups from their records (the caller commits)"""
+        # Sessions do not autoflush; the pending record changes must be visible to the queries below
+        self.db.flush()
+        for key in set(keys):
+            vehicle_id, year, month, service_type = key
+            first_day, last_day = month_bounds(year, month)
+            
+            totals = CostTotals()
+            for cost, service_date in self.db.query(MaintenanceRecord.cost, MaintenanceRecord.service_date).filter(
+                MaintenanceRecord.vehicle_id == vehicle_id,
+                MaintenanceRecord.service_type == service_type,
+                MaintenanceRecord.service_date >= first_day,
+                MaintenanceRecord.service_date <= last_day
+            ):
+                totals.add(cost, service_date)
+            
+            rollup = self.db.query(MaintenanceCostRollup).filter(
+                MaintenanceCostRollup.vehicle_id == vehicle_id,
+                MaintenanceCostRollup.year == year,
+                MaintenanceCostRollup.month == month,
+                MaintenanceCostRollup.service_type == service_type
+            ).first()
+            
+            if not totals.transaction_count:
+                if rollup:
+                    self.db.delete(rollup)
+                continue
+            
+            if rollup is None:
+                user_id = self.db.query(Vehicle.user_id).filter(Vehicle.id == vehicle_id).scalar()
+                rollup = MaintenanceCostRollup(
+                    user_id=user_id, vehicle_id=vehicle_id, year=year, month=month, service_type=service_type
+                )
+                self.db.add(rollup)
+            for field, value in totals.values().items():
+                setattr(rollup, field, value)
+    
+    def rebuild(self, user_id: Optional[str] = None) -> int:
+        """Recompute all rollups (or one user's) from the maintenance records; returns the groups written"""
+        delete_query = self.db.query(MaintenanceCostRollup)
+        records = self.db.query(
+            Vehicle.user_id,
+            MaintenanceRecord.vehicle_id,
+            MaintenanceRecord.service_type,
+            MaintenanceRecord.cost,
+            MaintenanceRecord.service_date
+        ).join(Vehicle, Vehicle.id == MaintenanceRecord.vehicle_id)
+        if user_id:
+            delete_query = delete_query.filter(MaintenanceCostRollup.user_id == user_id)
+            records = records.filter(Vehicle.user_id == user_id)
+        
+        groups: Dict[RollupKey, CostTotals] = {}
+        owners: Dict[str, str] = {}
+        for owner_id, vehicle_id, service_type, cost, service_date in records.yield_per(REBUILD_CHUNK_SIZE):
+            key = (vehicle_id, service_date.year, service_date.month, service_type)
+            totals = groups.get(key)
+            if totals is None:
+                totals = groups[key] = CostTotals()
+            totals.add(cost, service_date)
+            owners[vehicle_id] = owner_id
+        
+        rows = [
+            {
+                "user_id": owners[vehicle_id],
+                "vehicle_id": vehicle_id,
+                "year": year,
+                "month": month,
+                "service_type": service_type,
+                **totals.values()
+            }
+            for (vehicle_id, year, month, service_type), totals in groups.items()
+        ]
+        
+        try:
+            delete_query.delete(synchronize_session=False)
+            for start in range(0, len(rows), REBUILD_CHUNK_SIZE):
+                self.db.execute(insert(MaintenanceCostRollup), rows[start:start + REBUILD_CHUNK_SIZE])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        logger.info(f"Rebuilt {len(rows)} maintenance cost rollups")
+        return len(rows)
+    
+    def is_empty(self) -> bool:
+        return self.db.query(MaintenanceCostRollup.id).first() is None
+    
+    # === READS ===
+    
+    def user_rollups(self, user_id: str) -> List:
+        """Every rollup group of a user (one indexed lookup)"""
+        return self.db.query(
+            MaintenanceCostRollup.vehicle_id,
+            MaintenanceCostRollup.service_type,
+            MaintenanceCostRollup.year,
+            MaintenanceCostRollup.month,
+            MaintenanceCostRollup.total_cost,
+            MaintenanceCostRollup.transaction_count,
+            MaintenanceCostRollup.last_service_date,
+            MaintenanceCostRollup.max_cost,
+            MaintenanceCostRollup.max_cost_date
+        ).filter(MaintenanceCostRollup.user_id == user_id).all()
+    
+    def records_in_months(self, user_id: str, months: Set[Tuple[int, int]]) -> List:
+        """Raw records of a user in the given (year, month)s, for ranges that cover part of a month"""
+        if not months:
+            return []
+        
+        ranges = [month_bounds(year, month) for year, month in sorted(months)]
+        query = self.db.query(
+            MaintenanceRecord.vehicle_id,
+            MaintenanceRecord.service_type,
+            MaintenanceRecord.cost,
+            MaintenanceRecord.service_date
+        ).join(Vehicle, Vehicle.id == MaintenanceRecord.vehicle_id).filter(Vehicle.user_id == user_id)
+        return query.filter(or_(*[
+            MaintenanceRecord.service_date.between(first_day, last_day) for first_day, last_day in ranges
+        ])).all()
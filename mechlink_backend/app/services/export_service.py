@@ -0,0 +1,172 @@
+import io
+import csv
+from datetime import date
+from typing import Callable, Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal
+from app.models.maintenance import MaintenanceRecord, MaintenanceCostRollup
+from app.models.vehicle import Vehicle
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+# Rows fetched per round trip and written per CSV chunk / Parquet row group
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_DATASETS = ("records", "rollups")
+EXPORT_FORMATS = ("csv", "parquet")
+
+# (column name, selected expression, Parquet type)
+RECORD_COLUMNS = [
+    ("id", MaintenanceRecord.id, "string"),
+    ("vehicle_id", MaintenanceRecord.vehicle_id, "string"),
+    ("license_plate", Vehicle.license_plate, "string"),
+    ("service_type", MaintenanceRecord.service_type, "string"),
+    ("service_date", MaintenanceRecord.service_date, "date"),
+    ("cost", MaintenanceRecord.cost, "money"),
+    ("mileage_at_service", MaintenanceRecord.mileage_at_service, "int"),
+    ("workshop_name", MaintenanceRecord.workshop_name, "string"),
+    ("description", MaintenanceRecord.description, "string"),
+    ("next_service_due", MaintenanceRecord.next_service_due, "date"),
+    ("next_mileage_due", MaintenanceRecord.next_mileage_due, "int"),
+]
+ROLLUP_COLUMNS = [
+    ("vehicle_id", MaintenanceCostRollup.vehicle_id, "string"),
+    ("license_plate", Vehicle.license_plate, "string"),
+    ("year", MaintenanceCostRollup.year, "int"),
+    ("month", MaintenanceCostRollup.month, "int"),
+    ("service_type", MaintenanceCostRollup.service_type, "string"),
+    ("total_cost", MaintenanceCostRollup.total_cost, "money"),
+    ("transaction_count", MaintenanceCostRollup.transaction_count, "int"),
+    ("last_service_date", MaintenanceCostRollup.last_service_date, "date"),
+    ("max_cost", MaintenanceCostRollup.max_cost, "money"),
+]
+
+def parquet_available() -> bool:
+    return pq is not None
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain()"""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        # Parquet footers record absolute offsets, so the position keeps counting across drains
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class MaintenanceExportService:
+    """
+    Streams a user's maintenance records or monthly cost rollups as CSV or
+    Parquet. Rows are read with yield_per (a server-side cursor where the
+    database has one) and encoded one chunk at a time, so memory stays flat
+    whatever the length of the history. The generators open their own session,
+    because they keep running after the endpoint has returned its response.
+    """
+    
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, chunk_size: int = EXPORT_CHUNK_SIZE):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+    
+    @staticmethod
+    def columns(dataset: str) -> List[Tuple]:
+        return RECORD_COLUMNS if dataset == "records" else ROLLUP_COLUMNS
+    
+    def _statement(self, dataset: str, user_id: str, vehicle_id: Optional[str],
+                   start_date: Optional[date], end_date: Optional[date]):
+        expressions = [expression for _, expression, _ in self.columns(dataset)]
+        
+        if dataset == "records":
+            statement = select(*expressions).join(Vehicle, Vehicle.id == MaintenanceRecord.vehicle_id).where(
+                Vehicle.user_id == user_id
+            )
+            if vehicle_id:
+                statement = statement.where(MaintenanceRecord.vehicle_id == vehicle_id)
+            if start_date:
+                statement = statement.where(MaintenanceRecord.service_date >= start_date)
+            if end_date:
+                statement = statement.where(MaintenanceRecord.service_date <= end_date)
+            return statement.order_by(MaintenanceRecord.vehicle_id, MaintenanceRecord.service_date)
+        
+        # Rollups of every month that overlaps the range
+        month = MaintenanceCostRollup.year * 12 + MaintenanceCostRollup.month
+        statement = select(*expressions).join(Vehicle, Vehicle.id == MaintenanceCostRollup.vehicle_id).where(
+            MaintenanceCostRollup.user_id == user_id
+        )
+        if vehicle_id:
+            statement = statement.where(MaintenanceCostRollup.vehicle_id == vehicle_id)
+        if start_date:
+            statement = statement.where(month >= start_date.year * 12 + start_date.month)
+        if end_date:
+            statement = statement.where(month <= end_date.year * 12 + end_date.month)
+        return statement.order_by(
+            MaintenanceCostRollup.vehicle_id, MaintenanceCostRollup.year,
+            MaintenanceCostRollup.month, MaintenanceCostRollup.service_type
+        )
+    
+    def batches(self, dataset: str, user_id: str, vehicle_id: Optional[str] = None,
+                start_date: Optional[date] = None, end_date: Optional[date] = None) -> Iterator[List]:
+        """Rows of the export, chunk_size at a time"""
+        statement = self._statement(dataset, user_id, vehicle_id, start_date, end_date)
+        db = self.session_factory()
+        try:
+            result = db.execute(statement, execution_options={"yield_per": self.chunk_size})
+            for rows in result.partitions():
+                yield rows
+        finally:
+            db.close()
+    
+    # === FORMATS ===
+    
+    def csv_stream(self, dataset: str, user_id: str, **filters) -> Iterator[bytes]:
+        """CSV with a header row, one encoded chunk per batch"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _, _ in self.columns(dataset)])
+        
+        for rows in self.batches(dataset, user_id, **filters):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        
+        # Header only when there are no rows
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    
+    def parquet_stream(self, dataset: str, user_id: str, **filters) -> Iterator[bytes]:
+        """Parquet file with one row group per batch (needs pyarrow)"""
+        types = {"string": pa.string(), "int": pa.int64(), "date": pa.date32(), "money": pa.decimal128(12, 2)}
+        columns = self.columns(dataset)
+        schema = pa.schema([(name, types[kind]) for name, _, kind in columns])
+        
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        try:
+            for rows in self.batches(dataset, user_id, **filters):
+                arrays = [pa.array([row[i] for row in rows], type=schema.field(i).type) for i in range(len(columns))]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
@@ -0,0 +1,292 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.models.forecast import CostForecast
+from app.models.maintenance import MaintenanceRecord, MaintenanceCostRollup
+from app.models.vehicle import Vehicle
+from app.schemas.analytics_schemas import PredictiveAnalytics, CategoryForecast
+from app.utils.forecasting import SeriesForecast, fit_monthly_series, grouped_linear_fit
+
+logger = logging.getLogger(__name__)
+
+# Months forecast ahead (the yearly cost is their sum)
+HORIZON_MONTHS = 12
+
+# Rows read per round trip and inserted per statement
+FORECAST_CHUNK_SIZE = 1000
+
+# Yearly change of the spending trend worth a recommendation
+TREND_ALERT_RATIO = 0.2
+
+def _month_index(year: int, month: int) -> int:
+    return year * 12 + month - 1
+
+def _money(value: float) -> Decimal:
+    return Decimal(f"{value:.2f}")
+
+class CostForecastingService:
+    """
+    Batch cost forecasts for every user, vehicle and service category.
+    run() reads the monthly cost rollups of the last history_months complete
+    months into one array per level (vehicles, users, user categories), fits
+    them all at once with fit_monthly_series, fits every vehicle's mileage
+    against time with one grouped regression, and replaces cost_forecasts.
+    It runs nightly; requests only read the stored rows.
+    """
+    
+    def __init__(self, db: Session, history_months: int = 24):
+        self.db = db
+        self.history_months = history_months
+    
+    # === BATCH ===
+    
+    def run(self, today: Optional[date] = None) -> int:
+        """Recompute and store the forecasts of all users; returns the rows written"""
+        today = today or date.today()
+        end = _month_index(today.year, today.month)  # current month, first forecast column
+        start = end - self.history_months
+        columns = self.history_months
+        column_months = np.arange(start, end + HORIZON_MONTHS) % 12
+        
+        vehicles = self.db.query(Vehicle.id, Vehicle.user_id).all()
+        if not vehicles:
+            return self._store([])
+        vehicle_index = {vehicle_id: i for i, (vehicle_id, _) in enumerate(vehicles)}
+        user_ids = sorted({user_id for _, user_id in vehicles})
+        user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        vehicle_users = np.array([user_index[user_id] for _, user_id in vehicles])
+        
+        # Monthly cost arrays (complete months of the history window)
+        vehicle_costs = np.zeros((len(vehicles), columns))
+        category_index: Dict[Tuple[str, str], int] = {}
+        category_cells: List[Tuple[int, int, float]] = []
+        type_totals: Dict[Tuple[str, str], List] = defaultdict(lambda: [0.0, 0])
+        
+        month = MaintenanceCostRollup.year * 12 + MaintenanceCostRollup.month - 1
+        cells = self.db.query(
+            MaintenanceCostRollup.user_id,
+            MaintenanceCostRollup.vehicle_id,
+            MaintenanceCostRollup.service_type,
+            month,
+            MaintenanceCostRollup.total_cost,
+            MaintenanceCostRollup.transaction_count
+        ).filter(month >= start, month < end)
+        for user_id, vehicle_id, service_type, month_index, total_cost, transaction_count in cells.yield_per(FORECAST_CHUNK_SIZE):
+            if vehicle_id not in vehicle_index:
+                continue
+            cost = float(total_cost or 0)
+            column = month_index - start
+            vehicle_costs[vehicle_index[vehicle_id], column] += cost
+            
+            key = (user_id, service_type)
+            row = category_index.setdefault(key, len(category_index))
+            category_cells.append((row, column, cost))
+            if total_cost is not None:
+                type_totals[(vehicle_id, service_type)][0] += cost
+                type_totals[(vehicle_id, service_type)][1] += transaction_count
+        
+        category_costs = np.zeros((len(category_index), columns))
+        if category_cells:
+            rows, cols, costs = (np.array(values) for values in zip(*category_cells))
+            np.add.at(category_costs, (rows.astype(int), cols.astype(int)), costs)
+        user_costs = np.zeros((len(user_ids), columns))
+        np.add.at(user_costs, vehicle_users, vehicle_costs)
+        
+        # Where each series' history starts, so the months before it are not read as zeros
+        vehicle_first = np.full(len(vehicles), columns)
+        category_first = np.full(len(category_index), columns)
+        first_months = self.db.query(
+            MaintenanceCostRollup.user_id,
+            MaintenanceCostRollup.vehicle_id,
+            MaintenanceCostRollup.service_type,
+            func.min(month)
+        ).group_by(
+            MaintenanceCostRollup.user_id, MaintenanceCostRollup.vehicle_id, MaintenanceCostRollup.service_type
+        )
+        for user_id, vehicle_id, service_type, first_month in first_months.yield_per(FORECAST_CHUNK_SIZE):
+            column = max(first_month - start, 0)
+            if vehicle_id in vehicle_index:
+                i = vehicle_index[vehicle_id]
+                vehicle_first[i] = min(vehicle_first[i], column)
+            if (user_id, service_type) in category_index:
+                i = category_index[(user_id, service_type)]
+                category_first[i] = min(category_first[i], column)
+        user_first = np.full(len(user_ids), columns)
+        np.minimum.at(user_first, vehicle_users, vehicle_first)
+        
+        vehicle_fit = fit_monthly_series(vehicle_costs, vehicle_first, column_months, HORIZON_MONTHS)
+        user_fit = fit_monthly_series(user_costs, user_first, column_months, HORIZON_MONTHS)
+        category_fit = fit_monthly_series(category_costs, category_first, column_months, HORIZON_MONTHS)
+        
+        mileage_per_day, next_due = self._mileage_and_due(vehicle_index, today - timedelta(days=31 * columns))
+        
+        # Rows to store: one per vehicle, one per user with their category forecasts
+        categories_by_user: Dict[str, List[Dict]] = defaultdict(list)
+        for (user_id, service_type), i in category_index.items():
+            categories_by_user[user_id].append({
+                "category": service_type,
+                "predicted_monthly_cost": str(_money(category_fit.forecast[i, 0])),
+                "predicted_yearly_cost": str(_money(category_fit.forecast[i].sum())),
+                "monthly_trend": str(_money(category_fit.slope[i])),
+                "confidence_score": round(float(category_fit.confidence[i]), 4)
+            })
+        
+        rows = []
+        generated_at = datetime.now()
+        next_by_user: Dict[str, Tuple[date, Optional[Decimal]]] = {}
+        for i, (vehicle_id, user_id) in enumerate(vehicles):
+            next_date, next_cost = self._next_maintenance(
+                vehicle_id, next_due.get(vehicle_id), mileage_per_day[i], type_totals, today
+            )
+            if next_date and (user_id not in next_by_user or next_date < next_by_user[user_id][0]):
+                next_by_user[user_id] = (next_date, next_cost)
+            
+            rows.append(self._row(
+                user_id, vehicle_id, vehicle_fit, i, generated_at, next_date, next_cost,
+                mileage=int(round(mileage_per_day[i] * 30)) if mileage_per_day[i] > 0 else None
+            ))
+        
+        for user_id, i in user_index.items():
+            categories = sorted(categories_by_user[user_id], key=lambda c: Decimal(c["predicted_yearly_cost"]), reverse=True)
+            next_date, next_cost = next_by_user.get(user_id, (None, None))
+            rows.append(self._row(user_id, None, user_fit, i, generated_at, next_date, next_cost, categories=categories))
+        
+        return self._store(rows)
+    
+    def _mileage_and_due(self, vehicle_index: Dict[str, int], since: date) -> Tuple[np.ndarray, Dict[str, Tuple]]:
+        """Miles per day of every vehicle (one grouped fit) and the due date/mileage of its latest record"""
+        groups, days, mileages = [], [], []
+        next_due: Dict[str, Tuple] = {}
+        records = self.db.query(
+            MaintenanceRecord.vehicle_id,
+            MaintenanceRecord.service_date,
+            MaintenanceRecord.mileage_at_service,
+            MaintenanceRecord.service_type,
+            MaintenanceRecord.next_service_due,
+            MaintenanceRecord.next_mileage_due
+        ).filter(MaintenanceRecord.service_date >= since).order_by(MaintenanceRecord.service_date)
+        for vehicle_id, service_date, mileage, service_type, due_date, due_mileage in records.yield_per(FORECAST_CHUNK_SIZE):
+            i = vehicle_index.get(vehicle_id)
+            if i is None:
+                continue
+            groups.append(i)
+            days.append(service_date.toordinal())
+            mileages.append(mileage)
+            if due_date or due_mileage:
+                next_due[vehicle_id] = (service_type, due_date, due_mileage, service_date, mileage)
+        
+        fit = grouped_linear_fit(np.array(groups, dtype=int), np.array(days), np.array(mileages), len(vehicle_index))
+        return np.clip(fit.slope, 0, None), next_due
+    
+    @staticmethod
+    def _next_maintenance(vehicle_id: str, due: Optional[Tuple], mileage_per_day: float,
+                          type_totals: Dict, today: date) -> Tuple[Optional[date], Optional[Decimal]]:
+        """Due date of the latest record's next service (the earlier of date and projected mileage) and its usual cost"""
+        if not due:
+            return None, None
+        service_type, due_date, due_mileage, service_date, mileage = due
+        
+        candidates = [due_date] if due_date else []
+        if due_mileage and mileage_per_day > 0:
+            days = max(due_mileage - mileage, 0) / mileage_per_day
+            candidates.append(service_date + timedelta(days=int(days)))
+        if not candidates:
+            return None, None
+        next_date = max(min(candidates), today)
+        
+        total, count = type_totals.get((vehicle_id, service_type), (0.0, 0))
+        return next_date, _money(total / count) if count else None
+    
+    def _row(self, user_id: str, vehicle_id: Optional[str], fit: SeriesForecast, i: int, generated_at: datetime,
+             next_date: Optional[date], next_cost: Optional[Decimal], mileage: Optional[int] = None, categories: Optional[List[Dict]] = None) -> Dict:
+        forecast = fit.forecast[i]
+        yearly = float(forecast.sum())
+        return {
+            "user_id": user_id,
+            "vehicle_id": vehicle_id,
+            "predicted_monthly_cost": _money(forecast[0]),
+            "predicted_yearly_cost": _money(yearly),
+            "monthly_trend": _money(fit.slope[i]),
+            "next_maintenance_cost": next_cost,
+            "next_maintenance_date": next_date,
+            "predicted_monthly_mileage": mileage,
+            "category_forecasts": categories,
+            "recommendations": self._recommendations(fit, i, yearly, next_date, categories),
+            "confidence_score": round(float(fit.confidence[i]), 4),
+            "generated_at": generated_at
+        }
+    
+    @staticmethod
+    def _recommendations(fit: SeriesForecast, i: int, yearly: float, next_date: Optional[date], categories: Optional[List[Dict]]) -> List[str]:
+        recommendations = []
+        mean, slope = float(fit.mean[i]), float(fit.slope[i])
+        
+        if mean > 0 and abs(slope * 12) >= mean * TREND_ALERT_RATIO:
+            change = slope * 12 / mean * 100
+            if change > 0:
+                recommendations.append(f"Your maintenance spending is trending up about {change:.0f}% per year")
+            else:
+                recommendations.append(f"Your maintenance spending is trending down about {-change:.0f}% per year")
+        
+        if categories:
+            rising = max(categories, key=lambda c: Decimal(c["monthly_trend"]))
+            if Decimal(rising["monthly_trend"]) > 0:
+                recommendations.append(f"{rising['category']} costs are rising. Consider comparing workshop quotes")
+        
+        if yearly > 0:
+            recommendations.append(f"Set aside about ${yearly / 12:.2f} per month for maintenance")
+        if next_date:
+            recommendations.append(f"Next maintenance expected around {next_date.isoformat()}")
+        if fit.confidence[i] < 0.3:
+            recommendations.append("Forecasts will improve as more maintenance history is recorded")
+        return recommendations
+    
+    def _store(self, rows: List[Dict]) -> int:
+        try:
+            self.db.query(CostForecast).delete(synchronize_session=False)
+            for start in range(0, len(rows), FORECAST_CHUNK_SIZE):
+                self.db.execute(insert(CostForecast), rows[start:start + FORECAST_CHUNK_SIZE])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        logger.info(f"Stored {len(rows)} cost forecasts")
+        return len(rows)
+    
+    # === READS ===
+    
+    def has_forecasts(self) -> bool:
+        return self.db.query(CostForecast.id).first() is not None
+    
+    def get_forecast(self, user_id: str, vehicle_id: Optional[str] = None) -> Optional[PredictiveAnalytics]:
+        """Stored forecast of a user, or of one of their vehicles"""
+        query = self.db.query(CostForecast).filter(CostForecast.user_id == user_id)
+        if vehicle_id:
+            query = query.filter(CostForecast.vehicle_id == vehicle_id)
+        else:
+            query = query.filter(CostForecast.vehicle_id.is_(None))
+        forecast = query.first()
+        if forecast is None:
+            return None
+        
+        return PredictiveAnalytics(
+            user_id=forecast.user_id,
+            vehicle_id=forecast.vehicle_id,
+            predicted_monthly_cost=forecast.predicted_monthly_cost,
+            predicted_yearly_cost=forecast.predicted_yearly_cost,
+            next_maintenance_cost=forecast.next_maintenance_cost,
+            next_maintenance_date=forecast.next_maintenance_date,
+            monthly_trend=forecast.monthly_trend,
+            predicted_monthly_mileage=forecast.predicted_monthly_mileage,
+            category_forecasts=[CategoryForecast(**category) for category in forecast.category_forecasts or []],
+            recommendations=forecast.recommendations or [],
+            confidence_score=forecast.confidence_score,
+            generated_at=forecast.generated_at
+        )
@@ -0,0 +1,112 @@
+import difflib
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.constants import PR_MUNICIPALITIES, PR_BARRIOS, PR_PLACE_ALIASES
+from app.utils.helpers import normalize_text
+
+# Words that do not help identify a place ("Barrio Santurce", "Ponce, PR")
+PLACE_PREFIXES = ("municipio de ", "municipio ", "pueblo de ", "barrio ", "bo ", "sector ")
+PLACE_SUFFIXES = (" puerto rico", " pr")
+
+class PuertoRicoGazetteer:
+    """
+    Offline lookup of Puerto Rico municipalities and common barrios.
+    Resolves city-level geocoding queries in-process, with fuzzy matching
+    for typos and missing accents.
+    """
+    
+    def __init__(self, fuzzy_cutoff: float = 0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._places: Dict[str, List[Dict]] = {}
+        
+        for name, lat, lon in PR_MUNICIPALITIES:
+            self._add(name, name, lat, lon, "municipality")
+        for name, municipality, lat, lon in PR_BARRIOS:
+            self._add(name, municipality, lat, lon, "barrio")
+        
+        self._aliases = {normalize_text(alias): normalize_text(name) for alias, name in PR_PLACE_ALIASES.items()}
+        self._names = list(self._places)
+    
+    def _add(self, name: str, municipality: str, lat: float, lon: float, place_type: str):
+        self._places.setdefault(normalize_text(name), []).append({
+            "name": name,
+            "municipality": municipality,
+            "latitude": lat,
+            "longitude": lon,
+            "type": place_type
+        })
+    
+    @staticmethod
+    def clean(text: Optional[str]) -> str:
+        """Normalized place name without filler words"""
+        text = normalize_text(text)
+        for prefix in PLACE_PREFIXES:
+            if text.startswith(prefix):
+                text = text[len(prefix):]
+        for suffix in PLACE_SUFFIXES:
+            if text.endswith(suffix):
+                text = text[:-len(suffix)]
+        return "" if text in ("puerto rico", "pr") else text.strip()
+    
+    def _match(self, name: str) -> Optional[str]:
+        if not name:
+            return None
+        if name in self._places:
+            return name
+        if name in self._aliases:
+            return self._aliases[name]
+        
+        matches = difflib.get_close_matches(name, self._names, n=1, cutoff=self.fuzzy_cutoff)
+        return matches[0] if matches else None
+    
+    def lookup(self, name: Optional[str], municipality: Optional[str] = None) -> Optional[Dict]:
+        """
+        Find a municipality or barrio by name
+        municipality disambiguates barrios that share a name
+        """
+        key = self._match(self.clean(name))
+        if key is None:
+            return None
+        
+        candidates = self._places[key]
+        if len(candidates) > 1:
+            hint = self._match(self.clean(municipality))
+            for place in candidates:
+                if hint and normalize_text(place["municipality"]) == hint:
+                    return place
+            for place in candidates:
+                if place["type"] == "municipality":
+                    return place
+        return candidates[0]
+    
+    def resolve(self, address: Optional[str], city: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """
+        Coordinates for a city-level query: the address itself names a
+        municipality or barrio, or only the city was given
+        Street addresses return None so they go to the network geocoder
+        """
+        place = self.lookup(address, city) if self.clean(address) else self.lookup(city)
+        if place is None:
+            return None
+        return (place["latitude"], place["longitude"])
+    
+    def locate(self, address: Optional[str], city: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """
+        Most specific known place mentioned anywhere in the query
+        Tries the comma-separated parts of the address, then the city
+        """
+        for part in (address or "").split(",") + [city]:
+            place = self.lookup(part, city)
+            if place:
+                return (place["latitude"], place["longitude"])
+        return None
+    
+    def municipalities(self) -> List[Dict]:
+        """All municipalities, sorted by name"""
+        return sorted(
+            (place for places in self._places.values() for place in places if place["type"] == "municipality"),
+            key=lambda place: normalize_text(place["name"])
+        )
+
+# Process-wide gazetteer used by GeolocationService
+pr_gazetteer = PuertoRicoGazetteer()
@@ -0,0 +1,146 @@
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.models.geocoding import GeocodeCacheEntry
+from app.utils.cache import LRUCache, MISSING
+from app.utils.helpers import normalize_text
+
+logger = logging.getLogger(__name__)
+
+class GeocodingCache:
+    """
+    Two-level cache for geocoding results: an in-process LRU in front of
+    the geocode_cache table, so repeats survive restarts and skip Nominatim.
+    Negative results are kept too, with a shorter TTL.
+    """
+    
+    def __init__(self, maxsize: int, ttl: timedelta, negative_ttl: timedelta):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.db_hits = 0
+        self.misses = 0
+    
+    # === KEYS ===
+    
+    @staticmethod
+    def address_key(address: str, city: Optional[str]) -> str:
+        return f"fwd:{normalize_text(address)}|{normalize_text(city)}"
+    
+    @staticmethod
+    def reverse_key(lat: float, lon: float) -> str:
+        # 5 decimals ≈ 1 m, well below what changes the resolved address
+        return f"rev:{lat:.5f},{lon:.5f}"
+    
+    # === LOOKUPS ===
+    
+    def get(self, key: str) -> Any:
+        """
+        Cached payload for the key, None for a cached negative result,
+        or MISSING when neither level has a live entry
+        """
+        value = self._memory.get(key)
+        if value is not MISSING:
+            return value
+        
+        entry = self._load(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return MISSING
+        
+        with self._lock:
+            self.db_hits += 1
+        
+        # Promote to memory for the rest of its lifetime
+        payload = entry.payload if entry.found else None
+        remaining = (entry.expires_at - datetime.utcnow()).total_seconds()
+        self._memory.set(key, payload, ttl_seconds=remaining)
+        return payload
+    
+    def set(self, key: str, payload: Any):
+        """Store a result; a None payload is stored as a negative entry"""
+        found = payload is not None
+        ttl = self.ttl if found else self.negative_ttl
+        
+        self._memory.set(key, payload, ttl_seconds=ttl.total_seconds())
+        self._store(key, payload, found, datetime.utcnow() + ttl)
+    
+    def clear_memory(self):
+        """Drop the in-process entries (the table is kept)"""
+        self._memory.clear()
+    
+    def purge_expired(self) -> int:
+        """Delete expired rows from the cache table"""
+        db = SessionLocal()
+        try:
+            deleted = db.query(GeocodeCacheEntry).filter(
+                GeocodeCacheEntry.expires_at <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Error purging geocode cache: {str(e)}")
+            return 0
+        finally:
+            db.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for both cache levels"""
+        memory = self._memory.stats()
+        with self._lock:
+            db_hits = self.db_hits
+            misses = self.misses
+        
+        hits = memory["hits"] + db_hits
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "memory_hits": memory["hits"],
+            "db_hits": db_hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_size": memory["size"],
+            "memory_max_size": memory["max_size"],
+            "memory_evictions": memory["evictions"]
+        }
+    
+    # === PERSISTENCE ===
+    
+    def _load(self, key: str) -> Optional[GeocodeCacheEntry]:
+        db = SessionLocal()
+        try:
+            return db.query(GeocodeCacheEntry).filter(
+                GeocodeCacheEntry.key == key,
+                GeocodeCacheEntry.expires_at > datetime.utcnow()
+            ).first()
+        except Exception as e:
+            # The cache must never break geocoding
+            logger.warning(f"Error reading geocode cache: {str(e)}")
+            return None
+        finally:
+            db.close()
+    
+    def _store(self, key: str, payload: Any, found: bool, expires_at: datetime):
+        db = SessionLocal()
+        try:
+            db.merge(GeocodeCacheEntry(key=key, found=found, payload=payload, expires_at=expires_at))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Error writing geocode cache: {str(e)}")
+        finally:
+            db.close()
+
+# Process-wide cache used by GeolocationService
+geocoding_cache = GeocodingCache(
+    maxsize=settings.GEOCODE_CACHE_SIZE,
+    ttl=timedelta(days=settings.GEOCODE_CACHE_TTL_DAYS),
+    negative_ttl=timedelta(hours=settings.GEOCODE_NEGATIVE_TTL_HOURS)
+)
@@ -1,9 +1,15 @@
 import math
+import numpy as np
 import requests
 from typing import List, Dict, Optional, Tuple
 from decimal import Decimal
 import logging
 
+from app.services.geocoding_cache_service import geocoding_cache
+from app.services.gazetteer_service import pr_gazetteer
+from app.utils.cache import MISSING
+from app.utils.rate_limiter import TokenBucket
+
 logger = logging.getLogger(__name__)
 
 class GeolocationService:
@@ -54,11 +60,68 @@ class GeolocationService:
         return max(travel_time_minutes, 1)  # Minimum 1 minute
     
     @staticmethod
-    def geocode_address(address: str, city: str = "Puerto Rico") -> Optional[Tuple[float, float]]:
+    def calculate_distances_batch(lat: float, lon: float, latitudes, longitudes,
+                                  avg_speed_kmh: float = 40) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized Haversine from one point to many workshops in a single pass
+        Returns (distances_km, travel_time_minutes) arrays matching calculate_distance
+        and estimate_travel_time; missing coordinates get an infinite distance
+        """
+        lats = np.asarray(latitudes, dtype=float)
+        lons = np.asarray(longitudes, dtype=float)
+        
+        if not lat or not lon:
+            distances = np.full(lats.shape, np.inf)
+            return distances, np.zeros(lats.shape, dtype=int)
+        
+        # Radius of the Earth in kilometers
+        R = 6371.0
+        
+        lat1_rad = math.radians(lat)
+        lon1_rad = math.radians(lon)
+        lat2_rad = np.radians(lats)
+        lon2_rad = np.radians(lons)
+        
+        dlat = lat2_rad - lat1_rad
+        dlon = lon2_rad - lon1_rad
+        
+        a = (np.sin(dlat / 2)**2 +
+             math.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2)**2)
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        distances = np.round(R * c, 2)
+        
+        # Same guard as calculate_distance: zero or missing coordinates
+        missing = np.isnan(lats) | np.isnan(lons) | (lats == 0) | (lons == 0)
+        distances[missing] = np.inf
+        
+        # Whole minutes, at least 1 for any positive distance
+        finite = np.isfinite(distances) & (distances > 0)
+        travel_times = np.zeros(distances.shape, dtype=int)
+        travel_times[finite] = np.maximum((distances[finite] / avg_speed_kmh * 60).astype(int), 1)
+        
+        return distances, travel_times
+    
+    @staticmethod
+    def geocode_address(address: str, city: str = "Puerto Rico",
+                        rate_limiter: Optional[TokenBucket] = None,
+                        fallback: bool = True) -> Optional[Tuple[float, float]]:
         """
         Convert address to coordinates using Nominatim (OpenStreetMap)
         Returns (latitude, longitude) or None if not found
+        rate_limiter, if given, is only charged for actual Nominatim requests
+        fallback=False re-raises request errors instead of answering with the
+        closest gazetteer place, for callers that must tell the two apart
         """
+        # City-level queries are answered by the offline gazetteer
+        place = pr_gazetteer.resolve(address, city)
+        if place:
+            return place
+        
+        cache_key = geocoding_cache.address_key(address, city)
+        cached = geocoding_cache.get(cache_key)
+        if cached is not MISSING:
+            return tuple(cached) if cached else None
+        
         try:
             # Use Nominatim from OpenStreetMap (free)
             base_url = "https://nominatim.openstreetmap.org/search"
@@ -77,6 +140,9 @@ class GeolocationService:
                 'User-Agent': 'MechLink/1.0 (contact@mechlink.com)'
             }
             
+            if rate_limiter:
+                rate_limiter.acquire()
+            
             response = requests.get(base_url, params=params, headers=headers, timeout=5)
             response.raise_for_status()
             
@@ -86,19 +152,30 @@ class GeolocationService:
                 location = data[0]
                 lat = float(location['lat'])
                 lon = float(location['lon'])
+                geocoding_cache.set(cache_key, [lat, lon])
                 return (lat, lon)
             
+            # Remember the miss too (shorter TTL); request errors are not cached
+            geocoding_cache.set(cache_key, None)
             return None
             
         except Exception as e:
             logger.error(f"Error in geocoding: {str(e)}")
-            return None
+            if not fallback:
+                raise
+            # No network: settle for the closest known place in the query
+            return pr_gazetteer.locate(address, city)
     
     @staticmethod
     def reverse_geocode(lat: float, lon: float) -> Optional[Dict]:
         """
         Convert coordinates to readable address
         """
+        cache_key = geocoding_cache.reverse_key(lat, lon)
+        cached = geocoding_cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+        
         try:
             base_url = "https://nominatim.openstreetmap.org/reverse"
             
@@ -120,14 +197,17 @@ class GeolocationService:
             
             if 'address' in data:
                 address = data['address']
-                return {
+                location_info = {
                     'formatted_address': data.get('display_name', ''),
                     'city': address.get('city') or address.get('town') or address.get('municipality', ''),
                     'state': address.get('state', ''),
                     'country': address.get('country', ''),
                     'postal_code': address.get('postcode', '')
                 }
+                geocoding_cache.set(cache_key, location_info)
+                return location_info
             
+            geocoding_cache.set(cache_key, None)
             return None
             
         except Exception as e:
@@ -183,21 +263,20 @@ def add_distance_to_workshops(workshops: List[Dict], user_lat: float, user_lon:
     """
     Add distance information to a workshop list
     """
-    geo_service = GeolocationService()
+    located = [w for w in workshops if w.get('latitude') and w.get('longitude')]
     
-    for workshop in workshops:
-        if workshop.get('latitude') and workshop.get('longitude'):
-            workshop_lat = float(workshop['latitude'])
-            workshop_lon = float(workshop['longitude'])
-            
-            distance = geo_service.calculate_distance(
-                user_lat, user_lon, workshop_lat, workshop_lon
-            )
-            travel_time = geo_service.estimate_travel_time(distance)
-            
+    if located:
+        distances, travel_times = GeolocationService.calculate_distances_batch(
+            user_lat, user_lon,
+            [float(w['latitude']) for w in located],
+            [float(w['longitude']) for w in located]
+        )
+        for workshop, distance, travel_time in zip(located, distances.tolist(), travel_times.tolist()):
             workshop['distance_km'] = distance
             workshop['estimated_travel_time_minutes'] = travel_time
-        else:
+    
+    for workshop in workshops:
+        if not (workshop.get('latitude') and workshop.get('longitude')):
             workshop['distance_km'] = None
             workshop['estimated_travel_time_minutes'] = None
     
@@ -0,0 +1,184 @@
+import math
+import threading
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.models.workshop import Workshop
+from app.services.workshop_version_service import WorkshopVersionCheck
+
+logger = logging.getLogger(__name__)
+
+# Columns needed to draw a marker; used instead of loading full rows
+MAP_MARKER_COLUMNS = (
+    Workshop.id,
+    Workshop.name,
+    Workshop.latitude,
+    Workshop.longitude,
+    Workshop.rating_average,
+    Workshop.total_reviews,
+    Workshop.specialties,
+    Workshop.city,
+    Workshop.phone
+)
+
+# Markers closer than this on screen are merged into one cluster
+CLUSTER_RADIUS_PX = 60
+TILE_SIZE_PX = 256
+
+def cell_size_for_zoom(zoom: int, radius_px: int = CLUSTER_RADIUS_PX) -> float:
+    """Grid cell size in degrees that spans radius_px at the given web map zoom"""
+    return 360.0 * radius_px / (TILE_SIZE_PX * 2 ** zoom)
+
+def cell_for(lat: float, lon: float, cell_size: float) -> Tuple[int, int]:
+    """Grid cell (row, col) of a point"""
+    return (int(math.floor(lat / cell_size)), int(math.floor(lon / cell_size)))
+
+def cluster_rows(rows: Iterable, zoom: int) -> Dict[Tuple[int, int], Dict]:
+    """
+    Group marker rows into grid cells for a zoom level
+    Each cell keeps its count, centroid, extent and best rated workshop
+    """
+    cell_size = cell_size_for_zoom(zoom)
+    cells: Dict[Tuple[int, int], Dict] = {}
+    
+    for row in rows:
+        lat, lon = float(row.latitude), float(row.longitude)
+        rating = float(row.rating_average or 0)
+        key = cell_for(lat, lon, cell_size)
+        
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = {
+                "count": 1,
+                "lat_sum": lat,
+                "lon_sum": lon,
+                "north": lat, "south": lat, "east": lon, "west": lon,
+                "best_rating": rating,
+                "best_workshop_id": row.id,
+                "row": row
+            }
+            continue
+        
+        cell["count"] += 1
+        cell["lat_sum"] += lat
+        cell["lon_sum"] += lon
+        cell["north"] = max(cell["north"], lat)
+        cell["south"] = min(cell["south"], lat)
+        cell["east"] = max(cell["east"], lon)
+        cell["west"] = min(cell["west"], lon)
+        cell["row"] = None
+        if rating > cell["best_rating"]:
+            cell["best_rating"] = rating
+            cell["best_workshop_id"] = row.id
+    
+    for cell in cells.values():
+        cell["latitude"] = cell["lat_sum"] / cell["count"]
+        cell["longitude"] = cell["lon_sum"] / cell["count"]
+    
+    return cells
+
+class ClusterLevel(NamedTuple):
+    """Clusters of every active workshop at one zoom, plus the rows of each cell"""
+    cells: Dict[Tuple[int, int], Dict]
+    # cell -> (latitude, longitude, row) of the workshops in it
+    members: Dict[Tuple[int, int], List[Tuple[float, float, object]]]
+
+class WorkshopClusterIndex:
+    """
+    Precomputed marker clusters of all active workshops, cached per zoom level.
+    Levels are built lazily from one projected snapshot and dropped on any workshop
+    write, or when the workshops table changed behind the snapshot (e.g. a geocoding
+    backfill run by another process). Views of an area reuse the cached cells that
+    lie wholly inside it and only re-cluster the cells on its edge.
+    """
+    
+    def __init__(self, check_seconds: float = 30):
+        self._rows: Optional[List] = None
+        self._levels: Dict[int, ClusterLevel] = {}
+        self._lock = threading.Lock()
+        self._version_check = WorkshopVersionCheck(check_seconds)
+    
+    def invalidate(self):
+        """Forget the snapshot and every cached level"""
+        with self._lock:
+            self._rows = None
+            self._levels = {}
+    
+    def _level(self, db: Session, zoom: int) -> ClusterLevel:
+        with self._lock:
+            if self._rows is not None and self._version_check.is_stale(db):
+                self._rows = None
+                self._levels = {}
+            
+            level = self._levels.get(zoom)
+            if level is not None:
+                return level
+            
+            if self._rows is None:
+                self._version_check.mark_built(self._version_check.current(db))
+                self._rows = db.query(*MAP_MARKER_COLUMNS).filter(
+                    Workshop.is_active == True,
+                    Workshop.latitude.isnot(None),
+                    Workshop.longitude.isnot(None)
+                ).all()
+            
+            cell_size = cell_size_for_zoom(zoom)
+            members: Dict[Tuple[int, int], List] = {}
+            for row in self._rows:
+                lat, lon = float(row.latitude), float(row.longitude)
+                members.setdefault(cell_for(lat, lon, cell_size), []).append((lat, lon, row))
+            
+            level = ClusterLevel(cells=cluster_rows(self._rows, zoom), members=members)
+            self._levels[zoom] = level
+            logger.info(f"Built {len(level.cells)} map clusters for zoom {zoom}")
+            return level
+    
+    def level(self, db: Session, zoom: int) -> Dict[Tuple[int, int], Dict]:
+        """Clusters for a zoom level, computed on first use"""
+        return self._level(db, zoom).cells
+    
+    def in_area(self, db: Session, zoom: int, north: float, south: float,
+                east: float, west: float) -> Dict[Tuple[int, int], Dict]:
+        """
+        Clusters of the workshops inside a rectangle at a zoom level
+        Cells wholly inside are served from the cached level; cells on the edge
+        are re-clustered from their cached rows, counting only those inside
+        """
+        level = self._level(db, zoom)
+        cell_size = cell_size_for_zoom(zoom)
+        min_row, min_col = cell_for(south, west, cell_size)
+        max_row, max_col = cell_for(north, east, cell_size)
+        
+        # Wide area over a sparse level: walking the occupied cells is cheaper
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(level.cells):
+            keys = [
+                key for key in level.cells
+                if min_row <= key[0] <= max_row and min_col <= key[1] <= max_col
+            ]
+        else:
+            keys = [
+                (row, col)
+                for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)
+                if (row, col) in level.cells
+            ]
+        
+        cells = {}
+        for key in keys:
+            row, col = key
+            if min_row < row < max_row and min_col < col < max_col:
+                cells[key] = level.cells[key]
+                continue
+            
+            inside = [
+                member_row for lat, lon, member_row in level.members[key]
+                if south <= lat <= north and west <= lon <= east
+            ]
+            if inside:
+                cells[key] = cluster_rows(inside, zoom)[key]
+        return cells
+
+# Process-wide cluster cache used by /workshops/for-map
+workshop_cluster_index = WorkshopClusterIndex(check_seconds=settings.WORKSHOP_INDEX_CHECK_SECONDS)
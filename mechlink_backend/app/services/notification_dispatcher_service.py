@@ -0,0 +1,514 @@
+import os
+import time
+import uuid
+import queue
+import socket
+import itertools
+import threading
+import logging
+from concurrent.futures import Future, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_, update, bindparam, func, exists, case
+from sqlalchemy.orm import Session, aliased
+
+from app.config.settings import settings
+from app.models.notification import Notification, NotificationChannel, NotificationStatus, NotificationType
+from app.services.notification_service import NotificationService, next_attempt_at
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Results written back per statement
+STATUS_FLUSH_SIZE = 50
+
+CHANNEL_WORKERS = {
+    NotificationChannel.email: settings.NOTIFICATION_EMAIL_WORKERS,
+    NotificationChannel.sms: settings.NOTIFICATION_SMS_WORKERS,
+    NotificationChannel.push: settings.NOTIFICATION_PUSH_WORKERS,
+    NotificationChannel.in_app: settings.NOTIFICATION_IN_APP_WORKERS
+}
+
+# Provider send quotas (sends per second); in-app notifications are not limited
+CHANNEL_RATES = {
+    NotificationChannel.email: settings.NOTIFICATION_EMAIL_RATE_PER_SECOND,
+    NotificationChannel.sms: settings.NOTIFICATION_SMS_RATE_PER_SECOND,
+    NotificationChannel.push: settings.NOTIFICATION_PUSH_RATE_PER_SECOND
+}
+
+# Notification.priority values, most urgent first; anything else counts as "normal"
+PRIORITY_LEVELS = ("urgent", "high", "normal", "low")
+PRIORITY_RANK = {priority: rank for rank, priority in enumerate(PRIORITY_LEVELS)}
+DEFAULT_PRIORITY = "normal"
+
+# What happens to notifications found past the grace period (default "send"):
+# "send" sends them late, "coalesce" sends only the newest one per user, type,
+# channel and related appointment/vehicle/workshop, "expire" drops them
+CATCHUP_POLICIES = {
+    NotificationType.APPOINTMENT_REMINDER: "coalesce",
+    NotificationType.MAINTENANCE_REMINDER: "coalesce",
+    NotificationType.WORKSHOP_UPDATE: "coalesce",
+    NotificationType.SYSTEM_UPDATE: "coalesce",
+    NotificationType.PROMOTIONAL: "expire"
+}
+
+def priority_rank(priority: Optional[str]) -> int:
+    return PRIORITY_RANK.get(priority, PRIORITY_RANK[DEFAULT_PRIORITY])
+
+class ChannelQueue:
+    """
+    Worker pool of one channel fed by a priority queue: urgent sends start
+    before high, normal and low ones (FIFO within a priority), whichever tick
+    or caller queued them. Workers take a token from the channel's rate
+    limiter before each send. Depth and wait time (queued until the send
+    starts) are tracked per priority.
+    """
+    
+    def __init__(self, name: str, workers: int, limiter: Optional[TokenBucket] = None):
+        self.limiter = limiter
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._metrics = {
+            priority: {"depth": 0, "dispatched": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for priority in PRIORITY_LEVELS
+        }
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{name}-{index}", daemon=True)
+            for index in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def submit(self, priority: Optional[str], fn: Callable, *args) -> Future:
+        """Queue fn(*args) at a priority; the returned future can be cancelled until it starts"""
+        future = Future()
+        rank = priority_rank(priority)
+        with self._lock:
+            self._metrics[PRIORITY_LEVELS[rank]]["depth"] += 1
+        self._queue.put((rank, next(self._sequence), time.monotonic(), future, fn, args))
+        return future
+    
+    def _work(self):
+        while True:
+            rank, _, queued_at, future, fn, args = self._queue.get()
+            if future is None:
+                return
+            
+            metrics = self._metrics[PRIORITY_LEVELS[rank]]
+            with self._lock:
+                metrics["depth"] -= 1
+            if not future.set_running_or_notify_cancel():
+                continue
+            
+            if self.limiter:
+                self.limiter.acquire()
+            
+            wait = time.monotonic() - queued_at
+            with self._lock:
+                metrics["dispatched"] += 1
+                metrics["total_wait"] += wait
+                metrics["max_wait"] = max(metrics["max_wait"], wait)
+            
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+    
+    def shutdown(self):
+        """Stop the workers once the queued sends are done"""
+        for _ in self._threads:
+            # Sorts after every real priority
+            self._queue.put((len(PRIORITY_LEVELS), next(self._sequence), 0.0, None, None, ()))
+        for thread in self._threads:
+            thread.join()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                priority: {
+                    "depth": metrics["depth"],
+                    "dispatched": metrics["dispatched"],
+                    "avg_wait_seconds": round(metrics["total_wait"] / metrics["dispatched"], 3) if metrics["dispatched"] else 0.0,
+                    "max_wait_seconds": round(metrics["max_wait"], 3)
+                }
+                for priority, metrics in self._metrics.items()
+            }
+
+class NotificationDispatcher:
+    """
+    Outbox dispatcher for due notifications.
+    Rows are claimed with a lease (claimed_by/lease_until), so several dispatchers,
+    in this process or others, never send the same notification twice. Sends run
+    on a priority-ordered, rate-limited worker pool per channel (ChannelQueue)
+    and their results are written back in batches.
+    A dispatcher that dies leaves its rows to be claimed again once the lease ends.
+    Nothing is skipped for being late: overdue rows follow CATCHUP_POLICIES and
+    each tick sends at most batch_size rows per channel, oldest first.
+    Failed sends are retried at their backoff next_attempt_at on the same pools,
+    after the on-time rows of the tick, and a circuit breaker per channel stops
+    claiming (and cancels queued sends) while its provider keeps failing.
+    """
+    
+    def __init__(self, batch_size: int = 200, lease_seconds: int = 300, grace_minutes: int = 5,
+                 channel_workers: Optional[Dict[NotificationChannel, int]] = None):
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_seconds)
+        self.grace = timedelta(minutes=grace_minutes)
+        self.channel_workers = channel_workers or CHANNEL_WORKERS
+        self.limiters = {channel: TokenBucket(rate) for channel, rate in CHANNEL_RATES.items() if rate}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.breakers = {
+            channel: CircuitBreaker(
+                failure_rate=settings.NOTIFICATION_BREAKER_FAILURE_RATE,
+                min_requests=settings.NOTIFICATION_BREAKER_MIN_REQUESTS,
+                window_seconds=settings.NOTIFICATION_BREAKER_WINDOW_SECONDS,
+                cooldown_seconds=settings.NOTIFICATION_BREAKER_COOLDOWN_SECONDS
+            )
+            for channel in NotificationChannel
+        }
+        self._queues: Dict[NotificationChannel, ChannelQueue] = {}
+        self._lock = threading.Lock()
+    
+    def _queue(self, channel: NotificationChannel) -> ChannelQueue:
+        """Worker pool of a channel, started on first use"""
+        with self._lock:
+            channel_queue = self._queues.get(channel)
+            if channel_queue is None:
+                channel_queue = ChannelQueue(
+                    name=f"notify-{channel.value}",
+                    workers=self.channel_workers.get(channel, 1),
+                    limiter=self.limiters.get(channel)
+                )
+                self._queues[channel] = channel_queue
+            return channel_queue
+    
+    def shutdown(self):
+        """Stop the worker pools after their queued sends"""
+        with self._lock:
+            queues, self._queues = list(self._queues.values()), {}
+        for channel_queue in queues:
+            channel_queue.shutdown()
+    
+    # === CLAIMS ===
+    
+    @staticmethod
+    def _due_filters(now: datetime) -> List:
+        """Pending, due and unexpired (served by the status/scheduled_for index)"""
+        return [
+            Notification.status == NotificationStatus.PENDING,
+            Notification.scheduled_for <= now,
+            or_(
+                Notification.expires_at.is_(None),
+                Notification.expires_at > now
+            )
+        ]
+    
+    @staticmethod
+    def _retry_filters(now: datetime) -> List:
+        """Failed, backoff elapsed, attempts left and unexpired"""
+        return [
+            Notification.status == NotificationStatus.FAILED,
+            Notification.next_attempt_at <= now,
+            Notification.attempts < Notification.max_attempts,
+            or_(
+                Notification.expires_at.is_(None),
+                Notification.expires_at > now
+            )
+        ]
+    
+    # === CATCH-UP ===
+    
+    def apply_catchup(self, db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Expire the overdue notifications that should not be sent late
+        Returns how many rows each rule expired
+        """
+        now = now or datetime.now()
+        overdue = now - self.grace
+        lease_free = or_(Notification.lease_until.is_(None), Notification.lease_until < now)
+        pending = [Notification.status == NotificationStatus.PENDING, lease_free]
+        expire_types = [t for t, policy in CATCHUP_POLICIES.items() if policy == "expire"]
+        coalesce_types = [t for t, policy in CATCHUP_POLICIES.items() if policy == "coalesce"]
+        counts = {}
+        
+        # Past their own expiry date
+        counts["expired"] = db.query(Notification).filter(
+            *pending,
+            Notification.expires_at <= now
+        ).update({Notification.status: NotificationStatus.EXPIRED}, synchronize_session=False)
+        
+        # Types that are pointless when late
+        counts["dropped"] = db.query(Notification).filter(
+            *pending,
+            Notification.scheduled_for < overdue,
+            Notification.type.in_(expire_types)
+        ).update({Notification.status: NotificationStatus.EXPIRED}, synchronize_session=False)
+        
+        # Types where only the newest due one is worth sending
+        newer = aliased(Notification)
+        counts["coalesced"] = db.query(Notification).filter(
+            *pending,
+            Notification.scheduled_for < overdue,
+            Notification.type.in_(coalesce_types),
+            exists().where(
+                newer.status == NotificationStatus.PENDING,
+                newer.user_id == Notification.user_id,
+                newer.type == Notification.type,
+                newer.channel == Notification.channel,
+                newer.appointment_id.is_not_distinct_from(Notification.appointment_id),
+                newer.vehicle_id.is_not_distinct_from(Notification.vehicle_id),
+                newer.workshop_id.is_not_distinct_from(Notification.workshop_id),
+                newer.scheduled_for > Notification.scheduled_for,
+                newer.scheduled_for <= now
+            )
+        ).update({Notification.status: NotificationStatus.EXPIRED}, synchronize_session=False)
+        
+        db.commit()
+        
+        if any(counts.values()):
+            logger.info(f"⏰ Catch-up expired overdue notifications: {counts}")
+        return counts
+    
+    def claim(self, db: Session, channel: NotificationChannel, limit: int,
+              retries: bool = False) -> Tuple[str, List[Notification]]:
+        """
+        Lease up to limit due notifications of a channel to this dispatcher
+        (failed ones whose retry is due with retries=True)
+        Returns the claim token and the claimed rows, detached from the session
+        """
+        now = datetime.now()
+        token = f"{self.worker_id}:{uuid.uuid4().hex[:8]}"
+        if limit <= 0:
+            return token, []
+        
+        lease_free = or_(Notification.lease_until.is_(None), Notification.lease_until < now)
+        priority_order = case(PRIORITY_RANK, value=Notification.priority, else_=PRIORITY_RANK[DEFAULT_PRIORITY])
+        if retries:
+            filters, order, claimable = self._retry_filters(now), Notification.next_attempt_at, NotificationStatus.FAILED
+        else:
+            filters, order, claimable = self._due_filters(now), Notification.scheduled_for, NotificationStatus.PENDING
+        
+        due_ids = db.query(Notification.id).filter(
+            Notification.channel == channel,
+            lease_free,
+            *filters
+        ).order_by(priority_order, order).limit(limit).scalar_subquery()
+        
+        # Single UPDATE, so a row leased by another dispatcher meanwhile is skipped
+        claimed = db.query(Notification).filter(
+            Notification.id.in_(due_ids),
+            Notification.status == claimable,
+            lease_free
+        ).update(
+            {Notification.claimed_by: token, Notification.lease_until: now + self.lease},
+            synchronize_session=False
+        )
+        db.commit()
+        
+        if not claimed:
+            return token, []
+        
+        notifications = db.query(Notification).filter(Notification.claimed_by == token).order_by(priority_order, order).all()
+        # Workers read these rows while this thread keeps committing
+        for notification in notifications:
+            db.expunge(notification)
+        return token, notifications
+    
+    # === STATUS UPDATES ===
+    
+    @staticmethod
+    def _record(db: Session, results: List[Dict]):
+        """Write a batch of send results and release their leases in one statement"""
+        if not results:
+            return
+        
+        table = Notification.__table__
+        statement = update(table).where(
+            and_(table.c.id == bindparam("b_id"), table.c.claimed_by == bindparam("b_token"))
+        ).values(
+            status=bindparam("b_status"),
+            attempts=table.c.attempts + 1,
+            sent_at=func.coalesce(bindparam("b_sent_at", type_=table.c.sent_at.type), table.c.sent_at),
+            last_error=func.coalesce(bindparam("b_error", type_=table.c.last_error.type), table.c.last_error),
+            next_attempt_at=bindparam("b_next_attempt_at", type_=table.c.next_attempt_at.type),
+            claimed_by=None,
+            lease_until=None
+        )
+        db.execute(statement, results)
+        db.commit()
+    
+    @staticmethod
+    def _release(db: Session, released: List[Dict]):
+        """Give back the leases of claimed rows that were not sent"""
+        if not released:
+            return
+        
+        table = Notification.__table__
+        statement = update(table).where(
+            and_(table.c.id == bindparam("b_id"), table.c.claimed_by == bindparam("b_token"))
+        ).values(claimed_by=None, lease_until=None)
+        db.execute(statement, released)
+        db.commit()
+    
+    # === DISPATCH ===
+    
+    def dispatch_due(self, db: Session) -> int:
+        """Claim, send and record one batch of due notifications; returns the number sent"""
+        return self._tick(db)[1]
+    
+    def drain(self, db: Session, max_ticks: int = 1000) -> int:
+        """Run ticks until nothing due is left to claim; returns the number sent"""
+        sent_count = 0
+        for _ in range(max_ticks):
+            processed, sent = self._tick(db)
+            sent_count += sent
+            if not processed:
+                break
+        return sent_count
+    
+    def _claim_channel(self, db: Session, channel: NotificationChannel) -> List[Tuple[str, Notification]]:
+        """On-time rows first, then due retries with what is left (at least a tenth of the batch)"""
+        wanted = self.batch_size
+        limiter = self.limiters.get(channel)
+        if limiter:
+            # No more than the rate limit lets out within half a lease
+            wanted = min(wanted, max(1, int(limiter.rate * self.lease.total_seconds() / 2)))
+        
+        breaker = self.breakers[channel]
+        allowance = breaker.allowance(wanted)
+        if not allowance:
+            return []
+        
+        # The retry share is held back from the on-time claim, so both together stay within the allowance
+        fresh_limit = allowance - allowance // 10
+        token, fresh = self.claim(db, channel, fresh_limit)
+        retry_token, retries = self.claim(db, channel, allowance - len(fresh), retries=True)
+        claimed = [(token, notification) for notification in fresh] + [(retry_token, notification) for notification in retries]
+        
+        # Retry share left unused goes back to on-time rows
+        if len(fresh) == fresh_limit and len(claimed) < allowance:
+            extra_token, extra = self.claim(db, channel, allowance - len(claimed))
+            claimed += [(extra_token, notification) for notification in extra]
+        
+        breaker.release(allowance - len(claimed))
+        return claimed
+    
+    def _tick(self, db: Session) -> Tuple[int, int]:
+        """One dispatch pass; returns (processed, sent)"""
+        service = NotificationService(db)
+        futures = {}
+        
+        self.apply_catchup(db)
+        
+        for channel in NotificationChannel:
+            channel_queue = self._queue(channel)
+            for token, notification in self._claim_channel(db, channel):
+                future = channel_queue.submit(notification.priority, service.deliver, notification)
+                futures[future] = (token, notification)
+        
+        if not futures:
+            return 0, 0
+        
+        sent_count = 0
+        results = []
+        released = []
+        for future in as_completed(futures):
+            token, notification = futures[future]
+            if future.cancelled():
+                released.append({"b_id": notification.id, "b_token": token})
+                continue
+            
+            error = None
+            try:
+                success = future.result()
+            except Exception as e:
+                success = False
+                error = str(e)
+                logger.error(f"Error sending notification {notification.id}: {error}")
+            
+            if self.breakers[notification.channel].record(success):
+                # Provider is failing: stop the queued sends of the channel, their leases are released
+                logger.warning(f"⚡ Circuit opened for {notification.channel.value} notifications, pausing dispatch")
+                for other, (_, queued) in futures.items():
+                    if queued.channel == notification.channel:
+                        other.cancel()
+            
+            now = datetime.now()
+            attempts = (notification.attempts or 0) + 1
+            if success:
+                sent_count += 1
+            results.append({
+                "b_id": notification.id,
+                "b_token": token,
+                "b_status": NotificationStatus.SENT if success else NotificationStatus.FAILED,
+                "b_sent_at": now if success else None,
+                "b_error": error,
+                "b_next_attempt_at": None if success else next_attempt_at(attempts, notification.max_attempts, now)
+            })
+            
+            if len(results) >= STATUS_FLUSH_SIZE:
+                self._record(db, results)
+                results = []
+        
+        self._record(db, results)
+        self._release(db, released)
+        
+        processed = len(futures) - len(released)
+        logger.info(f"📨 Processed {processed} scheduled notifications, {sent_count} sent successfully")
+        return processed, sent_count
+    
+    # === METRICS ===
+    
+    def backlog(self, db: Session) -> Dict[str, Dict]:
+        """Due pending notifications per priority: how many and how long the oldest has waited"""
+        now = datetime.now()
+        backlog = {priority: {"due": 0, "oldest_wait_seconds": 0.0} for priority in PRIORITY_LEVELS}
+        rows = db.query(
+            Notification.priority,
+            func.count(Notification.id),
+            func.min(Notification.scheduled_for)
+        ).filter(*self._due_filters(now)).group_by(Notification.priority)
+        
+        for priority, count, oldest in rows:
+            entry = backlog[PRIORITY_LEVELS[priority_rank(priority)]]
+            entry["due"] += count
+            if oldest:
+                entry["oldest_wait_seconds"] = max(entry["oldest_wait_seconds"], round((now - oldest).total_seconds(), 1))
+        return backlog
+    
+    def stats(self, db: Optional[Session] = None) -> Dict:
+        """
+        Per channel: circuit breaker, rate limiter and in-process queue depth/wait
+        per priority; with a session, also the due backlog in the outbox per priority
+        """
+        with self._lock:
+            queues = dict(self._queues)
+        
+        channels = {}
+        for channel in NotificationChannel:
+            limiter = self.limiters.get(channel)
+            channel_queue = queues.get(channel)
+            channels[channel.value] = {
+                "breaker": self.breakers[channel].stats(),
+                "rate_limit": {
+                    "per_second": limiter.rate,
+                    "available": round(limiter.available, 2)
+                } if limiter else None,
+                "queues": channel_queue.stats() if channel_queue else {}
+            }
+        
+        stats = {"channels": channels}
+        if db is not None:
+            stats["backlog"] = self.backlog(db)
+        return stats
+
+# Process-wide dispatcher used by the scheduler job and run_notification_dispatcher.py
+notification_dispatcher = NotificationDispatcher(
+    batch_size=settings.NOTIFICATION_DISPATCH_BATCH_SIZE,
+    lease_seconds=settings.NOTIFICATION_LEASE_SECONDS,
+    grace_minutes=settings.NOTIFICATION_CATCHUP_GRACE_MINUTES
+)
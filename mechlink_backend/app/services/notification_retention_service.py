@@ -0,0 +1,124 @@
+import os
+import enum
+import gzip
+import json
+import time
+import logging
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import and_, or_, select, delete
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.models.notification import Notification, NotificationStatus
+
+logger = logging.getLogger(__name__)
+
+# Statuses that are finished and can be removed once old enough
+FINISHED_STATUSES = [NotificationStatus.SENT, NotificationStatus.DELIVERED, NotificationStatus.READ, NotificationStatus.EXPIRED]
+
+def _archive_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive value of type {type(value).__name__}")
+
+class NotificationRetention:
+    """
+    Deletes old notifications in bounded chunks instead of one DELETE.
+    Chunks walk the primary key (id > last id, ordered by id), each one is its
+    own short transaction, and the job sleeps pause_seconds between chunks so
+    the API can write in between (SQLite locks the whole database per write).
+    Rows can be written to a gzip JSON lines archive before they are deleted.
+    """
+    
+    def __init__(self, batch_size: int = 500, pause_seconds: float = 0.05):
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+    
+    @staticmethod
+    def _retention_filter(days_old: int):
+        """Finished notifications older than days_old, plus pending ones past their expiry"""
+        now = datetime.now()
+        return or_(
+            and_(
+                Notification.created_at < now - timedelta(days=days_old),
+                Notification.status.in_(FINISHED_STATUSES)
+            ),
+            and_(
+                Notification.expires_at < now,
+                Notification.status == NotificationStatus.PENDING
+            )
+        )
+    
+    def default_archive_path(self) -> str:
+        """Timestamped archive file in NOTIFICATION_ARCHIVE_DIR"""
+        filename = f"notifications_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+        return os.path.join(settings.NOTIFICATION_ARCHIVE_DIR, filename)
+    
+    def _next_chunk(self, db: Session, condition, last_id: Optional[str]) -> List[str]:
+        query = db.query(Notification.id).filter(condition)
+        if last_id is not None:
+            query = query.filter(Notification.id > last_id)
+        return [row.id for row in query.order_by(Notification.id).limit(self.batch_size)]
+    
+    def run(self, db: Session, days_old: int = 90, archive_path: Optional[str] = None,
+            progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Delete (and optionally archive) the notifications past retention
+        Returns the number of rows deleted, chunks run and the archive path
+        """
+        table = Notification.__table__
+        condition = self._retention_filter(days_old)
+        report = {"deleted": 0, "chunks": 0, "archive_path": archive_path}
+        started = time.monotonic()
+        
+        archive = None
+        if archive_path:
+            os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+            archive = gzip.open(archive_path, "wt", encoding="utf-8")
+        
+        try:
+            last_id = None
+            while True:
+                ids = self._next_chunk(db, condition, last_id)
+                if not ids:
+                    break
+                last_id = ids[-1]
+                
+                # Archive the chunk before deleting it
+                if archive:
+                    for row in db.execute(select(table).where(table.c.id.in_(ids))):
+                        archive.write(json.dumps(dict(row._mapping), default=_archive_value) + "\n")
+                    archive.flush()
+                
+                deleted = db.execute(
+                    delete(table).where(table.c.id.in_(ids), condition)
+                ).rowcount
+                db.commit()
+                
+                report["deleted"] += deleted
+                report["chunks"] += 1
+                if progress:
+                    progress(dict(report))
+                
+                # Let waiting writers take the database lock
+                if self.pause_seconds:
+                    time.sleep(self.pause_seconds)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if archive:
+                archive.close()
+        
+        report["duration_seconds"] = round(time.monotonic() - started, 2)
+        logger.info(f"🧹 Deleted {report['deleted']} old notifications in {report['chunks']} chunks")
+        return report
+
+# Process-wide retention job used by the cleanup endpoint and cleanup_notifications.py
+notification_retention = NotificationRetention(
+    batch_size=settings.NOTIFICATION_RETENTION_BATCH_SIZE,
+    pause_seconds=settings.NOTIFICATION_RETENTION_PAUSE_SECONDS
+)
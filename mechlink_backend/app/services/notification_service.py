@@ -1,15 +1,22 @@
+import uuid
 import smtplib
 import logging
+from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-import jinja2
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, insert, func, extract
 
+from app.config.settings import settings
+from app.services.smtp_pool_service import smtp_pool
+from app.services.template_registry_service import template_registry, RenderedTemplate
+from app.services.notification_retention_service import notification_retention
+from app.utils.cache import LRUCache, MISSING
+from app.utils.helpers import backoff_delay
 from app.models.notification import (
     Notification, NotificationTemplate, NotificationPreference,
     NotificationType, NotificationStatus, NotificationChannel
@@ -21,15 +28,43 @@ from app.models.vehicle import Vehicle
 
 logger = logging.getLogger(__name__)
 
+# Keep IN (...) lists under SQLite's bound parameter limit
+ID_CHUNK_SIZE = 500
+
+# Time buckets of get_notification_stats -> created_at parts they group by
+STATS_BUCKETS = {
+    "hour": ("year", "month", "day", "hour"),
+    "day": ("year", "month", "day"),
+    "month": ("year", "month")
+}
+
+# Column values of each user's preference row, None when the user has no row yet.
+# The TTL bounds staleness for writes made by other processes.
+preference_cache = LRUCache(
+    maxsize=settings.NOTIFICATION_PREFERENCE_CACHE_SIZE,
+    ttl_seconds=settings.NOTIFICATION_PREFERENCE_CACHE_TTL_SECONDS
+)
+
+def _preference_values(preferences: NotificationPreference) -> Dict[str, Any]:
+    return {
+        column.name: getattr(preferences, column.name)
+        for column in NotificationPreference.__table__.columns
+    }
+
+def next_attempt_at(attempts: int, max_attempts: Optional[int], now: Optional[datetime] = None) -> Optional[datetime]:
+    """When to retry a notification after its attempts-th failed send, None once it is out of attempts"""
+    if attempts >= (max_attempts or 3):
+        return None
+    delay = backoff_delay(attempts, settings.NOTIFICATION_RETRY_BASE_SECONDS, settings.NOTIFICATION_RETRY_MAX_SECONDS)
+    return (now or datetime.now()) + timedelta(seconds=delay)
+
 class NotificationService:
     """Main service for managing notifications"""
     
     def __init__(self, db: Session):
         self.db = db
-        self.jinja_env = jinja2.Environment(
-            loader=jinja2.DictLoader({}),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
-        )
+        # Shared with the process-wide compiled template registry
+        self.jinja_env = template_registry.environment
     
     def create_notification(
         self,
@@ -83,6 +118,72 @@ class NotificationService:
         
         return notification
     
+    def create_bulk_notifications(
+        self,
+        user_ids: List[str],
+        notification_type: NotificationType,
+        channel: NotificationChannel,
+        title: str,
+        message: str,
+        data: Optional[Dict] = None,
+        scheduled_for: Optional[datetime] = None,
+        **kwargs
+    ) -> List[str]:
+        """
+        Create the same notification for many users in one batched insert
+        Unknown users and users whose preferences exclude it are skipped.
+        Nothing is sent here: rows without scheduled_for are due immediately
+        and go out through the outbox dispatcher.
+        Returns the ids of the created notifications
+        """
+        notification_type = NotificationType(notification_type.value)
+        channel = NotificationChannel(channel.value)
+        unique_ids = list(dict.fromkeys(user_ids))
+        
+        # Recipients and preferences, one query per chunk of ids each
+        recipients = {}
+        preferences = {}
+        for start in range(0, len(unique_ids), ID_CHUNK_SIZE):
+            chunk = unique_ids[start:start + ID_CHUNK_SIZE]
+            for user_id, email, phone in self.db.query(User.id, User.email, User.phone).filter(User.id.in_(chunk)):
+                recipients[user_id] = (email, phone)
+            for preference in self.db.query(NotificationPreference).filter(NotificationPreference.user_id.in_(chunk)):
+                preferences.setdefault(preference.user_id, preference)
+        
+        default_preferences = self.default_preferences()
+        due_at = scheduled_for or datetime.now()
+        rows = []
+        
+        for user_id in user_ids:
+            if user_id not in recipients:
+                continue
+            if not self._should_send_notification(notification_type, channel,
+                                                  preferences.get(user_id, default_preferences)):
+                continue
+            
+            email, phone = recipients[user_id]
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "type": notification_type,
+                "channel": channel,
+                "status": NotificationStatus.PENDING,
+                "title": title,
+                "message": message,
+                "data": data or {},
+                "scheduled_for": due_at,
+                "recipient_email": email if channel.value == "email" else None,
+                "recipient_phone": phone if channel.value == "sms" else None,
+                **kwargs
+            })
+        
+        if rows:
+            self.db.execute(insert(Notification), rows)
+            self.db.commit()
+        
+        logger.info(f"📝 Created {len(rows)} bulk notifications '{title}' for {len(user_ids)} requested users")
+        return [row["id"] for row in rows]
+    
     def send_notification(self, notification_id: str) -> bool:
         """Send specific notification"""
         
@@ -102,15 +203,7 @@ class NotificationService:
             notification.attempts += 1
             
             # Send based on channel
-            success = False
-            if notification.channel.value == "email":
-                success = self._send_email(notification)
-            elif notification.channel.value == "sms":
-                success = self._send_sms(notification)
-            elif notification.channel.value == "push":
-                success = self._send_push(notification)
-            elif notification.channel.value == "in_app":
-                success = self._send_in_app(notification)
+            success = self.deliver(notification)
             
             # Update status
             if success:
@@ -119,29 +212,41 @@ class NotificationService:
                 logger.info(f"Notification {notification_id} sent successfully")
             else:
                 notification.status = NotificationStatus.FAILED
+                notification.next_attempt_at = next_attempt_at(notification.attempts, notification.max_attempts)
                 logger.error(f"Error sending notification {notification_id}")
             
             self.db.commit()
             return success
-            
+        
         except Exception as e:
             notification.status = NotificationStatus.FAILED
             notification.last_error = str(e)
+            notification.next_attempt_at = next_attempt_at(notification.attempts, notification.max_attempts)
             self.db.commit()
             logger.error(f"Error sending notification {notification_id}: {str(e)}")
             return False
     
+    def deliver(self, notification: Notification) -> bool:
+        """Send through the notification's channel without touching the database"""
+        if notification.channel.value == "email":
+            return self._send_email(notification)
+        elif notification.channel.value == "sms":
+            return self._send_sms(notification)
+        elif notification.channel.value == "push":
+            return self._send_push(notification)
+        elif notification.channel.value == "in_app":
+            return self._send_in_app(notification)
+        return False
+    
     def _send_email(self, notification: Notification) -> bool:
             """Enviar notificación por email"""
             try:
                 # === CONFIGURACIÓN SMTP ===
-                smtp_server = "smtp.gmail.com"
-                smtp_port = 587
-                smtp_user = "nauroy71106@gmail.com"  # Change to your real email
-                smtp_password = "fqul mink zxep segl"  # Gmail app password, NOT your regular password
+                # Server and credentials live in settings; smtp_pool keeps the sessions open
+                smtp_user = settings.EMAIL_HOST_USER
                 
                 # === VALIDATIONS ===
-                if not all([smtp_user, smtp_password]):
+                if not all([settings.EMAIL_HOST, smtp_user]):
                     logger.error("Incomplete SMTP configuration")
                     return False
                 
@@ -152,19 +257,22 @@ class NotificationService:
                 # === CREATE MESSAGE ===
                 msg = MIMEMultipart('alternative')
                 
+                # Active template of this type and channel, if any
+                rendered = self._render_template(notification)
+                
                 # Email headers
                 msg['From'] = f"MechLink <{smtp_user}>"
                 msg['To'] = notification.recipient_email
-                msg['Subject'] = notification.title
+                msg['Subject'] = rendered.subject if rendered else notification.title
                 
                 # === CONTENT ===
                 
                 # Plain text (fallback)
                 text_content = f"""
     {notification.title}
-
+    
     {notification.message}
-
+    
     ---
     Submitted by MechLink
     Your vehicle management platform in Puerto Rico
@@ -245,21 +353,21 @@ class NotificationService:
     </html>
                 """
                 
+                if rendered:
+                    text_content = rendered.text
+                    html_content = rendered.html or html_content
+                
                 # Add content to the message
                 msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
                 msg.attach(MIMEText(html_content, 'html', 'utf-8'))
                 
                 # === SEND EMAIL ===
-                with smtplib.SMTP(smtp_server, smtp_port) as server:
-                    server.starttls()
-                    server.login(smtp_user, smtp_password)
-                    
-                    text = msg.as_string()
-                    server.sendmail(smtp_user, notification.recipient_email, text)
+                # Reuses an authenticated pooled session instead of a new handshake per email
+                smtp_pool.send(smtp_user, notification.recipient_email, msg.as_string())
                 
                 logger.info(f"Email sent successfully to {notification.recipient_email}")
                 return True
-                
+            
             except smtplib.SMTPAuthenticationError as e:
                 logger.error(f"SMTP Authentication Error: {str(e)}")
                 return False
@@ -269,7 +377,7 @@ class NotificationService:
             except Exception as e:
                 logger.error(f"Error sending email: {str(e)}")
                 return False
-
+    
     
     def _send_sms(self, notification: Notification) -> bool:
         """Send SMS notification"""
@@ -287,7 +395,7 @@ class NotificationService:
             # For now, simulate success
             logger.info(f"Simulated SMS sent to {notification.recipient_phone}: {notification.message}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error sending SMS: {str(e)}")
             return False
@@ -304,11 +412,11 @@ class NotificationService:
             #     token=notification.recipient_device_token,
             # )
             # response = messaging.send(message)
-
+            
             # For now, simulate success
             logger.info(f"Simulated push notification sent: {notification.title}")
             return True
-
+        
         except Exception as e:
             logger.error(f"Error sending push notification: {str(e)}")
             return False
@@ -318,29 +426,48 @@ class NotificationService:
         # In-app notifications are displayed when the user opens the app.
         return True
     
-    def _get_html_content(self, notification: Notification) -> Optional[str]:
-        """Generate HTML content for email"""
+    def _render_template(self, notification: Notification) -> Optional[RenderedTemplate]:
+        """Subject, text and HTML from the compiled template registry"""
         try:
-            template = self.db.query(NotificationTemplate).filter(
-                and_(
-                    NotificationTemplate.type == notification.type,
-                    NotificationTemplate.channel == notification.channel,
-                    NotificationTemplate.is_active == True
-                )
-            ).first()
-            
-            if not template or not template.html_template:
-                return None
-            
-            template_obj = self.jinja_env.from_string(template.html_template)
-            return template_obj.render(**notification.data)
-            
+            return template_registry.render(notification.type, notification.channel, notification.data)
         except Exception as e:
-            logger.error(f"Error generating HTML content: {str(e)}")
+            logger.error(f"Error rendering notification template: {str(e)}")
             return None
     
+    def _get_html_content(self, notification: Notification) -> Optional[str]:
+        """Generate HTML content for email"""
+        rendered = self._render_template(notification)
+        return rendered.html if rendered else None
+    
+    @staticmethod
+    def default_preferences(user_id: Optional[str] = None) -> NotificationPreference:
+        """Unsaved preferences with the column defaults, for users without a row"""
+        values = {
+            column.name: column.default.arg
+            for column in NotificationPreference.__table__.columns
+            if column.default is not None and column.default.is_scalar
+        }
+        return NotificationPreference(user_id=user_id, **values)
+    
     def get_user_preferences(self, user_id: str) -> NotificationPreference:
-        """Get user notification preferences"""
+        """
+        Get user notification preferences for reading, from preference_cache
+        Users without a row get unsaved defaults; nothing is written here
+        """
+        values = preference_cache.get(user_id)
+        if values is MISSING:
+            preferences = self.db.query(NotificationPreference).filter(
+                NotificationPreference.user_id == user_id
+            ).first()
+            values = _preference_values(preferences) if preferences else None
+            preference_cache.set(user_id, values)
+        
+        if values is None:
+            return self.default_preferences(user_id)
+        return NotificationPreference(**values)
+    
+    def get_or_create_user_preferences(self, user_id: str) -> NotificationPreference:
+        """Get the user's preference row, creating it with the defaults if missing"""
         preferences = self.db.query(NotificationPreference).filter(
             NotificationPreference.user_id == user_id
         ).first()
@@ -350,9 +477,15 @@ class NotificationService:
             self.db.add(preferences)
             self.db.commit()
             self.db.refresh(preferences)
+            self.cache_user_preferences(preferences)
         
         return preferences
     
+    @staticmethod
+    def cache_user_preferences(preferences: NotificationPreference):
+        """Write-through after a preference row was saved"""
+        preference_cache.set(preferences.user_id, _preference_values(preferences))
+    
     def _should_send_notification(
         self,
         notification_type: NotificationType,
@@ -380,7 +513,7 @@ class NotificationService:
         }
         
         return type_preferences.get(notification_type.value, True)
-
+    
     
     def schedule_appointment_reminders(self, appointment_id: str) -> List[Notification]:
         """Set reminders for an appointment"""
@@ -429,9 +562,16 @@ class NotificationService:
                     appointment_id=appointment_id,
                     workshop_id=appointment.workshop_id,
                     vehicle_id=appointment.vehicle_id,
+                    # Never sent late past the appointment itself
+                    expires_at=appointment_datetime,
+                    # The last reminder jumps ahead of other traffic
+                    priority="urgent" if hours_before <= 1 else "high",
                     data={
                         "appointment_datetime": appointment_datetime.isoformat(),
                         "workshop_name": workshop.name,
+                        "workshop_address": workshop.address,
+                        "workshop_city": workshop.city,
+                        "workshop_phone": workshop.phone,
                         "service_type": appointment.service_type,
                         "vehicle_info": f"{vehicle.make} {vehicle.model}",
                         "hours_before": hours_before
@@ -448,7 +588,7 @@ class NotificationService:
         
         logger.info(f"✅ Created {len(reminders)} valid reminders for appointment {appointment_id}")
         return reminders
-
+    
     
     def send_appointment_confirmation(self, appointment_id: str) -> Notification:
         """Send confirmation of created appointment"""
@@ -558,91 +698,113 @@ class NotificationService:
         )
     
     def process_scheduled_notifications(self) -> int:
-        """Process pending scheduled notifications - MEJORADA"""
-        now = datetime.now()
-        
-        scheduled_notifications = self.db.query(Notification).filter(
-            and_(
-                Notification.status == NotificationStatus.PENDING,
-                Notification.scheduled_for <= now,
-                Notification.scheduled_for >= now - timedelta(minutes=5),
-                or_(
-                    Notification.expires_at.is_(None),
-                    Notification.expires_at > now
-                )
-            )
-        ).all()
-        
-        sent_count = 0
-        for notification in scheduled_notifications:
-            try:
-                if self.send_notification(notification.id):
-                    sent_count += 1
-            except Exception as e:
-                logger.error(f"Error sending notification {notification.id}: {str(e)}")
-        
-        if scheduled_notifications:
-            logger.info(f"📨 Processed {len(scheduled_notifications)} scheduled notifications, {sent_count} sent successfully")
+        """Send the due scheduled notifications through the outbox dispatcher"""
+        from app.services.notification_dispatcher_service import notification_dispatcher
         
-        return sent_count
+        return notification_dispatcher.dispatch_due(self.db)
     
     def retry_failed_notifications(self) -> int:
-        """Retry failed notifications"""
-        failed_notifications = self.db.query(Notification).filter(
-            and_(
-                Notification.status == NotificationStatus.FAILED,
-                Notification.attempts < Notification.max_attempts
-            )
-        ).all()
+        """
+        Retry failed notifications through the dispatcher worker pools
+        Rows already waiting on a backoff keep their next_attempt_at; failures
+        recorded without one (before backoff existed) become due now
+        """
+        from app.services.notification_dispatcher_service import notification_dispatcher
+        
+        self.db.query(Notification).filter(
+            Notification.status == NotificationStatus.FAILED,
+            Notification.attempts < Notification.max_attempts,
+            Notification.next_attempt_at.is_(None)
+        ).update({Notification.next_attempt_at: datetime.now()}, synchronize_session=False)
+        self.db.commit()
         
-        retried_count = 0
-        for notification in failed_notifications:
-            if self.send_notification(notification.id):
-                retried_count += 1
+        retried_count = notification_dispatcher.drain(self.db)
         
-        logger.info(f"Retried {len(failed_notifications)} failed notifications, {retried_count} successful")
+        logger.info(f"Retried failed notifications, {retried_count} successful")
         return retried_count
     
-    def get_notification_stats(self, user_id: Optional[str] = None) -> Dict:
-        """Get notification statistics"""
-        query = self.db.query(Notification)
-        
+    def get_notification_stats(self, user_id: Optional[str] = None, bucket: Optional[str] = None,
+                               since: Optional[datetime] = None) -> Dict:
+        """
+        Get notification statistics
+        Counts come from one grouped query; bucket ("hour", "day" or "month") adds
+        per-period counts of the notifications created since the given date
+        """
+        query = self.db.query(
+            Notification.status,
+            Notification.type,
+            Notification.channel,
+            func.count(Notification.id)
+        )
         if user_id:
             query = query.filter(Notification.user_id == user_id)
         
-        total = query.count()
-        sent = query.filter(Notification.status == NotificationStatus.SENT).count()
-        delivered = query.filter(Notification.status == NotificationStatus.DELIVERED).count()
-        failed = query.filter(Notification.status == NotificationStatus.FAILED).count()
-        pending = query.filter(Notification.status == NotificationStatus.PENDING).count()
-        
-        # Statistics by type
-        type_stats = {}
-        for notification_type in NotificationType:
-            count = query.filter(Notification.type == notification_type).count()
-            if count > 0:
-                type_stats[notification_type.value] = count
-        
-        # Statistics by channel
-        channel_stats = {}
-        for channel in NotificationChannel:
-            count = query.filter(Notification.channel == channel).count()
-            if count > 0:
-                channel_stats[channel.value] = count
+        status_counts = defaultdict(int)
+        type_counts = defaultdict(int)
+        channel_counts = defaultdict(int)
+        for notification_status, notification_type, channel, count in query.group_by(
+            Notification.status, Notification.type, Notification.channel
+        ):
+            status_counts[notification_status] += count
+            type_counts[notification_type] += count
+            channel_counts[channel] += count
+        
+        total = sum(status_counts.values())
+        sent = status_counts[NotificationStatus.SENT]
+        delivered = status_counts[NotificationStatus.DELIVERED]
         
         # Delivery rate
         delivery_rate = (delivered / sent * 100) if sent > 0 else 0
         
-        return {
+        stats = {
             "total_notifications": total,
             "sent": sent,
             "delivered": delivered,
-            "failed": failed,
-            "pending": pending,
+            "failed": status_counts[NotificationStatus.FAILED],
+            "pending": status_counts[NotificationStatus.PENDING],
             "delivery_rate": round(delivery_rate, 2),
-            "notifications_by_type": type_stats,
-            "notifications_by_channel": channel_stats
+            "notifications_by_type": {
+                notification_type.value: type_counts[notification_type]
+                for notification_type in NotificationType if type_counts[notification_type]
+            },
+            "notifications_by_channel": {
+                channel.value: channel_counts[channel]
+                for channel in NotificationChannel if channel_counts[channel]
+            }
         }
+        
+        if bucket:
+            stats["timeline"] = self._get_stats_timeline(bucket, since, user_id)
+        
+        return stats
+    
+    def _get_stats_timeline(self, bucket: str, since: Optional[datetime], user_id: Optional[str]) -> List[Dict]:
+        """Counts per status for each period of created_at, oldest first"""
+        parts = [extract(part, Notification.created_at) for part in STATS_BUCKETS[bucket]]
+        query = self.db.query(*parts, Notification.status, func.count(Notification.id))
+        if user_id:
+            query = query.filter(Notification.user_id == user_id)
+        if since:
+            query = query.filter(Notification.created_at >= since)
+        
+        periods = {}
+        for row in query.group_by(*parts, Notification.status):
+            *values, notification_status, count = row
+            values = [int(value) for value in values]
+            start = datetime(values[0], values[1], *(values[2:] or [1]))
+            period = periods.setdefault(start, {
+                "bucket": start.isoformat(),
+                "total": 0,
+                "sent": 0,
+                "delivered": 0,
+                "failed": 0,
+                "pending": 0
+            })
+            period["total"] += count
+            if notification_status.value in period:
+                period[notification_status.value] += count
+        
+        return [periods[start] for start in sorted(periods)]
     
     def mark_as_read(self, notification_id: str, user_id: str) -> bool:
         """Mark notification as read"""
@@ -662,26 +824,7 @@ class NotificationService:
         
         return True
     
-    def cleanup_old_notifications(self, days_old: int = 90) -> int:
-        """Clear old notifications"""
-        cutoff_date = datetime.now() - timedelta(days=days_old)
-        
-        old_notifications = self.db.query(Notification).filter(
-            or_(
-                and_(
-                    Notification.created_at < cutoff_date,
-                    Notification.status.in_([NotificationStatus.SENT, NotificationStatus.DELIVERED, NotificationStatus.READ])
-                ),
-                and_(
-                    Notification.expires_at < datetime.now(),
-                    Notification.status == NotificationStatus.PENDING
-                )
-            )
-        )
-        
-        count = old_notifications.count()
-        old_notifications.delete()
-        self.db.commit()
-        
-        logger.info(f"Deleted {count} old notifications")
-        return count
\ No newline at end of file
+    def cleanup_old_notifications(self, days_old: int = 90, archive_path: Optional[str] = None) -> int:
+        """Clear old notifications in bounded chunks, archiving them first if archive_path is given"""
+        report = notification_retention.run(self.db, days_old=days_old, archive_path=archive_path)
+        return report["deleted"]
\ No newline at end of file
@@ -0,0 +1,185 @@
+import re
+import json
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.models.workshop import Workshop
+from app.services.workshop_version_service import WorkshopVersionCheck
+
+logger = logging.getLogger(__name__)
+
+DAYS_ORDER = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MINUTES_PER_DAY = 24 * 60
+TIME_PATTERN = re.compile(r'([0-9]{1,2}):([0-9]{1,2})')
+
+class DaySchedule(NamedTuple):
+    """One day of working_hours ("8:00-17:00") parsed once"""
+    hours: str
+    opens_at: str
+    closes_at: str
+    open_minute: int
+    close_minute: int
+
+class CompiledHours(NamedTuple):
+    """
+    days: parsed schedule per day key (None when the value could not be parsed)
+    mask: weekly bitmap, bit day_index * 1440 + minute is set while open
+    """
+    days: Dict[str, Optional[DaySchedule]]
+    mask: int
+
+def parse_minutes(value: str) -> Optional[int]:
+    """Minute of the day for "H:MM"/"HH:MM", None if invalid"""
+    match = TIME_PATTERN.fullmatch(value) if isinstance(value, str) else None
+    if not match:
+        return None
+    
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+def day_name(day_of_week) -> str:
+    """Plain day key for a day string or WeekDay enum"""
+    return getattr(day_of_week, 'value', day_of_week)
+
+def resolve_day_and_time(day_of_week=None, current_time: Optional[str] = None) -> Tuple[str, str]:
+    """Fill in the current day/time (local clock) when not provided"""
+    now = datetime.now()
+    return (
+        day_name(day_of_week) if day_of_week else now.strftime('%A').lower(),
+        current_time if current_time else now.strftime('%H:%M')
+    )
+
+def compile_hours(working_hours) -> CompiledHours:
+    """Parse a working_hours JSON value into day schedules and a weekly bitmap"""
+    if isinstance(working_hours, str):
+        try:
+            working_hours = json.loads(working_hours)
+        except ValueError:
+            working_hours = None
+    if not isinstance(working_hours, dict):
+        return CompiledHours(days={}, mask=0)
+    
+    days = {}
+    mask = 0
+    for day, hours in working_hours.items():
+        schedule = None
+        try:
+            opens_at, closes_at = hours.split('-')
+            open_minute = parse_minutes(opens_at.strip())
+            close_minute = parse_minutes(closes_at.strip())
+            if open_minute is not None and close_minute is not None:
+                schedule = DaySchedule(hours, opens_at.strip(), closes_at.strip(), open_minute, close_minute)
+        except (ValueError, AttributeError):
+            pass
+        days[day] = schedule
+        
+        # Closing minute included, same as the original open <= now <= close check
+        if schedule and day in DAYS_ORDER and schedule.open_minute <= schedule.close_minute:
+            start = DAYS_ORDER.index(day) * MINUTES_PER_DAY + schedule.open_minute
+            length = schedule.close_minute - schedule.open_minute + 1
+            mask |= ((1 << length) - 1) << start
+    
+    return CompiledHours(days=days, mask=mask)
+
+class OpeningHoursIndex:
+    """
+    Compiled opening hours of active workshops plus an hour-of-week index,
+    so "open at T" is answered with set lookups and bit tests instead of
+    parsing every schedule on every request.
+    """
+    
+    def __init__(self, check_seconds: float = 30):
+        self._compiled: Dict[str, CompiledHours] = {}
+        # 168 hour-of-week slots -> workshops open at some minute of that hour
+        self._slots: List[Set[str]] = [set() for _ in range(7 * 24)]
+        self._lock = threading.RLock()
+        self.is_built = False
+        self._version_check = WorkshopVersionCheck(check_seconds)
+    
+    def __len__(self) -> int:
+        return len(self._compiled)
+    
+    @staticmethod
+    def _slots_of(mask: int) -> List[int]:
+        hour_mask = (1 << 60) - 1
+        return [slot for slot in range(7 * 24) if (mask >> (slot * 60)) & hour_mask]
+    
+    def build(self, db: Session) -> int:
+        """Compile the hours of every active workshop (replaces the current index)"""
+        version = self._version_check.current(db)
+        rows = db.query(Workshop.id, Workshop.working_hours).filter(Workshop.is_active == True).all()
+        
+        with self._lock:
+            self._compiled = {}
+            self._slots = [set() for _ in range(7 * 24)]
+            for workshop_id, working_hours in rows:
+                self._add(workshop_id, compile_hours(working_hours))
+            self.is_built = True
+            self._version_check.mark_built(version)
+        
+        logger.info(f"Opening hours index built with {len(rows)} workshops")
+        return len(rows)
+    
+    def ensure_built(self, db: Session):
+        """
+        Build the index on first use if startup did not do it, and rebuild it when
+        the workshops table changed behind it (e.g. a geocoding backfill run by another process)
+        """
+        if not self.is_built or self._version_check.is_stale(db):
+            self.build(db)
+    
+    def upsert(self, workshop: Workshop):
+        """Recompile a workshop's hours after it was created or updated"""
+        with self._lock:
+            self._discard(workshop.id)
+            if workshop.is_active:
+                self._add(workshop.id, compile_hours(workshop.working_hours))
+    
+    def remove(self, workshop_id: str):
+        """Drop a workshop from the index"""
+        with self._lock:
+            self._discard(workshop_id)
+    
+    def _add(self, workshop_id: str, compiled: CompiledHours):
+        self._compiled[workshop_id] = compiled
+        for slot in self._slots_of(compiled.mask):
+            self._slots[slot].add(workshop_id)
+    
+    def _discard(self, workshop_id: str):
+        compiled = self._compiled.pop(workshop_id, None)
+        if compiled is None:
+            return
+        for slot in self._slots_of(compiled.mask):
+            self._slots[slot].discard(workshop_id)
+    
+    # === QUERIES ===
+    
+    def compiled_for(self, workshop: Workshop) -> CompiledHours:
+        """Compiled hours of a workshop, compiling them if it is not indexed"""
+        compiled = self._compiled.get(workshop.id)
+        if compiled is None:
+            compiled = compile_hours(workshop.working_hours)
+        return compiled
+    
+    def open_at(self, day_of_week, current_time: str) -> Set[str]:
+        """Ids of the workshops open on that day at HH:MM"""
+        day = day_name(day_of_week)
+        minute = parse_minutes(current_time)
+        if day not in DAYS_ORDER or minute is None:
+            return set()
+        
+        bit = DAYS_ORDER.index(day) * MINUTES_PER_DAY + minute
+        with self._lock:
+            return {
+                workshop_id for workshop_id in self._slots[bit // 60]
+                if (self._compiled[workshop_id].mask >> bit) & 1
+            }
+
+# Process-wide index shared by the search and map endpoints
+opening_hours_index = OpeningHoursIndex(check_seconds=settings.WORKSHOP_INDEX_CHECK_SECONDS)
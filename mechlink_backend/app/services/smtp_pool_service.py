@@ -0,0 +1,180 @@
+import time
+import smtplib
+import threading
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Union
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class PooledSMTPConnection:
+    """An authenticated SMTP session plus its usage counters"""
+    
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+    
+    def close(self):
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                self.server.close()
+            except OSError:
+                pass
+
+class SMTPConnectionPool:
+    """
+    Reuses authenticated SMTP sessions across sends instead of connecting,
+    running STARTTLS and logging in for every message.
+    Sessions are recycled after max_messages sends or idle_timeout seconds,
+    and a send that finds a reused session dropped by the server is retried
+    once on a fresh one.
+    """
+    
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = True, size: int = 2, max_messages: int = 100,
+                 idle_timeout: float = 60, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        
+        self._idle: Deque[PooledSMTPConnection] = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self.reconnects = 0
+    
+    # === CONNECTIONS ===
+    
+    def _connect(self) -> PooledSMTPConnection:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        
+        with self._lock:
+            self.connections_opened += 1
+        logger.info(f"Opened SMTP connection to {self.host}:{self.port}")
+        return PooledSMTPConnection(server)
+    
+    def _is_reusable(self, connection: PooledSMTPConnection) -> bool:
+        return (
+            connection.messages_sent < self.max_messages
+            and time.monotonic() - connection.last_used < self.idle_timeout
+        )
+    
+    def _checkout(self) -> Optional[PooledSMTPConnection]:
+        """An idle session that can still be used, closing the expired ones"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+            
+            if self._is_reusable(connection):
+                return connection
+            connection.close()
+    
+    def _checkin(self, connection: PooledSMTPConnection):
+        connection.last_used = time.monotonic()
+        if connection.messages_sent >= self.max_messages:
+            connection.close()
+            return
+        with self._lock:
+            self._idle.append(connection)
+    
+    # === SENDING ===
+    
+    def send(self, from_addr: str, to_addrs: Union[str, List[str]], message: str) -> Dict:
+        """
+        Send one message over a pooled session
+        Returns the refused recipients like smtplib.SMTP.sendmail
+        """
+        with self._slots:
+            connection = self._checkout()
+            reused = connection is not None
+            
+            while True:
+                if connection is None:
+                    connection = self._connect()
+                
+                try:
+                    refused = connection.server.sendmail(from_addr, to_addrs, message)
+                except smtplib.SMTPResponseException as e:
+                    # Message-level rejection (sender, recipients or data): the session was reset
+                    if e.smtp_code in (421, -1):
+                        connection.close()
+                    else:
+                        self._checkin(connection)
+                    raise
+                except smtplib.SMTPRecipientsRefused:
+                    self._checkin(connection)
+                    raise
+                except OSError:
+                    # Dropped session (SMTPServerDisconnected or a socket error)
+                    connection.close()
+                    connection = None
+                    if not reused:
+                        raise
+                    # The server closed an idle session; retry once on a new one
+                    reused = False
+                    with self._lock:
+                        self.reconnects += 1
+                    continue
+                except Exception:
+                    # Anything else (e.g. UnicodeEncodeError on a non-ASCII str message) leaves
+                    # the session in an unknown state: close it rather than leak or reuse it
+                    connection.close()
+                    raise
+                
+                connection.messages_sent += 1
+                with self._lock:
+                    self.messages_sent += 1
+                self._checkin(connection)
+                return refused
+    
+    def close_all(self):
+        """Close every idle session (e.g. on shutdown)"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection in idle:
+            connection.close()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "idle_connections": len(self._idle),
+                "pool_size": self.size,
+                "connections_opened": self.connections_opened,
+                "messages_sent": self.messages_sent,
+                "reconnects": self.reconnects
+            }
+
+# Process-wide pool used by NotificationService._send_email
+smtp_pool = SMTPConnectionPool(
+    host=settings.EMAIL_HOST,
+    port=settings.EMAIL_PORT,
+    username=settings.EMAIL_HOST_USER,
+    password=settings.EMAIL_HOST_PASSWORD,
+    use_tls=settings.EMAIL_USE_TLS,
+    size=settings.SMTP_POOL_SIZE,
+    max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+    idle_timeout=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+    timeout=settings.SMTP_TIMEOUT_SECONDS
+)
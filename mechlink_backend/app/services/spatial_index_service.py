@@ -0,0 +1,166 @@
+import math
+import threading
+import logging
+import numpy as np
+from typing import Dict, List, Set, Tuple
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.models.workshop import Workshop
+from app.services.workshop_version_service import WorkshopVersionCheck
+from app.services.geolocation_service import GeolocationService
+
+logger = logging.getLogger(__name__)
+
+class WorkshopSpatialIndex:
+    """
+    In-memory grid index over the coordinates of active workshops.
+    Answers within-radius and k-nearest queries without scanning the table.
+    """
+    
+    def __init__(self, cell_size_deg: float = 0.05, check_seconds: float = 30):
+        # 0.05 degrees ≈ 5.5 km of latitude per cell
+        self.cell_size = cell_size_deg
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._points: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.RLock()
+        self.is_built = False
+        self._version_check = WorkshopVersionCheck(check_seconds)
+    
+    def __len__(self) -> int:
+        return len(self._points)
+    
+    def _cell_for(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self.cell_size)), int(math.floor(lon / self.cell_size)))
+    
+    def build(self, db: Session) -> int:
+        """Load the coordinates of every active workshop (replaces the current index)"""
+        version = self._version_check.current(db)
+        rows = db.query(Workshop.id, Workshop.latitude, Workshop.longitude).filter(
+            Workshop.is_active == True,
+            Workshop.latitude.isnot(None),
+            Workshop.longitude.isnot(None)
+        ).all()
+        
+        cells: Dict[Tuple[int, int], Set[str]] = {}
+        points: Dict[str, Tuple[float, float]] = {}
+        for workshop_id, lat, lon in rows:
+            point = (float(lat), float(lon))
+            points[workshop_id] = point
+            cells.setdefault(self._cell_for(*point), set()).add(workshop_id)
+        
+        with self._lock:
+            self._cells = cells
+            self._points = points
+            self.is_built = True
+            self._version_check.mark_built(version)
+        
+        logger.info(f"Workshop spatial index built with {len(points)} workshops")
+        return len(points)
+    
+    def ensure_built(self, db: Session):
+        """
+        Build the index on first use if startup did not do it, and rebuild it when
+        the workshops table changed behind it (e.g. a geocoding backfill run by another process)
+        """
+        if not self.is_built or self._version_check.is_stale(db):
+            self.build(db)
+    
+    def upsert(self, workshop: Workshop):
+        """Add, move or drop a workshop after it was created or updated"""
+        if not workshop.is_active or workshop.latitude is None or workshop.longitude is None:
+            self.remove(workshop.id)
+            return
+        
+        point = (float(workshop.latitude), float(workshop.longitude))
+        with self._lock:
+            self._discard(workshop.id)
+            self._points[workshop.id] = point
+            self._cells.setdefault(self._cell_for(*point), set()).add(workshop.id)
+    
+    def remove(self, workshop_id: str):
+        """Drop a workshop from the index"""
+        with self._lock:
+            self._discard(workshop_id)
+    
+    def _discard(self, workshop_id: str):
+        point = self._points.pop(workshop_id, None)
+        if point is None:
+            return
+        cell = self._cell_for(*point)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(workshop_id)
+            if not members:
+                del self._cells[cell]
+    
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> List[Tuple[str, Tuple[float, float]]]:
+        """Workshops in the grid cells that overlap the bounding box of the radius"""
+        bbox = GeolocationService.get_bounding_box(lat, lon, radius_km)
+        min_cell = self._cell_for(bbox['min_lat'], bbox['min_lon'])
+        max_cell = self._cell_for(bbox['max_lat'], bbox['max_lon'])
+        
+        candidates = []
+        with self._lock:
+            cells_in_box = (max_cell[0] - min_cell[0] + 1) * (max_cell[1] - min_cell[1] + 1)
+            
+            # Wide radius over a sparse grid: walking the occupied cells is cheaper
+            if cells_in_box > len(self._cells):
+                cell_keys = [
+                    cell for cell in self._cells
+                    if min_cell[0] <= cell[0] <= max_cell[0] and min_cell[1] <= cell[1] <= max_cell[1]
+                ]
+            else:
+                cell_keys = [
+                    (row, col)
+                    for row in range(min_cell[0], max_cell[0] + 1)
+                    for col in range(min_cell[1], max_cell[1] + 1)
+                ]
+            
+            for cell in cell_keys:
+                for workshop_id in self._cells.get(cell, ()):
+                    candidates.append((workshop_id, self._points[workshop_id]))
+        
+        return candidates
+    
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> List[Tuple[str, float, int]]:
+        """
+        Workshops within radius_km of the point
+        Returns (workshop_id, distance_km, travel_time_minutes) ordered by distance
+        """
+        candidates = self._candidates(lat, lon, radius_km)
+        if not candidates:
+            return []
+        
+        distances, travel_times = GeolocationService.calculate_distances_batch(
+            lat, lon,
+            [point[0] for _, point in candidates],
+            [point[1] for _, point in candidates]
+        )
+        
+        in_radius = np.flatnonzero(distances <= radius_km)
+        in_radius = in_radius[np.argsort(distances[in_radius], kind='stable')]
+        
+        return [
+            (candidates[i][0], distance, travel_time)
+            for i, distance, travel_time in zip(
+                in_radius.tolist(), distances[in_radius].tolist(), travel_times[in_radius].tolist()
+            )
+        ]
+    
+    def nearest(self, lat: float, lon: float, k: int, max_radius_km: float) -> List[Tuple[str, float, int]]:
+        """
+        The k workshops closest to the point, no further than max_radius_km
+        Grows the search ring from one cell until it holds k workshops
+        """
+        radius_km = min(self.cell_size * 111.0, max_radius_km)
+        
+        while True:
+            results = self.within_radius(lat, lon, radius_km)
+            # Everything within the ring is known, so the k closest are final
+            if len(results) >= k or radius_km >= max_radius_km:
+                return results[:k]
+            radius_km = min(radius_km * 2, max_radius_km)
+
+# Process-wide index shared by the geographic endpoints
+workshop_spatial_index = WorkshopSpatialIndex(check_seconds=settings.WORKSHOP_INDEX_CHECK_SECONDS)
@@ -0,0 +1,141 @@
+import time
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+import jinja2
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.models.notification import NotificationTemplate, NotificationType, NotificationChannel
+
+logger = logging.getLogger(__name__)
+
+# A variable missing from the notification data is logged and fails the render,
+# so the sender falls back to the notification's title and message instead of blanks
+_StrictUndefined = jinja2.make_logging_undefined(logger, base=jinja2.StrictUndefined)
+
+TemplateKey = Tuple[NotificationType, NotificationChannel]
+
+class CompiledTemplate(NamedTuple):
+    """Compiled subject, text and HTML variants of a NotificationTemplate"""
+    name: str
+    version: Optional[datetime]
+    subject: jinja2.Template
+    text: jinja2.Template
+    html: Optional[jinja2.Template]
+
+class RenderedTemplate(NamedTuple):
+    subject: str
+    text: str
+    html: Optional[str]
+
+class NotificationTemplateRegistry:
+    """
+    Process-wide compiled notification templates, keyed by (type, channel, updated_at).
+    Active templates are compiled once with a shared jinja2 environment; refresh()
+    recompiles only the templates whose updated_at changed. It runs when a template
+    is created, and at most every refresh_seconds on lookup so edits made by other
+    processes are picked up.
+    """
+    
+    def __init__(self, refresh_seconds: float = 300):
+        self.environment = jinja2.Environment(
+            loader=jinja2.DictLoader({}),
+            autoescape=jinja2.select_autoescape(['html', 'xml']),
+            undefined=_StrictUndefined
+        )
+        # Subjects and plain text bodies are not HTML, so they are never escaped
+        self.text_environment = jinja2.Environment(
+            loader=jinja2.DictLoader({}), autoescape=False, undefined=_StrictUndefined
+        )
+        self.refresh_seconds = refresh_seconds
+        # (type, channel, updated_at) -> compiled template
+        self._compiled: Dict[Tuple, CompiledTemplate] = {}
+        # (type, channel) -> key of the active version in _compiled
+        self._active: Dict[TemplateKey, Tuple] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+    
+    def _compile(self, template: NotificationTemplate) -> CompiledTemplate:
+        return CompiledTemplate(
+            name=template.name,
+            version=template.updated_at or template.created_at,
+            subject=self.text_environment.from_string(template.subject_template),
+            text=self.text_environment.from_string(template.message_template),
+            html=self.environment.from_string(template.html_template) if template.html_template else None
+        )
+    
+    def refresh(self):
+        """Reload the active templates, compiling only new or updated ones"""
+        db = SessionLocal()
+        try:
+            templates = db.query(NotificationTemplate).filter(NotificationTemplate.is_active == True).all()
+            
+            with self._lock:
+                active = {}
+                compiled = {}
+                for template in templates:
+                    key = (template.type, template.channel)
+                    # The first active template of a type and channel wins, as before
+                    if key in active:
+                        continue
+                    
+                    versioned_key = key + (template.updated_at or template.created_at,)
+                    entry = self._compiled.get(versioned_key)
+                    if entry is None:
+                        try:
+                            entry = self._compile(template)
+                        except jinja2.TemplateError as e:
+                            logger.error(f"Invalid notification template '{template.name}': {str(e)}")
+                            continue
+                    
+                    active[key] = versioned_key
+                    compiled[versioned_key] = entry
+                
+                self._active = active
+                self._compiled = compiled
+                self._loaded_at = time.monotonic()
+            
+            logger.info(f"Notification template registry loaded {len(active)} templates")
+        finally:
+            db.close()
+    
+    def _ensure_fresh(self):
+        with self._lock:
+            stale = self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_seconds
+            if stale:
+                self.refresh()
+    
+    # === LOOKUPS ===
+    
+    def get(self, notification_type: NotificationType, channel: NotificationChannel) -> Optional[CompiledTemplate]:
+        """Compiled active template for a type and channel, if there is one"""
+        self._ensure_fresh()
+        with self._lock:
+            versioned_key = self._active.get((notification_type, channel))
+            return self._compiled.get(versioned_key) if versioned_key else None
+    
+    def render(self, notification_type: NotificationType, channel: NotificationChannel,
+               data: Optional[Dict]) -> Optional[RenderedTemplate]:
+        """Render every variant of the active template, None without a template"""
+        template = self.get(notification_type, channel)
+        if template is None:
+            return None
+        
+        context = data or {}
+        return RenderedTemplate(
+            subject=template.subject.render(**context),
+            text=template.text.render(**context),
+            html=template.html.render(**context) if template.html else None
+        )
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "active_templates": len(self._active),
+                "compiled_versions": len(self._compiled)
+            }
+
+# Process-wide registry used by NotificationService
+template_registry = NotificationTemplateRegistry(refresh_seconds=settings.NOTIFICATION_TEMPLATE_REFRESH_SECONDS)
@@ -0,0 +1,137 @@
+import json
+import threading
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy.orm import Session
+
+from app.config.settings import settings
+from app.models.workshop import Workshop
+from app.services.workshop_version_service import WorkshopVersionCheck
+
+logger = logging.getLogger(__name__)
+
+INDEXED_FIELDS = ("services", "specialties")
+
+def _as_list(value) -> List[str]:
+    """JSON list column value as a list of strings (some rows store JSON text)"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return [value]
+    if isinstance(value, str):
+        return [value]
+    return [str(item) for item in value if item]
+
+class WorkshopTermIndex:
+    """
+    In-memory posting lists from service/specialty names to active workshop ids.
+    A query term matches every name that contains it (case-insensitive), the same
+    rule the search endpoints used, but it is checked against the distinct names
+    instead of every workshop.
+    """
+    
+    def __init__(self, check_seconds: float = 30):
+        # field -> lowercased name -> workshop ids
+        self._postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        # workshop id -> field -> lowercased names, to undo a workshop's postings
+        self._terms: Dict[str, Dict[str, Set[str]]] = {}
+        self._lock = threading.RLock()
+        self.is_built = False
+        self._version_check = WorkshopVersionCheck(check_seconds)
+    
+    def __len__(self) -> int:
+        return len(self._terms)
+    
+    def build(self, db: Session) -> int:
+        """Index every active workshop (replaces the current index)"""
+        version = self._version_check.current(db)
+        rows = db.query(Workshop.id, Workshop.services, Workshop.specialties).filter(
+            Workshop.is_active == True
+        ).all()
+        
+        with self._lock:
+            self._postings = {field: {} for field in INDEXED_FIELDS}
+            self._terms = {}
+            for workshop_id, services, specialties in rows:
+                self._add(workshop_id, {"services": services, "specialties": specialties})
+            self.is_built = True
+            self._version_check.mark_built(version)
+        
+        logger.info(f"Workshop term index built with {len(rows)} workshops")
+        return len(rows)
+    
+    def ensure_built(self, db: Session):
+        """
+        Build the index on first use if startup did not do it, and rebuild it when
+        the workshops table changed behind it (e.g. a geocoding backfill run by another process)
+        """
+        if not self.is_built or self._version_check.is_stale(db):
+            self.build(db)
+    
+    def upsert(self, workshop: Workshop):
+        """Re-index a workshop after it was created or updated"""
+        with self._lock:
+            self._discard(workshop.id)
+            if workshop.is_active:
+                self._add(workshop.id, {"services": workshop.services, "specialties": workshop.specialties})
+    
+    def remove(self, workshop_id: str):
+        """Drop a workshop from the index"""
+        with self._lock:
+            self._discard(workshop_id)
+    
+    def _add(self, workshop_id: str, values: Dict):
+        terms = {}
+        for field in INDEXED_FIELDS:
+            names = {name.lower() for name in _as_list(values.get(field))}
+            for name in names:
+                self._postings[field].setdefault(name, set()).add(workshop_id)
+            terms[field] = names
+        self._terms[workshop_id] = terms
+    
+    def _discard(self, workshop_id: str):
+        terms = self._terms.pop(workshop_id, None)
+        if terms is None:
+            return
+        for field, names in terms.items():
+            postings = self._postings[field]
+            for name in names:
+                members = postings.get(name)
+                if members is not None:
+                    members.discard(workshop_id)
+                    if not members:
+                        del postings[name]
+    
+    # === QUERIES ===
+    
+    def match(self, field: str, term: str) -> Set[str]:
+        """Ids of workshops with a name in field that contains term"""
+        term = term.lower()
+        with self._lock:
+            ids = set()
+            for name, members in self._postings[field].items():
+                if term in name:
+                    ids |= members
+            return ids
+    
+    def all_of(self, field: str, terms: Iterable[str]) -> Optional[Set[str]]:
+        """Ids matching every term; None when there are no terms (no constraint)"""
+        ids = None
+        for term in terms:
+            ids = self.match(field, term) if ids is None else ids & self.match(field, term)
+            if not ids:
+                return set()
+        return ids
+    
+    def any_of(self, field: str, terms: Iterable[str]) -> Set[str]:
+        """Ids matching at least one term"""
+        ids = set()
+        for term in terms:
+            ids |= self.match(field, term)
+        return ids
+
+# Process-wide index shared by the search endpoints
+workshop_term_index = WorkshopTermIndex(check_seconds=settings.WORKSHOP_INDEX_CHECK_SECONDS)
@@ -0,0 +1,93 @@
+import json
+from typing import Any, Dict, Optional
+from sqlalchemy import Float, Text, type_coerce
+
+from app.models.workshop import Workshop
+
+# Columns of a workshop search response (WorkshopResponse), in response order
+WORKSHOP_RESPONSE_FIELDS = (
+    "id", "name", "description", "address", "city", "state", "postal_code",
+    "phone", "email", "website", "latitude", "longitude", "services",
+    "specialties", "working_hours", "rating_average", "total_reviews", "images",
+    "certifications", "years_in_business", "is_active", "is_verified", "created_at"
+)
+
+# Fetched as raw JSON text and decoded on first access
+JSON_FIELDS = ("services", "specialties", "working_hours", "images", "certifications")
+
+# Fetched as plain floats and rounded to the column scale (same value as float(Decimal))
+NUMERIC_SCALES = {
+    field: getattr(Workshop, field).type.scale
+    for field in ("latitude", "longitude", "rating_average")
+}
+
+def _projected_column(field: str):
+    column = getattr(Workshop, field)
+    if field in JSON_FIELDS:
+        return type_coerce(column, Text).label(field)
+    if field in NUMERIC_SCALES:
+        return type_coerce(column, Float).label(field)
+    return column
+
+# Select list used instead of loading Workshop entities
+WORKSHOP_ROW_COLUMNS = tuple(_projected_column(field) for field in WORKSHOP_RESPONSE_FIELDS)
+
+class WorkshopRow:
+    """
+    Read-only workshop projected from WORKSHOP_ROW_COLUMNS.
+    Exposes the same attributes as a Workshop entity for the search code,
+    without identity map bookkeeping, and only decodes the JSON columns that are read.
+    """
+    
+    __slots__ = ("_row", "_values")
+    
+    def __init__(self, row):
+        self._row = row
+        self._values: Dict[str, Any] = {}
+    
+    def __getattr__(self, name: str):
+        values = self._values
+        if name in values:
+            return values[name]
+        
+        value = getattr(self._row, name)
+        if name in JSON_FIELDS:
+            value = json.loads(value) if value is not None else None
+        elif name in NUMERIC_SCALES and value is not None:
+            value = float(round(value, NUMERIC_SCALES[name]))
+        values[name] = value
+        return value
+    
+    def __repr__(self):
+        return f"<WorkshopRow(name='{self.name}', city='{self.city}')>"
+
+def serialize_workshop(workshop: WorkshopRow, distance_km: Optional[float] = None,
+                       travel_time: Optional[int] = None) -> Dict[str, Any]:
+    """Response dict of a workshop with its distance (WorkshopWithDistance)"""
+    return {
+        "id": workshop.id,
+        "name": workshop.name,
+        "description": workshop.description,
+        "address": workshop.address,
+        "city": workshop.city,
+        "state": workshop.state,
+        "postal_code": workshop.postal_code,
+        "phone": workshop.phone,
+        "email": workshop.email,
+        "website": workshop.website,
+        "latitude": workshop.latitude,
+        "longitude": workshop.longitude,
+        "services": workshop.services or [],
+        "specialties": workshop.specialties or [],
+        "working_hours": workshop.working_hours or {},
+        "rating_average": workshop.rating_average,
+        "total_reviews": workshop.total_reviews,
+        "images": workshop.images or [],
+        "certifications": workshop.certifications or [],
+        "years_in_business": workshop.years_in_business,
+        "is_active": workshop.is_active,
+        "is_verified": workshop.is_verified,
+        "created_at": workshop.created_at,
+        "distance_km": distance_km,
+        "estimated_travel_time_minutes": travel_time
+    }
@@ -0,0 +1,55 @@
+import time
+import threading
+from typing import Optional, Tuple
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.models.workshop import Workshop
+
+def workshop_table_version(db: Session) -> Tuple:
+    """
+    Cheap signature of the workshops table: row, active and geocoded counts
+    plus the newest created_at/updated_at. It changes with any insert, delete,
+    (de)activation or geocoding, including writes made by other processes.
+    """
+    return tuple(db.query(
+        func.count(Workshop.id),
+        func.sum(case((Workshop.is_active == True, 1), else_=0)),
+        func.count(Workshop.latitude),
+        func.max(Workshop.created_at),
+        func.max(Workshop.updated_at)
+    ).one())
+
+class WorkshopVersionCheck:
+    """
+    Tells an in-memory workshop index when the table changed since it was built.
+    The version query runs at most once every check_seconds, so most lookups
+    cost nothing; a change is picked up within that interval.
+    """
+    
+    def __init__(self, check_seconds: float = 30):
+        self.check_seconds = check_seconds
+        self._version: Optional[Tuple] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def current(self, db: Session) -> Tuple:
+        """Version to pass to mark_built(), read before the index loads its rows"""
+        return workshop_table_version(db)
+    
+    def mark_built(self, version: Tuple):
+        with self._lock:
+            self._version = version
+            self._checked_at = time.monotonic()
+    
+    def is_stale(self, db: Session) -> bool:
+        """True when the table changed since the last build (checked at most every check_seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+                return False
+            # One caller per interval runs the query; the others keep using the index meanwhile
+            self._checked_at = now
+            built_version = self._version
+        
+        return built_version is None or workshop_table_version(db) != built_version
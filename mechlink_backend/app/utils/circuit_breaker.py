@@ -0,0 +1,120 @@
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker over a rolling window of call results.
+    Opens when at least min_requests calls in the last window_seconds failed
+    at failure_rate or more, rejects calls for cooldown_seconds, then lets
+    up to probe_requests calls through (half open): one failure opens it again,
+    and it closes once every probe that went out succeeded.
+    """
+    
+    def __init__(self, failure_rate: float = 0.5, min_requests: int = 10, window_seconds: float = 60,
+                 cooldown_seconds: float = 60, probe_requests: int = 3):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_requests = probe_requests
+        
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._results: Deque[Tuple[float, bool]] = deque()
+        self._probes_allowed = 0
+        self._probes_granted = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.times_opened = 0
+    
+    def _trim(self, now: float):
+        while self._results and now - self._results[0][0] > self.window_seconds:
+            self._results.popleft()
+    
+    def _refresh(self, now: float):
+        # Half open again after a cooldown, also when probes were granted but never reported back
+        if self._state != CLOSED and now - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+            self._opened_at = now
+            self._probes_allowed = self.probe_requests
+            self._probes_granted = 0
+            self._probe_successes = 0
+    
+    def _open(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._results.clear()
+        self.times_opened += 1
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+    
+    def allowance(self, wanted: int) -> int:
+        """How many of `wanted` calls may go out now (all when closed, probes when half open)"""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == CLOSED:
+                return wanted
+            if self._state == OPEN:
+                return 0
+            granted = min(wanted, self._probes_allowed)
+            self._probes_allowed -= granted
+            self._probes_granted += granted
+            return granted
+    
+    def release(self, unused: int):
+        """Give back probes granted by allowance() that were not used"""
+        with self._lock:
+            if self._state == HALF_OPEN and unused > 0:
+                unused = min(unused, self._probes_granted)
+                self._probes_granted -= unused
+                self._probes_allowed += unused
+    
+    def record(self, success: bool) -> bool:
+        """Record a call result; returns True if this result opened the circuit"""
+        now = time.monotonic()
+        with self._lock:
+            self._refresh(now)
+            
+            if self._state == HALF_OPEN:
+                if not success:
+                    self._open(now)
+                    return True
+                self._probe_successes += 1
+                if self._probe_successes >= self._probes_granted:
+                    self._state = CLOSED
+                return False
+            
+            if self._state == OPEN:
+                # Late result of a call made before the circuit opened
+                return False
+            
+            self._results.append((now, success))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._results if not ok)
+            if len(self._results) >= self.min_requests and failures / len(self._results) >= self.failure_rate:
+                self._open(now)
+                return True
+            return False
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            self._trim(now)
+            failures = sum(1 for _, ok in self._results if not ok)
+            return {
+                "state": self._state,
+                "window_requests": len(self._results),
+                "window_failures": failures,
+                "times_opened": self.times_opened
+            }
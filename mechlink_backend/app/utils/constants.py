@@ -0,0 +1,137 @@
+# === PUERTO RICO GAZETTEER ===
+
+# The 78 municipalities of Puerto Rico: (name, latitude, longitude) of the town center
+PR_MUNICIPALITIES = [
+    ("Adjuntas", 18.1627, -66.7224),
+    ("Aguada", 18.3788, -67.1883),
+    ("Aguadilla", 18.4274, -67.1541),
+    ("Aguas Buenas", 18.2569, -66.1030),
+    ("Aibonito", 18.1400, -66.2660),
+    ("Añasco", 18.2828, -67.1396),
+    ("Arecibo", 18.4509, -66.7151),
+    ("Arroyo", 17.9658, -66.0613),
+    ("Barceloneta", 18.4505, -66.5385),
+    ("Barranquitas", 18.1866, -66.3063),
+    ("Bayamón", 18.3964, -66.1577),
+    ("Cabo Rojo", 18.0866, -67.1457),
+    ("Caguas", 18.2342, -66.0359),
+    ("Camuy", 18.4838, -66.8449),
+    ("Canóvanas", 18.3791, -65.9012),
+    ("Carolina", 18.3809, -65.9571),
+    ("Cataño", 18.4413, -66.1180),
+    ("Cayey", 18.1119, -66.1660),
+    ("Ceiba", 18.2641, -65.6485),
+    ("Ciales", 18.3361, -66.4688),
+    ("Cidra", 18.1758, -66.1613),
+    ("Coamo", 18.0800, -66.3580),
+    ("Comerío", 18.2180, -66.2260),
+    ("Corozal", 18.3417, -66.3168),
+    ("Culebra", 18.3030, -65.3010),
+    ("Dorado", 18.4588, -66.2677),
+    ("Fajardo", 18.3258, -65.6524),
+    ("Florida", 18.3625, -66.5613),
+    ("Guánica", 17.9716, -66.9080),
+    ("Guayama", 17.9841, -66.1138),
+    ("Guayanilla", 18.0191, -66.7918),
+    ("Guaynabo", 18.4178, -66.1103),
+    ("Gurabo", 18.2544, -65.9729),
+    ("Hatillo", 18.4863, -66.8254),
+    ("Hormigueros", 18.1397, -67.1274),
+    ("Humacao", 18.1497, -65.8274),
+    ("Isabela", 18.5008, -67.0243),
+    ("Jayuya", 18.2186, -66.5916),
+    ("Juana Díaz", 18.0525, -66.5066),
+    ("Juncos", 18.2275, -65.9210),
+    ("Lajas", 18.0499, -67.0593),
+    ("Lares", 18.2947, -66.8771),
+    ("Las Marías", 18.2511, -66.9924),
+    ("Las Piedras", 18.1830, -65.8663),
+    ("Loíza", 18.4313, -65.8802),
+    ("Luquillo", 18.3725, -65.7166),
+    ("Manatí", 18.4277, -66.4921),
+    ("Maricao", 18.1808, -66.9799),
+    ("Maunabo", 18.0072, -65.8993),
+    ("Mayagüez", 18.2013, -67.1397),
+    ("Moca", 18.3947, -67.1130),
+    ("Morovis", 18.3258, -66.4066),
+    ("Naguabo", 18.2116, -65.7349),
+    ("Naranjito", 18.3008, -66.2449),
+    ("Orocovis", 18.2269, -66.3912),
+    ("Patillas", 18.0064, -66.0157),
+    ("Peñuelas", 18.0563, -66.7213),
+    ("Ponce", 18.0113, -66.6140),
+    ("Quebradillas", 18.4738, -66.9385),
+    ("Rincón", 18.3402, -67.2499),
+    ("Río Grande", 18.3802, -65.8313),
+    ("Sabana Grande", 18.0778, -66.9604),
+    ("Salinas", 17.9775, -66.2979),
+    ("San Germán", 18.0829, -67.0451),
+    ("San Juan", 18.4655, -66.1057),
+    ("San Lorenzo", 18.1897, -65.9610),
+    ("San Sebastián", 18.3366, -66.9902),
+    ("Santa Isabel", 17.9661, -66.4049),
+    ("Toa Alta", 18.3883, -66.2482),
+    ("Toa Baja", 18.4448, -66.2540),
+    ("Trujillo Alto", 18.3629, -66.0115),
+    ("Utuado", 18.2655, -66.7005),
+    ("Vega Alta", 18.4121, -66.3313),
+    ("Vega Baja", 18.4441, -66.3876),
+    ("Vieques", 18.1263, -65.4401),
+    ("Villalba", 18.1272, -66.4922),
+    ("Yabucoa", 18.0505, -65.8793),
+    ("Yauco", 18.0350, -66.8499),
+]
+
+# Commonly used barrios and sectors: (name, municipality, latitude, longitude)
+PR_BARRIOS = [
+    ("Viejo San Juan", "San Juan", 18.4655, -66.1166),
+    ("Santurce", "San Juan", 18.4461, -66.0669),
+    ("Condado", "San Juan", 18.4577, -66.0710),
+    ("Miramar", "San Juan", 18.4555, -66.0790),
+    ("Ocean Park", "San Juan", 18.4530, -66.0550),
+    ("Hato Rey", "San Juan", 18.4225, -66.0625),
+    ("Río Piedras", "San Juan", 18.3985, -66.0505),
+    ("Puerto Nuevo", "San Juan", 18.4160, -66.0950),
+    ("Caparra Heights", "San Juan", 18.4080, -66.0900),
+    ("Cupey", "San Juan", 18.3620, -66.0560),
+    ("Caimito", "San Juan", 18.3450, -66.0790),
+    ("Isla Verde", "Carolina", 18.4410, -66.0200),
+    ("Villa Fontana", "Carolina", 18.4050, -65.9790),
+    ("Trujillo Alto Pueblo", "Trujillo Alto", 18.3629, -66.0115),
+    ("Saint Just", "Trujillo Alto", 18.3770, -66.0100),
+    ("Caparra", "Guaynabo", 18.4150, -66.1000),
+    ("Amelia", "Guaynabo", 18.4310, -66.1150),
+    ("Santa Juanita", "Bayamón", 18.3880, -66.1750),
+    ("Río Hondo", "Bayamón", 18.4010, -66.1640),
+    ("Levittown", "Toa Baja", 18.4440, -66.1790),
+    ("Sabana Seca", "Toa Baja", 18.4330, -66.1870),
+    ("Higuillar", "Dorado", 18.4470, -66.2450),
+    ("Bairoa", "Caguas", 18.2590, -66.0400),
+    ("La Playa", "Ponce", 17.9800, -66.6160),
+    ("Ramey", "Aguadilla", 18.4950, -67.1350),
+    ("Palmas del Mar", "Humacao", 18.0830, -65.8000),
+    ("Punta Santiago", "Humacao", 18.1660, -65.7480),
+    ("Puerto Real", "Fajardo", 18.3330, -65.6330),
+    ("Roosevelt Roads", "Ceiba", 18.2360, -65.6370),
+    ("Esperanza", "Vieques", 18.0950, -65.4710),
+    ("Isabel Segunda", "Vieques", 18.1490, -65.4420),
+    ("Dewey", "Culebra", 18.3030, -65.3010),
+    ("Piñones", "Loíza", 18.4430, -65.9800),
+    ("Aguirre", "Salinas", 17.9560, -66.2220),
+    ("Boquerón", "Cabo Rojo", 18.0270, -67.1690),
+    ("Puerto Real", "Cabo Rojo", 18.0760, -67.1880),
+    ("La Parguera", "Lajas", 17.9740, -67.0470),
+    ("Jobos", "Isabela", 18.5110, -67.0760),
+    ("Mameyes", "Río Grande", 18.3730, -65.7690),
+    ("Palmer", "Río Grande", 18.3720, -65.7760),
+    ("Jájome", "Cayey", 18.0750, -66.1310),
+]
+
+# Alternative spellings and nicknames resolved to a gazetteer name
+PR_PLACE_ALIASES = {
+    "old san juan": "Viejo San Juan",
+    "sj": "San Juan",
+    "mayaguez city": "Mayagüez",
+    "vieques island": "Vieques",
+    "culebra island": "Culebra",
+}
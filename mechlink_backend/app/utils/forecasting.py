@@ -0,0 +1,102 @@
+from typing import NamedTuple
+import numpy as np
+
+class SeriesForecast(NamedTuple):
+    """Fits of a batch of monthly series, one entry (or row) per series"""
+    forecast: np.ndarray    # (series, horizon) predicted values, never negative
+    slope: np.ndarray       # trend per month
+    mean: np.ndarray        # mean monthly value over the series' history
+    confidence: np.ndarray  # 0..1
+
+# Trend/seasonal refits; converges well before this for monthly series
+BACKFIT_ROUNDS = 10
+
+class LinearFit(NamedTuple):
+    slope: np.ndarray
+    intercept: np.ndarray
+    count: np.ndarray
+
+def _weighted_trend(series: np.ndarray, weights: np.ndarray, t: np.ndarray, safe_count: np.ndarray):
+    """Per-row least squares slope and intercept over the weighted columns"""
+    t_mean = (weights * t).sum(axis=1) / safe_count
+    mean = (weights * series).sum(axis=1) / safe_count
+    t_centred = (t[None, :] - t_mean[:, None]) * weights
+    t_var = (t_centred ** 2).sum(axis=1)
+    slope = np.divide(
+        (t_centred * (series - mean[:, None])).sum(axis=1), t_var,
+        out=np.zeros(len(series)), where=t_var > 0
+    )
+    return slope, mean - slope * t_mean
+
+def fit_monthly_series(series: np.ndarray, first_column: np.ndarray, column_months: np.ndarray,
+                       horizon: int = 12, season_length: int = 12) -> SeriesForecast:
+    """
+    Least squares trend plus seasonal profile for many monthly series at once
+    series: (n, N) monthly values, the last column being the last complete month
+    first_column: (n,) first column that is part of each series' history; earlier
+    columns are ignored rather than read as zero spending (N for no history)
+    column_months: (N + horizon,) calendar month (0-11) of every fitted and forecast column
+    
+    The trend is fitted on each series' own history. Series with at least two
+    seasons of history also get an additive seasonal profile (a classic
+    decomposition, refined by backfitting). Confidence grows with the history
+    (full after one season) and falls with the residual spread relative to
+    the mean.
+    """
+    series = np.asarray(series, dtype=float)
+    n, columns = series.shape
+    t = np.arange(columns, dtype=float)
+    weights = (t[None, :] >= np.asarray(first_column)[:, None]).astype(float)
+    
+    count = weights.sum(axis=1)
+    safe_count = np.maximum(count, 1)
+    mean = (weights * series).sum(axis=1) / safe_count
+    column_seasons = column_months[:columns] % season_length
+    months = np.eye(season_length)[column_seasons]
+    month_counts = weights @ months
+    has_seasons = count >= 2 * season_length
+    
+    # Backfitting: trend on the deseasonalized series, then the seasonal profile
+    # (mean detrended value per calendar month, centred on zero) on the detrended one
+    seasonal = np.zeros((n, season_length))
+    for _ in range(BACKFIT_ROUNDS):
+        slope, intercept = _weighted_trend(series - seasonal[:, column_seasons], weights, t, safe_count)
+        residuals = (series - intercept[:, None] - slope[:, None] * t) * weights
+        seasonal = np.divide(residuals @ months, month_counts, out=np.zeros((n, season_length)), where=month_counts > 0)
+        seasonal -= seasonal.mean(axis=1, keepdims=True)
+        seasonal[~has_seasons] = 0
+    
+    future_t = np.arange(columns, columns + horizon, dtype=float)
+    future_months = column_months[columns:columns + horizon] % season_length
+    forecast = intercept[:, None] + slope[:, None] * future_t + seasonal[:, future_months]
+    forecast = np.clip(forecast, 0, None)
+    
+    residuals -= seasonal[:, column_seasons] * weights
+    spread = np.sqrt((residuals ** 2).sum(axis=1) / safe_count)
+    coverage = np.minimum(count / season_length, 1.0)
+    fit_quality = np.divide(1.0, 1.0 + np.divide(spread, mean, out=np.full(n, np.inf), where=mean > 0))
+    confidence = np.where(count > 0, coverage * fit_quality, 0.0)
+    
+    return SeriesForecast(forecast=forecast, slope=slope, mean=mean, confidence=confidence)
+
+def grouped_linear_fit(groups: np.ndarray, x: np.ndarray, y: np.ndarray, n_groups: int) -> LinearFit:
+    """
+    Least squares line y = intercept + slope * x for every group at once
+    (e.g. mileage against date for each vehicle); groups without at least two
+    distinct x values get a zero slope
+    """
+    groups = np.asarray(groups, dtype=int)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    
+    count = np.bincount(groups, minlength=n_groups).astype(float)
+    safe_count = np.maximum(count, 1)
+    x_mean = np.bincount(groups, weights=x, minlength=n_groups) / safe_count
+    y_mean = np.bincount(groups, weights=y, minlength=n_groups) / safe_count
+    
+    x_centred = x - x_mean[groups]
+    x_var = np.bincount(groups, weights=x_centred ** 2, minlength=n_groups)
+    covariance = np.bincount(groups, weights=x_centred * (y - y_mean[groups]), minlength=n_groups)
+    slope = np.divide(covariance, x_var, out=np.zeros(n_groups), where=x_var > 0)
+    
+    return LinearFit(slope=slope, intercept=y_mean - slope * x_mean, count=count)
@@ -0,0 +1,36 @@
+import re
+import heapq
+import random
+import unicodedata
+from itertools import islice
+from typing import Callable, Iterable, List, Optional
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+def top_k(items: Iterable, k: int, key: Optional[Callable] = None, reverse: bool = False) -> List:
+    """
+    Same result as sorted(items, key=key, reverse=reverse)[:k], keeping only k
+    candidates in a heap; ties stay in input order like a stable sort.
+    key=None keeps the input order and just takes the first k.
+    """
+    if key is None:
+        return list(islice(items, k))
+    if reverse:
+        return heapq.nlargest(k, items, key=key)
+    return heapq.nsmallest(k, items, key=key)
+
+def backoff_delay(attempt: int, base_seconds: float, max_seconds: float) -> float:
+    """
+    Seconds to wait before retry number `attempt` (1-based): exponential backoff
+    capped at max_seconds, with "equal jitter" (half fixed, half random) so
+    retries of a burst of failures do not all come back at once
+    """
+    delay = min(max_seconds, base_seconds * 2 ** max(0, attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
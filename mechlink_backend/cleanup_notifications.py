@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Script to delete (and optionally archive) old notifications in small chunks
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+from app.config.database import SessionLocal
+from app.services.notification_retention_service import NotificationRetention
+from app.config.settings import settings
+
+def cleanup_notifications(days_old=90, archive=False, archive_path=None, batch_size=None, pause=None):
+    """
+    Delete finished notifications older than days_old and expired pending ones.
+
+    Each chunk is its own short transaction, so the API keeps writing while
+    this runs. With --archive the rows are written to a gzip JSON lines file
+    before they are deleted.
+    """
+    retention = NotificationRetention(
+        batch_size=batch_size or settings.NOTIFICATION_RETENTION_BATCH_SIZE,
+        pause_seconds=settings.NOTIFICATION_RETENTION_PAUSE_SECONDS if pause is None else pause
+    )
+    if archive and not archive_path:
+        archive_path = retention.default_archive_path()
+
+    def show_progress(report):
+        print(f"  🧹 {report['deleted']} deleted ({report['chunks']} chunks)", end="\r", flush=True)
+
+    db = SessionLocal()
+    try:
+        report = retention.run(db, days_old=days_old, archive_path=archive_path, progress=show_progress)
+    except Exception as e:
+        print(f"\n❌ Error: {str(e)}")
+        return
+    finally:
+        db.close()
+
+    print(f"\n✅ Deleted {report['deleted']} notifications in {report['duration_seconds']}s")
+    if report["archive_path"]:
+        print(f"📦 Archive: {report['archive_path']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete old notifications in chunks")
+    parser.add_argument("--days", type=int, default=90, help="Age in days of the finished notifications to delete")
+    parser.add_argument("--archive", action="store_true", help="Archive the notifications before deleting them")
+    parser.add_argument("--archive-path", help="Archive file (default: timestamped file in NOTIFICATION_ARCHIVE_DIR)")
+    parser.add_argument("--batch-size", type=int, help="Rows deleted per transaction")
+    parser.add_argument("--pause", type=float, help="Seconds to pause between chunks")
+    args = parser.parse_args()
+
+    cleanup_notifications(
+        days_old=args.days,
+        archive=args.archive or bool(args.archive_path),
+        archive_path=args.archive_path,
+        batch_size=args.batch_size,
+        pause=args.pause
+    )
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the monthly maintenance cost rollups from the maintenance records
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import argparse
+from app.config.database import SessionLocal
+from app.services.cost_rollup_service import CostRollupService
+
+def rebuild_cost_rollups(user_id=None):
+    """
+    Recompute the maintenance_cost_rollups table (or one user's rows).
+
+    The API keeps the rollups up to date on every record change; this is for
+    the first backfill and for repairing them after records were changed
+    directly in the database.
+    """
+    db = SessionLocal()
+    started = time.monotonic()
+    try:
+        groups = CostRollupService(db).rebuild(user_id=user_id)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return
+    finally:
+        db.close()
+
+    scope = f"user {user_id}" if user_id else "all users"
+    print(f"✅ Rebuilt {groups} cost rollups for {scope} in {time.monotonic() - started:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the monthly maintenance cost rollups")
+    parser.add_argument("--user", help="Only rebuild the rollups of this user id")
+    args = parser.parse_args()
+
+    rebuild_cost_rollups(user_id=args.user)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Script to run the notification outbox dispatcher outside the web process
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import argparse
+from app.config.database import Base, engine, SessionLocal, upgrade_schema
+from app.services.notification_dispatcher_service import notification_dispatcher
+from app.services.smtp_pool_service import smtp_pool
+
+# Make sure the outbox lease columns exist
+Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+
+def run_dispatcher(interval=10, once=False):
+    """
+    Send due notifications until interrupted.
+
+    Each pass claims due notifications with a lease, so this can run next to
+    the web process scheduler or as several copies without double sends.
+    """
+    try:
+        while True:
+            db = SessionLocal()
+            try:
+                sent = notification_dispatcher.dispatch_due(db)
+                if sent:
+                    print(f"📨 {sent} notifications sent")
+            except Exception as e:
+                print(f"❌ Error: {str(e)}")
+                db.rollback()
+            finally:
+                db.close()
+
+            if once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        notification_dispatcher.shutdown()
+        smtp_pool.close_all()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dispatch due notifications")
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between passes")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    args = parser.parse_args()
+
+    print("📅 Notification dispatcher started")
+    run_dispatcher(interval=args.interval, once=args.once)
+    print("📅 Notification dispatcher stopped")
@@ -0,0 +1,105 @@
+"""SMTPConnectionPool against a local aiosmtpd server"""
+import socket
+import time
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from app.services.smtp_pool_service import SMTPConnectionPool
+
+MESSAGE = "Subject: test\r\n\r\nHello"
+
+
+class RecordingHandler:
+    """Remembers which SMTP session delivered each message"""
+
+    def __init__(self):
+        self.sessions = []
+        self.last_server = None
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.append(id(session))
+        self.last_server = server
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+def _pool(controller, **options) -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        host=controller.hostname, port=controller.port, use_tls=False, size=1, timeout=5, **options
+    )
+
+
+def test_reuses_one_session(smtp_server):
+    controller, handler = smtp_server
+    pool = _pool(controller)
+
+    for _ in range(5):
+        pool.send("from@example.com", ["to@example.com"], MESSAGE)
+
+    assert len(handler.sessions) == 5
+    assert len(set(handler.sessions)) == 1
+    assert pool.stats()["connections_opened"] == 1
+    pool.close_all()
+
+
+def test_rotates_after_message_cap(smtp_server):
+    controller, handler = smtp_server
+    pool = _pool(controller, max_messages=2)
+
+    for _ in range(5):
+        pool.send("from@example.com", ["to@example.com"], MESSAGE)
+
+    # 2 + 2 + 1 messages over three sessions
+    assert len(set(handler.sessions)) == 3
+    assert pool.stats()["connections_opened"] == 3
+    pool.close_all()
+
+
+def test_reconnects_once_after_server_disconnect(smtp_server):
+    controller, handler = smtp_server
+    pool = _pool(controller)
+    pool.send("from@example.com", ["to@example.com"], MESSAGE)
+
+    # The server drops the idle pooled session
+    controller.loop.call_soon_threadsafe(handler.last_server.transport.close)
+    time.sleep(0.2)
+
+    pool.send("from@example.com", ["to@example.com"], MESSAGE)
+
+    stats = pool.stats()
+    assert stats["reconnects"] == 1
+    assert stats["connections_opened"] == 2
+    assert stats["messages_sent"] == 2
+    assert len(set(handler.sessions)) == 2
+    pool.close_all()
+
+
+def test_unexpected_error_closes_the_session(smtp_server):
+    controller, handler = smtp_server
+    pool = _pool(controller)
+
+    # smtplib only accepts ASCII str messages
+    with pytest.raises(UnicodeEncodeError):
+        pool.send("from@example.com", ["to@example.com"], "Subject: café\r\n\r\nHello")
+
+    # The session was not checked back in, and the pool slot was released
+    assert pool.stats()["idle_connections"] == 0
+    pool.send("from@example.com", ["to@example.com"], MESSAGE)
+    assert pool.stats()["connections_opened"] == 2
+    pool.close_all()
@@ -7,56 +7,44 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import argparse
 from sqlalchemy.orm import Session
-from app.config.database import get_db, SessionLocal
+from app.config.database import Base, engine, get_db, SessionLocal
 from app.models.workshop import Workshop
-from app.services.geolocation_service import GeolocationService
+from app.services.batch_geocoding_service import BatchGeocoder, NominatimGeocoder, GEOCODER_BACKENDS
 
-def update_workshop_coordinates():
+# Make sure the checkpoint and cache tables exist
+Base.metadata.create_all(bind=engine)
+
+def update_workshop_coordinates(backend_name="nominatim", workers=4, chunk_size=50,
+                                requests_per_second=None, retry_failed=False):
     """
     Update coordinates for workshops that don't yet have them.
 
-    This function queries the database for workshops with missing latitude or longitude.
-    It attempts to fetch coordinates using the GeolocationService. If no result is found
-    using the full address, it tries to get coordinates for the city instead.
+    Workshops missing latitude or longitude are geocoded concurrently by a
+    BatchGeocoder. Each workshop tries its full address first and falls back to
+    city-level coordinates. Results are committed in chunks together with a
+    checkpoint row, so an interrupted run resumes where it stopped. Workshops
+    that already failed are skipped unless retry_failed is set.
+
+    A running server notices the new coordinates on its own: its in-memory
+    search indexes and map clusters rebuild within WORKSHOP_INDEX_CHECK_SECONDS.
     """
     db = SessionLocal()
-    geo_service = GeolocationService()
+
+    if backend_name == "nominatim" and requests_per_second:
+        backend = NominatimGeocoder(requests_per_second=requests_per_second)
+    else:
+        backend = GEOCODER_BACKENDS[backend_name]()
+
+    def report(stats):
+        print(f"  {stats['processed']}/{stats['total']} processed - "
+              f"✅ {stats['geocoded']} geocoded, ⚠️  {stats['city_fallback']} city-level, ❌ {stats['failed']} failed")
 
     try:
-        # Retrieve workshops missing coordinates
-        workshops = db.query(Workshop).filter(
-            Workshop.latitude.is_(None) | Workshop.longitude.is_(None)
-        ).all()
-
-        print(f"Found {len(workshops)} workshops without coordinates")
-
-        for workshop in workshops:
-            print(f"\nProcessing: {workshop.name} - {workshop.address}, {workshop.city}")
-
-            # Try geocoding using full address
-            address = f"{workshop.address}, {workshop.city}, Puerto Rico"
-            coords = geo_service.geocode_address(address)
-
-            if coords:
-                lat, lon = coords
-                workshop.latitude = lat
-                workshop.longitude = lon
-                print(f"  ✅ Coordinates found: {lat}, {lon}")
-            else:
-                print(f"  ❌ Failed to get coordinates")
-
-                # Fallback to using city name only
-                city_coords = geo_service.geocode_address(workshop.city, "Puerto Rico")
-                if city_coords:
-                    lat, lon = city_coords
-                    workshop.latitude = lat
-                    workshop.longitude = lon
-                    print(f"  ⚠️  Using city-level coordinates: {lat}, {lon}")
-
-        # Save all changes to the database
-        db.commit()
-        print(f"\n✅ Coordinate update completed for {len(workshops)} workshops")
+        geocoder = BatchGeocoder(db, backend, workers=workers, chunk_size=chunk_size, progress=report)
+        stats = geocoder.run(retry_failed=retry_failed)
+        print(f"\n✅ Coordinate update completed for {stats['processed']} workshops")
 
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -167,11 +155,27 @@ def add_sample_workshops_with_coordinates():
         db.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill workshop coordinates")
+    parser.add_argument("--backend", choices=sorted(GEOCODER_BACKENDS), default="nominatim",
+                        help="Geocoder backend (gazetteer works offline)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent geocoding workers")
+    parser.add_argument("--chunk-size", type=int, default=50, help="Workshops per commit")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Nominatim requests per second (default from settings)")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry workshops that failed before")
+    args = parser.parse_args()
+
     print("🌍 Updating workshop coordinates...")
     print("=" * 50)
 
     # First update missing coordinates for existing workshops
-    update_workshop_coordinates()
+    update_workshop_coordinates(
+        backend_name=args.backend,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        requests_per_second=args.rate,
+        retry_failed=args.retry_failed
+    )
 
     print("\n" + "=" * 50)
     print("🏪 Adding sample workshops...")